@@ -0,0 +1,230 @@
+"""
+Benchmark da camada de transferência (transferencia.py).
+
+Para cada tamanho de ficheiro mede:
+
+* upload: `upload_blob` num só fluxo vs. blocos paralelos (`carregar_em_blocos`);
+* download: `readall()` para a memória vs. `readinto` em fluxo (`baixar_em_fluxo`),
+  com o pico de memória Python de cada um;
+* retoma: um upload interrompido a meio e retomado, com os blocos reenviados.
+
+Por omissão corre contra um Blob Storage falso, local, que guarda os blocos em
+disco e imita a rede: cada pedido paga uma latência fixa (ida e volta) e cada
+ligação transfere no máximo `--banda-mb` MB/s. Com `--conexao` corre contra
+um serviço real ou contra o Azurite:
+
+    python bench_transferencia.py --tamanhos 1,64,512
+    python bench_transferencia.py --tamanhos 1,64,1024,4096 --conexao "UseDevelopmentStorage=true"
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from transferencia import MAX_CONCORRENCIA, TAMANHO_BLOCO, baixar_em_fluxo, carregar_em_blocos
+
+PEDACO_DE_ESCRITA = 4 * 1024 * 1024
+
+
+class _BlocoFalso:
+    def __init__(self, block_id, size):
+        self.id = block_id
+        self.size = size
+
+
+class _DownloadFalso:
+    """Imita o StorageStreamDownloader: pedaços lidos em paralelo e escritos por posição."""
+
+    def __init__(self, blob, max_concurrency):
+        self.blob = blob
+        self.caminho = blob.caminho
+        self.max_concurrency = max_concurrency
+        self.pedaco = blob.pedaco
+        self.size = os.path.getsize(self.caminho)
+
+    def _ler(self, inicio):
+        with open(self.caminho, "rb") as ficheiro:
+            ficheiro.seek(inicio)
+            dados = ficheiro.read(self.pedaco)
+        self.blob.rede(len(dados))
+        return dados
+
+    def readall(self):
+        return b"".join(self._ler(inicio) for inicio in range(0, self.size, self.pedaco))
+
+    def readinto(self, stream):
+        lock = threading.Lock()
+        inicios = iter(range(0, self.size, self.pedaco))
+
+        def trabalhar():
+            while True:
+                with lock:
+                    inicio = next(inicios, None)
+                if inicio is None:
+                    return
+                dados = self._ler(inicio)
+                with lock:
+                    stream.seek(inicio)
+                    stream.write(dados)
+
+        threads = [threading.Thread(target=trabalhar) for _ in range(self.max_concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.size
+
+
+class BlobFalso:
+    """Blob de blocos em disco com a mesma interface que `transferencia.py` usa do BlobClient."""
+
+    def __init__(self, diretorio, nome, latencia=0.0, banda=None, pedaco=TAMANHO_BLOCO, falhar_depois_de=None):
+        self.pasta = os.path.join(diretorio, nome + ".blocos")
+        self.caminho = os.path.join(diretorio, nome)
+        self.latencia = latencia
+        self.banda = banda
+        self.pedaco = pedaco
+        self.falhar_depois_de = falhar_depois_de
+        self.blocos_recebidos = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def rede(self, tamanho=0):
+        """Tempo de um pedido numa ligação: ida e volta mais a transferência à banda da ligação."""
+        time.sleep(self.latencia + (tamanho / self.banda if self.banda else 0.0))
+
+    def get_block_list(self, tipo="committed"):
+        self.rede()
+        if not os.listdir(self.pasta) and not os.path.exists(self.caminho):
+            raise ResourceNotFoundError("blob inexistente")
+        pendentes = [_BlocoFalso(n, os.path.getsize(os.path.join(self.pasta, n))) for n in sorted(os.listdir(self.pasta))]
+        return [], pendentes
+
+    def stage_block(self, block_id, data, length=None):
+        with self._lock:
+            if self.falhar_depois_de is not None and self.blocos_recebidos >= self.falhar_depois_de:
+                raise ConnectionError("ligação perdida (simulada)")
+            self.blocos_recebidos += 1
+        self.rede(len(data))
+        with open(os.path.join(self.pasta, block_id), "wb") as ficheiro:
+            ficheiro.write(data)
+
+    def commit_block_list(self, blocos, metadata=None, content_settings=None):
+        self.rede()
+        with open(self.caminho, "wb") as destino:
+            for bloco in blocos:
+                with open(os.path.join(self.pasta, bloco.id), "rb") as origem:
+                    shutil.copyfileobj(origem, destino, PEDACO_DE_ESCRITA)
+        shutil.rmtree(self.pasta)
+        os.makedirs(self.pasta)
+
+    def upload_blob(self, data, overwrite=True, max_concurrency=1, metadata=None, content_settings=None):
+        """Envio num só fluxo: um pedido por pedaço, um depois do outro."""
+        with open(self.caminho, "wb") as destino:
+            while True:
+                pedaco = data.read(self.pedaco)
+                if not pedaco:
+                    break
+                self.rede(len(pedaco))
+                destino.write(pedaco)
+
+    def download_blob(self, max_concurrency=1):
+        return _DownloadFalso(self, max_concurrency)
+
+
+def criar_ficheiro(caminho, mb):
+    bloco = os.urandom(PEDACO_DE_ESCRITA)
+    with open(caminho, "wb") as ficheiro:
+        for _ in range(max(1, mb * 2 ** 20 // PEDACO_DE_ESCRITA)):
+            ficheiro.write(bloco)
+        resto = mb * 2 ** 20 % PEDACO_DE_ESCRITA
+        ficheiro.write(bloco[:resto])
+
+
+def medir(funcao):
+    """Segundos e pico de memória Python (MB) de uma chamada."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", default="1,64,512", help="Tamanhos dos ficheiros em MB, separados por vírgula.")
+    parser.add_argument("--bloco-mb", type=float, default=TAMANHO_BLOCO / 2 ** 20)
+    parser.add_argument("--concorrencia", type=int, default=MAX_CONCORRENCIA)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latência por pedido do serviço falso.")
+    parser.add_argument("--banda-mb", type=float, default=25.0, help="MB/s por ligação no serviço falso.")
+    parser.add_argument("--conexao", help="Connection string de um Blob Storage real ou do Azurite.")
+    parser.add_argument("--contentor", default="bench-transferencia")
+    args = parser.parse_args()
+    tamanho_bloco = int(args.bloco_mb * 2 ** 20)
+    latencia = args.latencia_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.conexao:
+            from azure.storage.blob import BlobServiceClient
+            from transferencia import opcoes_do_cliente
+            servico = BlobServiceClient.from_connection_string(args.conexao, **opcoes_do_cliente(tamanho_bloco))
+            contentor = servico.get_container_client(args.contentor)
+            if not contentor.exists():
+                contentor.create_container()
+
+            def blob(nome, falhar_depois_de=None):
+                # Sem serviço falso não há falha simulada: a retoma usa blocos de um envio parcial
+                return contentor.get_blob_client(nome)
+        else:
+            def blob(nome, falhar_depois_de=None):
+                return BlobFalso(tmp, nome, latencia, args.banda_mb * 2 ** 20, tamanho_bloco, falhar_depois_de)
+
+        for mb in [int(t) for t in args.tamanhos.split(",")]:
+            origem = os.path.join(tmp, f"origem-{mb}.bin")
+            criar_ficheiro(origem, mb)
+
+            def upload_simples():
+                with open(origem, "rb") as dados:
+                    blob(f"simples-{mb}").upload_blob(dados, overwrite=True, max_concurrency=1)
+
+            _, s_simples, _ = medir(upload_simples)
+            alvo = blob(f"blocos-{mb}")
+            _, s_blocos, _ = medir(lambda: carregar_em_blocos(alvo, origem, tamanho_bloco, args.concorrencia))
+            print(f"{mb:6d} MB | upload num só fluxo {mb / s_simples:8.1f} MB/s | "
+                  f"em blocos paralelos {mb / s_blocos:8.1f} MB/s")
+
+            if mb * 2 ** 20 <= 1024 * 2 ** 20:
+                _, s_readall, pico_readall = medir(lambda: len(alvo.download_blob(max_concurrency=1).readall()))
+                leitura = f"readall {mb / s_readall:8.1f} MB/s (pico {pico_readall:7.1f} MB)"
+            else:
+                leitura = "readall omitido (> 1 GB na memória)"
+            destino = os.path.join(tmp, f"baixado-{mb}.bin")
+            _, s_fluxo, pico_fluxo = medir(lambda: baixar_em_fluxo(alvo, destino, args.concorrencia))
+            print(f"{'':6s}      | download {leitura} | em fluxo {mb / s_fluxo:8.1f} MB/s (pico {pico_fluxo:7.1f} MB)")
+            assert os.path.getsize(destino) == os.path.getsize(origem)
+            os.remove(destino)
+
+            # Retoma: o envio cai a meio e a segunda execução só manda o que falta
+            blocos = max(1, -(-mb * 2 ** 20 // tamanho_bloco))
+            if blocos > 1 and not args.conexao:
+                interrompido = blob(f"retoma-{mb}", falhar_depois_de=blocos // 2)
+                try:
+                    carregar_em_blocos(interrompido, origem, tamanho_bloco, args.concorrencia)
+                except ConnectionError:
+                    pass
+                enviados, reaproveitados = carregar_em_blocos(blob(f"retoma-{mb}"), origem, tamanho_bloco,
+                                                              args.concorrencia)
+                print(f"{'':6s}      | retoma: {reaproveitados} de {blocos} blocos já estavam no serviço, "
+                      f"{enviados} reenviados")
+            os.remove(origem)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark da vigilância de trabalhos contra uma API de status simulada (local).
+
+Cada trabalho simulado dura um tempo sorteado (de segundos a minutos) e
+avança o `summary` documento a documento. Todos os trabalhos são
+acompanhados ao mesmo tempo, de duas formas:
+
+* vigilância fixa: uma thread por trabalho, consulta a cada 5 s (o laço antigo);
+* RastreadorDeTrabalhos: backoff exponencial com jitter e fim previsto pelo `summary`, num só laço de eventos.
+
+Para cada forma mostra o atraso médio e máximo entre o fim real do trabalho e a
+sua deteção, e o total de consultas de status. O servidor responde 429 com
+Retry-After a uma fração das consultas, para exercitar esse caminho. Antes
+disso, confere que um status que só responde 429 desiste depois de
+`MAX_RECUSAS_SEGUIDAS` recusas, em vez de consultar para sempre.
+
+Uso:
+    python bench_vigilancia.py --trabalhos 20 --duracao-max 120
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from vigilancia import MAX_RECUSAS_SEGUIDAS, RastreadorDeTrabalhos, aguardar
+
+
+class ApiDeStatusSimulada:
+    """Servidor HTTP local: GET /batches/<id> devolve o status de um trabalho com duração fixa."""
+
+    def __init__(self, duracoes, documentos=10, fracao_429=0.05, retry_after="1"):
+        self.duracoes = duracoes
+        self.documentos = documentos
+        self.fracao_429 = fracao_429
+        self.retry_after = retry_after
+        self.inicio = None
+        self.consultas = 0
+        self.recusadas = 0
+        self._lock = threading.Lock()
+        simulada = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with simulada._lock:
+                    simulada.consultas += 1
+                    recusar = random.random() < simulada.fracao_429
+                    simulada.recusadas += recusar
+                if recusar:
+                    self.send_response(429)
+                    self.send_header("Retry-After", simulada.retry_after)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                corpo = json.dumps(simulada.status(self.path.rsplit("/", 1)[-1])).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}/batches"
+
+    def status(self, trabalho):
+        decorrido = time.monotonic() - self.inicio
+        duracao = self.duracoes[int(trabalho)]
+        prontos = min(self.documentos, int(self.documentos * decorrido / duracao))
+        estado = "Succeeded" if decorrido >= duracao else ("Running" if prontos else "NotStarted")
+        return {"id": f"{int(trabalho):08d}", "status": estado,
+                "summary": {"total": self.documentos, "success": prontos, "failed": 0,
+                            "inProgress": 0 if estado == "Succeeded" else 1,
+                            "notYetStarted": self.documentos - prontos - (estado != "Succeeded"), "cancelled": 0}}
+
+    def __enter__(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.inicio = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def vigilancia_fixa(status_url):
+    """O laço original: requests.get avulso a cada 5 s, sem timeout."""
+    while True:
+        status_response = requests.get(status_url)
+        if status_response.status_code == 429:
+            time.sleep(5)
+            continue
+        if status_response.json()['status'] in ['Succeeded', 'Failed', 'Canceled']:
+            return time.monotonic()
+        time.sleep(5)
+
+
+def rodada(nome, duracoes, vigiar):
+    with ApiDeStatusSimulada(duracoes) as api:
+        urls = [f"{api.url}/{i}" for i in range(len(duracoes))]
+        detectados = vigiar(urls)
+        atrasos = [fim - (api.inicio + duracao) for fim, duracao in zip(detectados, duracoes)]
+    print(f"{nome:<24} atraso médio {sum(atrasos) / len(atrasos):5.2f} s, máx. {max(atrasos):5.2f} s | "
+          f"consultas {api.consultas:5d} (429: {api.recusadas})")
+
+
+def recusas_sem_fim():
+    """Um status que só responde 429 tem de levantar HTTPError depois do teto de recusas seguidas."""
+    with ApiDeStatusSimulada([60.0], fracao_429=1.0, retry_after="0") as api:
+        with RastreadorDeTrabalhos("chave", ao_progredir=None) as r:
+            try:
+                asyncio.run(r.acompanhar(f"{api.url}/0"))
+                erro = None
+            except requests.HTTPError as ex:
+                erro = ex
+    ok = erro is not None and erro.response.status_code == 429 and api.consultas == MAX_RECUSAS_SEGUIDAS + 1
+    print(f"{'só 429':<24} {api.consultas} consultas, depois {'HTTPError 429' if erro else 'nenhum erro'} | "
+          f"{'OK' if ok else 'DIVERGENTE'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trabalhos", type=int, default=20)
+    parser.add_argument("--duracao-min", type=float, default=1.0)
+    parser.add_argument("--duracao-max", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    duracoes = [rng.uniform(args.duracao_min, args.duracao_max) for _ in range(args.trabalhos)]
+
+    def fixa(urls):
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            return list(executor.map(vigilancia_fixa, urls))
+
+    def rastreador(urls):
+        detectados = {}
+
+        def ao_progredir(status_url, status_data):
+            if status_data['status'] == 'Succeeded':
+                detectados[status_url] = time.monotonic()
+
+        with RastreadorDeTrabalhos("chave", ao_progredir=ao_progredir) as r:
+            aguardar(r, urls)
+        return [detectados[url] for url in urls]
+
+    recusas_sem_fim()
+    rodada("vigilância fixa (5 s)", duracoes, fixa)
+    rodada("RastreadorDeTrabalhos", duracoes, rastreador)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,48 @@
+import argparse
+import glob
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
 import requests
 from dotenv import load_dotenv
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ContentSettings
+
+from limitador import LimitadorDeTaxa
+from manifesto import Manifesto, impressoes_digitais
+from transferencia import blob_atualizado, baixar_em_fluxo, carregar_em_blocos, opcoes_do_ambiente, opcoes_do_cliente
+from vigilancia import RastreadorDeTrabalhos, aguardar
+
+# Um 429 não derruba a missão: o pedido volta para a fila do limitador até este teto
+MAX_RECUSAS = 20
+# Limite de documentos por trabalho da API; lotes maiores viram vários trabalhos vigiados em paralelo
+MAX_DOCUMENTOS_POR_TRABALHO = 1000
 
-def vanguarda_upload(blob_service_client, local_path, container_name, blob_name):
-    """Carrega o documento local para o contentor de origem."""
+AUTENTICACAO = { "type": "ManagedIdentity" }
+
+def vanguarda_upload(blob_service_client, local_path, container_name, blob_name, impressoes=None, conferir=True):
+    """
+    Carrega o documento local para o contentor de origem, em blocos paralelos e
+    retomáveis. Com `impressoes` (MD5, SHA-256), os hashes ficam gravados no
+    blob e, com `conferir`, o upload é dispensado se o blob já tem o mesmo
+    conteúdo.
+    """
     print(f"A iniciar upload de '{local_path}' para o contentor '{container_name}'...")
     try:
-        container_client = blob_service_client.get_container_client(container_name)
-        with open(local_path, "rb") as data:
-            container_client.upload_blob(name=blob_name, data=data, overwrite=True)
-        print("Upload concluído com sucesso.")
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+        metadata = content_settings = None
+        if impressoes:
+            md5, sha256 = impressoes
+            if conferir and blob_atualizado(blob_client, md5, sha256):
+                print("Origem inalterada no contentor: upload dispensado.")
+                return True
+            metadata, content_settings = {'sha256': sha256}, ContentSettings(content_md5=md5)
+        enviados, reaproveitados = carregar_em_blocos(blob_client, local_path, metadata=metadata,
+                                                      content_settings=content_settings, **opcoes_do_ambiente())
+        retoma = f" (retomado: {reaproveitados} blocos já estavam no serviço)" if reaproveitados else ""
+        print(f"Upload concluído com sucesso: {enviados} blocos enviados{retoma}.")
         return True
     except FileNotFoundError:
         print(f"ERRO CRÍTICO: Ficheiro local não encontrado em '{local_path}'. Verifique o caminho no ficheiro .env.")
@@ -37,94 +67,361 @@ def preparar_zona_alvo(blob_service_client, container_name, blob_name):
         print(f"ERRO AO LIMPAR ZONA ALVO: {ex}")
         return False
 
-def corpo_principal_traduzir(translator_key, translator_endpoint, account_name, source_container, target_container, target_lang):
-    """Aciona a API de tradução usando a doutrina superior (Identidade Gerida)."""
-    url_container_origem = f"https://{account_name}.blob.core.windows.net/{source_container}"
-    url_container_destino = f"https://{account_name}.blob.core.windows.net/{target_container}"
+def segundos_do_retry_after(retry_after, padrao):
+    """Segundos indicados pelo cabeçalho `Retry-After`; `padrao` se ausente ou inválido."""
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return padrao
+
+def pedido_com_limite(limitador, metodo, url, caracteres=0, **kwargs):
+    """
+    Envia um pedido à API passando pela fila do limitador. Em 429 o limitador
+    reduz a taxa e o pedido espera o `Retry-After` antes de voltar à fila, em
+    vez de falhar com HTTPError.
+    """
+    for recusa in range(MAX_RECUSAS + 1):
+        limitador.adquirir(caracteres)
+        response = requests.request(metodo, url, **kwargs)
+        if response.status_code != 429 or recusa == MAX_RECUSAS:
+            break
+        limitador.registrar_429()
+        espera = segundos_do_retry_after(response.headers.get('Retry-After'), min(30, 2 ** recusa))
+        print(f"Limite de taxa atingido (429). Nova tentativa em {espera:.0f} s...")
+        time.sleep(espera)
+    if response.ok:
+        limitador.registrar_sucesso(caracteres)
+    return response
+
+def url_do_contentor(account_name, container_name, pasta=None):
+    url = f"https://{account_name}.blob.core.windows.net/{container_name}"
+    return f"{url}/{pasta}" if pasta else url
+
+def url_do_blob(account_name, container_name, blob_name):
+    return f"{url_do_contentor(account_name, container_name)}/{quote(blob_name)}"
+
+def entrada_de_documento(account_name, source_container, target_container, blob_name, target_lang):
+    """
+    Entrada de um só documento: com `storageType` "File", a origem e o alvo são
+    as URLs dos próprios blobs, e só esse blob é traduzido (um filtro `prefix`
+    com o nome apanharia também `<nome>.bak` e afins).
+    """
+    return {
+        "storageType": "File",
+        "source": {
+            "sourceUrl": url_do_blob(account_name, source_container, blob_name),
+            "storageSource": "AzureBlob",
+            "authentication": AUTENTICACAO
+        },
+        "targets": [{
+            "targetUrl": url_do_blob(account_name, target_container, blob_name),
+            "language": target_lang,
+            "storageSource": "AzureBlob",
+            "authentication": AUTENTICACAO
+        }]
+    }
+
+def montar_entradas(account_name, source_container, target_container, pasta, idiomas_por_subpasta):
+    """
+    Uma entrada por subpasta do lote, filtrada pelo prefixo `<pasta>/<subpasta>/`,
+    com um alvo por idioma em `<pasta>/<idioma>/`. A pasta do lote é exclusiva
+    da operação, então o prefixo apanha exatamente os documentos carregados
+    para a subpasta (ver `agrupar_por_idiomas`).
+    """
+    entradas = []
+    for subpasta, idiomas in idiomas_por_subpasta.items():
+        entradas.append({
+            "source": {
+                "sourceUrl": url_do_contentor(account_name, source_container),
+                "storageSource": "AzureBlob",
+                "filter": { "prefix": f"{pasta}/{subpasta}/" },
+                "authentication": AUTENTICACAO
+            },
+            "targets": [{
+                "targetUrl": url_do_contentor(account_name, target_container, f"{pasta}/{lang}"),
+                "language": lang,
+                "storageSource": "AzureBlob",
+                "authentication": AUTENTICACAO
+            } for lang in idiomas]
+        })
+    return entradas
 
+def corpo_principal_traduzir(translator_key, translator_endpoint, account_name, source_container, target_container, target_lang,
+                             limitador=None, caracteres=0, blob_name=None, entradas=None):
+    """
+    Aciona a API de tradução usando a doutrina superior (Identidade Gerida).
+    Com `blob_name`, só esse documento é traduzido; com `entradas` (ver
+    `montar_entradas`), cada entrada é um trabalho com vários documentos e
+    idiomas, e todos são vigiados em paralelo.
+    """
+    limitador = limitador or LimitadorDeTaxa()
     endpoint = f"{translator_endpoint}/translator/text/batch/v1.1"
     path = "/batches"
     constructed_url = endpoint + path
 
-    payload = {
-        "inputs": [
-            {
+    if entradas is None:
+        if blob_name:
+            entradas = [entrada_de_documento(account_name, source_container, target_container, blob_name, target_lang)]
+        else:
+            entradas = [{
                 "source": {
-                    "sourceUrl": url_container_origem,
+                    "sourceUrl": url_do_contentor(account_name, source_container),
                     "storageSource": "AzureBlob",
                     "authentication": { "type": "ManagedIdentity" }
                 },
                 "targets": [
                     {
-                        "targetUrl": url_container_destino,
+                        "targetUrl": url_do_contentor(account_name, target_container),
                         "language": target_lang,
                         "storageSource": "AzureBlob",
                         "authentication": { "type": "ManagedIdentity" }
                     }
                 ]
-            }
-        ]
-    }
-    
+            }]
     headers = {'Ocp-Apim-Subscription-Key': translator_key, 'Content-Type': 'application/json'}
+    # Cada entrada tem no máximo MAX_DOCUMENTOS_POR_TRABALHO documentos (o limite da API por trabalho): um trabalho por entrada
+    grupos = [[entrada] for entrada in entradas]
 
     print("\nA iniciar a operação de tradução de documentos...")
     try:
-        response = requests.post(constructed_url, headers=headers, json=payload)
-        response.raise_for_status()
-        status_url = response.headers['Operation-Location']
+        status_urls = []
+        for grupo in grupos:
+            response = pedido_com_limite(limitador, 'POST', constructed_url, caracteres * len(grupo) // len(entradas),
+                                         headers=headers, json={"inputs": grupo})
+            response.raise_for_status()
+            status_urls.append(response.headers['Operation-Location'])
         
-        print("Operação iniciada com sucesso. A iniciar vigilância ativa...")
-        while True:
-            status_response = requests.get(status_url, headers={'Ocp-Apim-Subscription-Key': translator_key})
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            current_status = status_data['status']
-            print(f"Status atual da operação: {current_status}")
-            if current_status in ['Succeeded', 'Failed', 'Canceled']:
-                break
-            time.sleep(5)
-
-        if status_data['status'] == 'Succeeded':
+        print(f"Operação iniciada com sucesso ({len(status_urls)} trabalho(s)). A iniciar vigilância ativa...")
+        with RastreadorDeTrabalhos(translator_key, limitador) as rastreador:
+            resultados, segundos = aguardar(rastreador, status_urls)
+        print(f"Vigilância concluída em {segundos:.1f} s com {rastreador.consultas} consultas de status.")
+
+        vitoria = True
+        for status_data in resultados:
+            if status_data['status'] != 'Succeeded':
+                vitoria = False
+                print(f"\n--- FALHA NA MISSÃO: {status_data['status']} ---")
+                if 'error' in status_data:
+                    print(f"Detalhe do erro: {status_data['error']['message']}")
+        if vitoria:
             print("\n--- VITÓRIA! A TRADUÇÃO FOI CONCLUÍDA. ---")
-            return True
-        else:
-            print(f"\n--- FALHA NA MISSÃO: {status_data['status']} ---")
-            if 'error' in status_data:
-                print(f"Detalhe do erro: {status_data['error']['message']}")
-            return False
+            resumos = [status_data['summary'] for status_data in resultados if status_data.get('summary')]
+            if resumos:
+                print(f"Documentos: {sum(r['success'] for r in resumos)} traduzidos, "
+                      f"{sum(r['failed'] for r in resumos)} com falha, de {sum(r['total'] for r in resumos)}.")
+        return vitoria
             
     except requests.exceptions.HTTPError as http_err:
         print(f"\n--- FALHA CRÍTICA NA SUBMISSÃO: {http_err} ---")
-        print(f"Relatório do servidor: {response.text}")
+        print(f"Relatório do servidor: {http_err.response.text}")
         return False
     except Exception as ex:
         print(f"Ocorreu um erro na tradução: {ex}")
         return False
 
+def caminho_traduzido(local_path):
+    return os.path.join(os.path.dirname(local_path), "traduzido_" + os.path.basename(local_path))
+
 def retaguarda_download(blob_service_client, container_name, blob_name, local_path):
     """Baixa o documento traduzido para a máquina local."""
-    download_path = os.path.join(os.path.dirname(local_path), "traduzido_" + os.path.basename(local_path))
+    download_path = caminho_traduzido(local_path)
     print(f"\nA iniciar download de '{blob_name}' do contentor '{container_name}'...")
     try:
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-        with open(download_path, "wb") as download_file:
-            download_file.write(blob_client.download_blob().readall())
+        baixar_blob(blob_service_client, container_name, blob_name, download_path)
         print(f"Download concluído. Ficheiro guardado em: '{download_path}'")
         return True
     except Exception as ex:
         print(f"ERRO NO DOWNLOAD: {ex}")
         return False
 
-def main():
-    """Ponto de Comando Principal da Operação."""
+def baixar_blob(blob_service_client, container_name, blob_name, download_path):
+    """Grava o blob em disco em fluxo, sem carregar o documento inteiro na memória."""
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+    return baixar_em_fluxo(blob_client, download_path, opcoes_do_ambiente()['max_concorrencia'])
+
+# --- OPERAÇÃO EM LOTE: N documentos × M idiomas num único trabalho de tradução ---
+
+def reconhecer_terreno(entrada):
+    """
+    Lista os documentos de um diretório (recursivo) ou de um padrão glob.
+    Retorna [(caminho local, nome relativo)]; o nome relativo vira o nome do
+    blob dentro da pasta do lote.
+    """
+    if os.path.isdir(entrada):
+        base = entrada
+        caminhos = glob.glob(os.path.join(entrada, "**", "*"), recursive=True)
+    else:
+        base = None
+        caminhos = glob.glob(entrada, recursive=True)
+    documentos, nomes = [], set()
+    for caminho in sorted(c for c in caminhos if os.path.isfile(c)):
+        nome = os.path.relpath(caminho, base) if base else os.path.basename(caminho)
+        nome = nome.replace(os.sep, "/")
+        if nome in nomes:
+            raise ValueError(f"Dois documentos com o mesmo nome no lote: '{nome}'. Use um diretório em vez do padrão.")
+        nomes.add(nome)
+        documentos.append((caminho, nome))
+    return documentos
+
+def vanguarda_upload_em_lote(blob_service_client, documentos, container_name, pasta, concorrencia):
+    """
+    Carrega em paralelo os documentos (caminho, nome, impressões ou None);
+    retorna os nomes dos blobs carregados. As impressões ficam gravadas em
+    cada blob, como no modo de um só documento, mas sem a conferência do blob
+    existente: a pasta do lote é nova, e a consulta nunca acertaria.
+    """
+    def carregar(documento):
+        caminho, nome, impressoes = documento
+        blob_name = f"{pasta}/{nome}"
+        enviado = vanguarda_upload(blob_service_client, caminho, container_name, blob_name, impressoes, conferir=False)
+        return blob_name if enviado else None
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        return [blob_name for blob_name in executor.map(carregar, documentos) if blob_name]
+
+def agrupar_por_idiomas(pendentes):
+    """
+    Reparte os documentos pendentes em subpastas numeradas do lote: os que vão
+    para o mesmo conjunto de idiomas ficam juntos, até MAX_DOCUMENTOS_POR_TRABALHO
+    por subpasta. Retorna {subpasta: (idiomas, documentos)}.
+    """
+    por_idiomas = {}
+    for documento in pendentes:
+        por_idiomas.setdefault(tuple(documento[2]), []).append(documento)
+    subpastas = {}
+    for idiomas, documentos in por_idiomas.items():
+        for i in range(0, len(documentos), MAX_DOCUMENTOS_POR_TRABALHO):
+            subpastas[str(len(subpastas))] = (list(idiomas), documentos[i:i + MAX_DOCUMENTOS_POR_TRABALHO])
+    return subpastas
+
+def retaguarda_download_em_lote(blob_service_client, container_name, pasta, target_langs, saida, concorrencia):
+    """
+    Baixa em paralelo tudo o que o trabalho escreveu em `<pasta>/<idioma>/`
+    para `<saida>/<idioma>/<nome relativo>`. Retorna (caminhos baixados, falhas).
+    """
+    container_client = blob_service_client.get_container_client(container_name)
+    tarefas = []
+    for lang in target_langs:
+        prefixo = f"{pasta}/{lang}/"
+        for blob in container_client.list_blobs(name_starts_with=prefixo):
+            nome = blob.name[len(prefixo):]
+            # O serviço pode repetir o caminho de origem (com a pasta do lote) dentro do alvo
+            if nome.startswith(f"{pasta}/"):
+                nome = nome[len(pasta) + 1:]
+            # Depois vem a subpasta de `agrupar_por_idiomas`
+            nome = nome.split("/", 1)[-1]
+            tarefas.append((blob.name, destino_no_lote(saida, lang, nome)))
+
+    def baixar(tarefa):
+        blob_name, destino = tarefa
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            baixar_blob(blob_service_client, container_name, blob_name, destino)
+            return destino
+        except Exception as ex:
+            print(f"ERRO NO DOWNLOAD de '{blob_name}': {ex}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(baixar, tarefas))
+    return [destino for destino in resultados if destino], resultados.count(None)
+
+def destino_no_lote(saida, lang, nome):
+    return os.path.join(saida, lang, *nome.split("/"))
+
+def operacao_em_lote(argv, config, blob_service_client, limitador, manifesto=None):
+    """Modo em lote: `python doctranslate.py --entrada docs/ --para en,es,fr`."""
+    parser = argparse.ArgumentParser(description="Tradução de vários documentos para vários idiomas num único trabalho.")
+    parser.add_argument("--entrada", required=True, help="Diretório (recursivo) ou padrão glob, ex.: 'docs/*.docx'.")
+    parser.add_argument("--para", required=True, help="Idiomas de destino separados por vírgula, ex.: en,es,fr.")
+    parser.add_argument("--saida", default="traduzidos", help="Diretório local dos resultados (um subdiretório por idioma).")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Uploads/downloads simultâneos.")
+    parser.add_argument("--forcar", action="store_true", help="Ignora o manifesto e retraduz todos os documentos.")
+    args = parser.parse_args(argv)
+    if args.forcar:
+        manifesto = None
+    target_langs = [lang.strip() for lang in args.para.split(",") if lang.strip()]
+
+    try:
+        documentos = reconhecer_terreno(args.entrada)
+    except ValueError as ex:
+        print(f"ERRO CRÍTICO: {ex}")
+        return False
+    if not documentos or not target_langs:
+        print("ERRO CRÍTICO: Nenhum documento encontrado ou nenhum idioma de destino indicado.")
+        return False
+
+    # Pasta exclusiva desta operação: nada do que já está nos contentores é retraduzido ou sobrescrito
+    pasta = time.strftime("lote-%Y%m%d-%H%M%S")
+    print(f"--- Operação em lote '{pasta}': {len(documentos)} documentos × {len(target_langs)} idiomas ---")
+
+    # Modo incremental: pares (conteúdo, idioma) já traduzidos saem do manifesto, sem ir à nuvem
+    pendentes = [(caminho, nome, target_langs, None) for caminho, nome in documentos]
+    impressoes = {}
+    if manifesto is not None:
+        with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+            impressoes = dict(zip((caminho for caminho, _ in documentos),
+                                  executor.map(lambda documento: impressoes_digitais(documento[0]), documentos)))
+        pendentes = []
+        for caminho, nome in documentos:
+            sha256 = impressoes[caminho][1]
+            idiomas = [lang for lang in target_langs
+                       if not manifesto.servir(sha256, lang, destino_no_lote(args.saida, lang, nome))]
+            if idiomas:
+                pendentes.append((caminho, nome, idiomas, sha256))
+        print(f"Manifesto: {manifesto.servidos} traduções inalteradas servidas localmente; "
+              f"{len(pendentes)} documentos vão à nuvem.")
+        if not pendentes:
+            return True
+
+    # Cada documento vai para `<pasta>/<subpasta>/<nome>`; a subpasta agrupa os que vão para os mesmos idiomas
+    subpastas = agrupar_por_idiomas(pendentes)
+    envios = [(caminho, f"{subpasta}/{nome}", impressoes.get(caminho)) for subpasta, (_, documentos) in subpastas.items()
+              for caminho, nome, _, _ in documentos]
+    inicio = time.perf_counter()
+    blob_names = vanguarda_upload_em_lote(blob_service_client, envios, config['SOURCE_CONTAINER_NAME'], pasta, args.concorrencia)
+    print(f"Uploads: {len(blob_names)} de {len(pendentes)} em {time.perf_counter() - inicio:.1f} s.")
+    if not blob_names:
+        return False
+
+    # Subpastas sem nenhum upload bem-sucedido não entram no trabalho (o filtro não encontraria documentos)
+    carregadas = {blob_name.split("/")[1] for blob_name in blob_names}
+    entradas = montar_entradas(blob_service_client.account_name, config['SOURCE_CONTAINER_NAME'],
+                               config['TARGET_CONTAINER_NAME'], pasta,
+                               {subpasta: idiomas for subpasta, (idiomas, _) in subpastas.items() if subpasta in carregadas})
+    caracteres = sum(os.path.getsize(caminho) * len(idiomas) for caminho, _, idiomas, _ in pendentes)
+    if not corpo_principal_traduzir(config['AZURE_TRANSLATOR_KEY'], config['AZURE_TRANSLATOR_ENDPOINT'],
+                                    blob_service_client.account_name, config['SOURCE_CONTAINER_NAME'],
+                                    config['TARGET_CONTAINER_NAME'], None, limitador, caracteres, entradas=entradas):
+        return False
+
+    inicio = time.perf_counter()
+    baixados, falhas = retaguarda_download_em_lote(blob_service_client, config['TARGET_CONTAINER_NAME'], pasta,
+                                                   target_langs, args.saida, args.concorrencia)
+    print(f"Downloads: {len(baixados)} ficheiros em '{args.saida}' ({falhas} com erro) em {time.perf_counter() - inicio:.1f} s.")
+    if manifesto is not None:
+        baixados = set(baixados)
+        for caminho, nome, idiomas, sha256 in pendentes:
+            for lang in idiomas:
+                destino = destino_no_lote(args.saida, lang, nome)
+                if destino in baixados:
+                    manifesto.registar(sha256, lang, destino, origem=caminho)
+        manifesto.gravar()
+    return falhas == 0 and len(baixados) == sum(len(idiomas) for _, _, idiomas, _ in pendentes)
+
+def main(argv=None):
+    """Ponto de Comando Principal da Operação. Com argumentos, entra no modo em lote."""
     load_dotenv()
+    argv = sys.argv[1:] if argv is None else argv
     
     # --- CARREGAR E VALIDAR INTELIGÊNCIA DO .ENV ---
     required_vars = [
         'AZURE_TRANSLATOR_KEY', 'AZURE_TRANSLATOR_ENDPOINT', 'AZURE_STORAGE_CONNECTION_STRING',
-        'SOURCE_CONTAINER_NAME', 'TARGET_CONTAINER_NAME', 'LOCAL_FILE_PATH', 'BLOB_NAME_IN_CLOUD', 'TARGET_LANGUAGE'
+        'SOURCE_CONTAINER_NAME', 'TARGET_CONTAINER_NAME'
     ]
+    if not argv:
+        # Operação de um só documento: o alvo vem do dossiê
+        required_vars += ['LOCAL_FILE_PATH', 'BLOB_NAME_IN_CLOUD', 'TARGET_LANGUAGE']
     config = {var: os.getenv(var) for var in required_vars}
 
     if any(value is None for value in config.values()):
@@ -134,17 +431,53 @@ def main():
     print("--- Dossiê de Missão Validado. A iniciar Operação 'Pipeline de Batalha Total' ---")
     
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(config['AZURE_STORAGE_CONNECTION_STRING'])
+        blob_service_client = BlobServiceClient.from_connection_string(
+            config['AZURE_STORAGE_CONNECTION_STRING'], **opcoes_do_cliente(opcoes_do_ambiente()['tamanho_bloco']))
         storage_account_name = blob_service_client.account_name
     except Exception as ex:
         print(f"ERRO CRÍTICO: A Connection String do Armazenamento é inválida. {ex}")
         sys.exit(1)
 
+    # --- CONTROLE DE TRÁFEGO: cota de caracteres/pedidos do plano (opcional no .env) ---
+    limitador = LimitadorDeTaxa(
+        caracteres_por_minuto=float(os.getenv('TRADUTOR_CARACTERES_POR_MINUTO', 0)) or None,
+        pedidos_por_segundo=float(os.getenv('TRADUTOR_PEDIDOS_POR_SEGUNDO', 0)) or None,
+    )
+    # --- MODO INCREMENTAL: o manifesto lembra o que já foi traduzido (TRADUCAO_INCREMENTAL=0 desliga) ---
+    manifesto = None
+    if os.getenv('TRADUCAO_INCREMENTAL', '1') != '0':
+        manifesto = Manifesto(os.getenv('MANIFESTO_TRADUCOES', 'manifesto_traducoes.json'))
+
     # --- EXECUTAR FASES DA MISSÃO ---
-    if vanguarda_upload(blob_service_client, config['LOCAL_FILE_PATH'], config['SOURCE_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD']):
-        if preparar_zona_alvo(blob_service_client, config['TARGET_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD']):
-            if corpo_principal_traduzir(config['AZURE_TRANSLATOR_KEY'], config['AZURE_TRANSLATOR_ENDPOINT'], storage_account_name, config['SOURCE_CONTAINER_NAME'], config['TARGET_CONTAINER_NAME'], config['TARGET_LANGUAGE']):
-                retaguarda_download(blob_service_client, config['TARGET_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD'], config['LOCAL_FILE_PATH'])
+    if argv:
+        sucesso = operacao_em_lote(argv, config, blob_service_client, limitador, manifesto)
+    else:
+        # Estimativa do consumo: o tamanho do documento, em caracteres, por idioma de destino
+        try:
+            caracteres = os.path.getsize(config['LOCAL_FILE_PATH'])
+            impressoes = impressoes_digitais(config['LOCAL_FILE_PATH']) if manifesto is not None else None
+        except OSError:
+            caracteres, impressoes = 0, None
+        download_path = caminho_traduzido(config['LOCAL_FILE_PATH'])
+        sucesso = False
+        if impressoes and manifesto.servir(impressoes[1], config['TARGET_LANGUAGE'], download_path):
+            print(f"\nDocumento inalterado: tradução servida pelo manifesto em '{download_path}' "
+                  f"(sem upload, tradução nem download).")
+            sucesso = True
+        elif vanguarda_upload(blob_service_client, config['LOCAL_FILE_PATH'], config['SOURCE_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD'], impressoes):
+            if preparar_zona_alvo(blob_service_client, config['TARGET_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD']):
+                if corpo_principal_traduzir(config['AZURE_TRANSLATOR_KEY'], config['AZURE_TRANSLATOR_ENDPOINT'], storage_account_name, config['SOURCE_CONTAINER_NAME'], config['TARGET_CONTAINER_NAME'], config['TARGET_LANGUAGE'],
+                                            limitador, caracteres, blob_name=config['BLOB_NAME_IN_CLOUD']):
+                    sucesso = retaguarda_download(blob_service_client, config['TARGET_CONTAINER_NAME'], config['BLOB_NAME_IN_CLOUD'], config['LOCAL_FILE_PATH'])
+                    if sucesso and impressoes:
+                        manifesto.registar(impressoes[1], config['TARGET_LANGUAGE'], download_path, origem=config['LOCAL_FILE_PATH'])
+                        manifesto.gravar()
+
+    fila = limitador.metricas()
+    print(f"\nLimitador: {fila['atendidos']} pedidos à API, {fila['respostas_429']} respostas 429, "
+          f"espera média {fila['espera_media_s']:.2f} s (máx. {fila['espera_maxima_s']:.2f} s), maior fila {fila['maior_fila']}.")
+    if not sucesso:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Manifesto local das traduções já feitas, para o modo incremental.
+
+Cada documento é identificado pelo SHA-256 do seu conteúdo, não pelo nome nem
+pela data. O manifesto guarda, para cada par (hash da origem, idioma de
+destino), o ficheiro traduzido que já está no disco. Um documento inalterado
+é servido daqui, sem upload, sem trabalho de tradução e sem download. A
+saída registada só vale enquanto o ficheiro mantém o tamanho e a data de
+modificação gravados; se foi apagada ou mexida, o documento volta a ser
+traduzido.
+
+O manifesto é um JSON pequeno, gravado de forma atómica (ficheiro temporário
+e `os.replace`).
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+PEDACO_DE_LEITURA = 1024 * 1024
+
+
+def impressoes_digitais(local_path):
+    """MD5 (bytes, como o `content_md5` do Blob) e SHA-256 (hex) do ficheiro, numa só leitura."""
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    with open(local_path, "rb") as ficheiro:
+        while pedaco := ficheiro.read(PEDACO_DE_LEITURA):
+            md5.update(pedaco)
+            sha256.update(pedaco)
+    return md5.digest(), sha256.hexdigest()
+
+
+class Manifesto:
+    def __init__(self, caminho="manifesto_traducoes.json"):
+        self.caminho = caminho
+        self.entradas = {}
+        if os.path.exists(caminho):
+            try:
+                with open(caminho, encoding="utf-8") as ficheiro:
+                    self.entradas = json.load(ficheiro)
+            except (OSError, ValueError) as ex:
+                # Um manifesto ilegível só custa retraduzir: não deve parar a operação
+                print(f"AVISO: Manifesto '{caminho}' ilegível ({ex}); a começar com um manifesto vazio.")
+                self.entradas = {}
+        # Métricas
+        self.servidos = 0
+        self.registados = 0
+
+    @staticmethod
+    def _chave(sha256, idioma):
+        return f"{sha256}:{idioma}"
+
+    def procurar(self, sha256, idioma):
+        """Caminho da tradução registada para (hash, idioma) se ainda está intacta no disco; senão None."""
+        entrada = self.entradas.get(self._chave(sha256, idioma))
+        if not entrada:
+            return None
+        try:
+            estado = os.stat(entrada['saida'])
+        except OSError:
+            return None
+        if estado.st_size != entrada['tamanho'] or estado.st_mtime_ns != entrada['mtime_ns']:
+            return None
+        return entrada['saida']
+
+    def servir(self, sha256, idioma, download_path):
+        """
+        Entrega a tradução registada em `download_path` (cópia se estiver
+        noutro caminho). Retorna True se o documento não precisa de ir à nuvem.
+        """
+        registada = self.procurar(sha256, idioma)
+        if registada is None:
+            return False
+        if os.path.abspath(registada) != os.path.abspath(download_path):
+            os.makedirs(os.path.dirname(os.path.abspath(download_path)), exist_ok=True)
+            shutil.copyfile(registada, download_path)
+        self.servidos += 1
+        return True
+
+    def registar(self, sha256, idioma, download_path, origem=None):
+        estado = os.stat(download_path)
+        self.entradas[self._chave(sha256, idioma)] = {
+            "saida": os.path.abspath(download_path),
+            "tamanho": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+            "origem": origem,
+            "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.registados += 1
+
+    def gravar(self):
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as ficheiro:
+            json.dump(self.entradas, ficheiro, ensure_ascii=False, indent=1)
+        os.replace(temporario, self.caminho)
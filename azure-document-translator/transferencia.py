@@ -0,0 +1,127 @@
+"""
+Camada de transferência de ficheiros grandes entre a máquina local e o Blob Storage.
+
+Upload em blocos: o ficheiro é lido em blocos de tamanho fixo, enviados em
+paralelo (`stage_block`) e confirmados no fim com um único
+`commit_block_list`. Os identificadores dos blocos são determinísticos para
+cada versão do ficheiro (tamanho, data de modificação e tamanho do bloco).
+Assim, se o upload for interrompido, a próxima execução consulta os blocos
+já preparados no serviço, envia só os que faltam e confirma tudo. Os blocos
+não confirmados ficam guardados no serviço por 7 dias. Um ficheiro que cabe
+num só bloco segue num único pedido.
+
+Download em fluxo: `download_blob(...).readinto(ficheiro)` escreve cada
+pedaço direto no disco, em paralelo, sem juntar o documento inteiro na
+memória. O ficheiro só toma o nome final quando está completo.
+
+Modo incremental: o upload grava o SHA-256 nos metadados do blob e o MD5 em
+`content_md5`; `blob_atualizado` compara-os com o ficheiro local para saltar
+uploads de conteúdo que o serviço já tem.
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobBlock
+
+TAMANHO_BLOCO = 8 * 1024 * 1024
+MAX_CONCORRENCIA = 8
+
+
+def opcoes_do_ambiente():
+    """Tamanho de bloco (MB) e concorrência por ficheiro a partir de variáveis de ambiente (opcionais)."""
+    return {
+        "tamanho_bloco": int(float(os.getenv('TRANSFERENCIA_TAMANHO_BLOCO_MB', TAMANHO_BLOCO / 2 ** 20)) * 2 ** 20),
+        "max_concorrencia": int(os.getenv('TRANSFERENCIA_CONCORRENCIA', MAX_CONCORRENCIA)),
+    }
+
+
+def opcoes_do_cliente(tamanho_bloco=TAMANHO_BLOCO):
+    """Configuração do BlobServiceClient para pedaços de download do mesmo tamanho dos blocos."""
+    return {"max_block_size": tamanho_bloco, "max_chunk_get_size": tamanho_bloco,
+            "max_single_get_size": tamanho_bloco}
+
+
+def identificadores_dos_blocos(local_path, tamanho_bloco):
+    """IDs de bloco (todos do mesmo comprimento, como o serviço exige) para esta versão do ficheiro."""
+    estado = os.stat(local_path)
+    assinatura = hashlib.blake2b(f"{estado.st_size}:{estado.st_mtime_ns}:{tamanho_bloco}".encode(),
+                                 digest_size=6).hexdigest()
+    quantidade = max(1, -(-estado.st_size // tamanho_bloco))
+    return [f"{assinatura}-{indice:06d}" for indice in range(quantidade)], estado.st_size
+
+
+def blocos_ja_preparados(blob_client):
+    """Blocos que o serviço já tem para este blob ({id: tamanho}), confirmados ou não."""
+    try:
+        confirmados, pendentes = blob_client.get_block_list('all')
+    except ResourceNotFoundError:
+        return {}
+    return {bloco.id: bloco.size for bloco in list(confirmados) + list(pendentes)}
+
+
+def blob_atualizado(blob_client, md5, sha256):
+    """True se o blob já existe com o mesmo conteúdo (SHA-256 nos metadados ou `content_md5`)."""
+    try:
+        propriedades = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return False
+    if propriedades.metadata.get('sha256'):
+        return propriedades.metadata['sha256'] == sha256
+    md5_remoto = propriedades.content_settings.content_md5
+    return md5_remoto is not None and bytes(md5_remoto) == md5
+
+
+def carregar_em_blocos(blob_client, local_path, tamanho_bloco=TAMANHO_BLOCO, max_concorrencia=MAX_CONCORRENCIA,
+                       metadata=None, content_settings=None):
+    """
+    Envia o ficheiro em blocos paralelos e confirma a lista no fim. Retoma um
+    upload interrompido: blocos já presentes no serviço não são reenviados.
+    Retorna (blocos enviados, blocos reaproveitados).
+    """
+    ids, tamanho = identificadores_dos_blocos(local_path, tamanho_bloco)
+    if len(ids) == 1:
+        # Cabe num só pedido: não há o que paralelizar nem retomar
+        with open(local_path, "rb") as dados:
+            blob_client.upload_blob(dados, overwrite=True, metadata=metadata, content_settings=content_settings)
+        return 1, 0
+    presentes = blocos_ja_preparados(blob_client)
+
+    def tamanho_do_bloco(indice):
+        return min(tamanho_bloco, tamanho - indice * tamanho_bloco)
+
+    faltam = [i for i, block_id in enumerate(ids) if presentes.get(block_id) != tamanho_do_bloco(i)]
+
+    def enviar(indice):
+        # Cada thread lê o seu bloco com o seu próprio descritor: sem disputa pela posição do ficheiro
+        with open(local_path, "rb") as ficheiro:
+            ficheiro.seek(indice * tamanho_bloco)
+            dados = ficheiro.read(tamanho_do_bloco(indice))
+        blob_client.stage_block(ids[indice], dados, length=len(dados))
+
+    if faltam:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(faltam)))) as executor:
+            # list() propaga a primeira falha; os blocos já enviados ficam para a retoma
+            list(executor.map(enviar, faltam))
+    blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in ids],
+                                  metadata=metadata, content_settings=content_settings)
+    return len(faltam), len(ids) - len(faltam)
+
+
+def baixar_em_fluxo(blob_client, download_path, max_concorrencia=MAX_CONCORRENCIA):
+    """
+    Escreve o blob no disco pedaço a pedaço (`readinto`), em paralelo. Usa um
+    ficheiro temporário ao lado do destino para nunca deixar um download
+    truncado com o nome final. Retorna os bytes escritos.
+    """
+    parcial = download_path + ".parcial"
+    try:
+        with open(parcial, "wb") as ficheiro:
+            escritos = blob_client.download_blob(max_concurrency=max_concorrencia).readinto(ficheiro)
+        os.replace(parcial, download_path)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    return escritos
@@ -0,0 +1,183 @@
+"""
+Vigilância assíncrona dos trabalhos de tradução de documentos.
+
+Em vez de consultar o `Operation-Location` a cada 5 s fixos, cada trabalho é
+acompanhado por uma corrotina. A primeira consulta sai logo, e o intervalo
+dobra a cada consulta (com jitter) até um máximo. Quando o `summary` já
+mostra documentos concluídos, o ritmo observado estima quanto falta, e a
+consulta seguinte é antecipada para o fim previsto. Um `Retry-After` enviado
+pelo serviço tem prioridade sobre o intervalo calculado. Trabalhos curtos
+terminam sem segundos mortos, e os longos não martelam a API.
+
+Várias operações são seguidas no mesmo laço de eventos (`acompanhar_varios`).
+Os pedidos HTTP usam uma `requests.Session` com pool e timeout, executada em
+threads (`asyncio.to_thread`) para não travar o laço. Com um limitador
+(LimitadorDeTaxa), cada consulta espera a sua vez na cota, e um 429 reduz a
+taxa e espera o `Retry-After` sem bloquear as outras vigílias.
+"""
+import asyncio
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ESTADOS_FINAIS = {'Succeeded', 'Failed', 'Canceled', 'ValidationFailed'}
+STATUS_RETENTAVEIS = {408, 429, 500, 502, 503, 504}
+
+INTERVALO_INICIAL = 0.5
+INTERVALO_MAXIMO = 15.0
+FATOR_DE_CRESCIMENTO = 2.0
+TIMEOUT = (3.05, 30.0)  # (conexão, leitura)
+MAX_FALHAS_SEGUIDAS = 8
+# 429 seguidos tolerados (o mesmo teto do `pedido_com_limite`); depois disso a consulta falha
+MAX_RECUSAS_SEGUIDAS = 20
+
+
+def segundos_do_retry_after(retry_after):
+    """Segundos indicados pelo cabeçalho `Retry-After`; None se ausente ou inválido."""
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return None
+
+
+def com_jitter(segundos):
+    """Espalha as consultas para as vigílias não baterem todas no mesmo instante."""
+    return segundos * random.uniform(0.8, 1.2)
+
+
+def imprimir_progresso(status_url, status_data):
+    """Relatório padrão: estado e contagens do `summary` a cada mudança."""
+    trabalho = status_data.get('id') or status_url.rsplit('/', 1)[-1]
+    resumo = status_data.get('summary') or {}
+    contagens = ""
+    if resumo:
+        contagens = (f" | documentos: {resumo.get('success', 0)} traduzidos, {resumo.get('inProgress', 0)} em curso, "
+                     f"{resumo.get('notYetStarted', 0)} na fila, {resumo.get('failed', 0)} com falha, de {resumo.get('total', 0)}")
+    print(f"[{trabalho[:8]}] Status atual da operação: {status_data['status']}{contagens}")
+
+
+class RastreadorDeTrabalhos:
+    """
+    Acompanha trabalhos de tradução até um estado final.
+
+    Uso:
+        rastreador = RastreadorDeTrabalhos(chave, limitador)
+        status_data = asyncio.run(rastreador.acompanhar(status_url))
+        todos = asyncio.run(rastreador.acompanhar_varios([url1, url2]))
+    """
+
+    def __init__(self, translator_key, limitador=None, ao_progredir=imprimir_progresso,
+                 intervalo_inicial=INTERVALO_INICIAL, intervalo_maximo=INTERVALO_MAXIMO, timeout=TIMEOUT):
+        self.limitador = limitador
+        self.ao_progredir = ao_progredir
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_maximo = intervalo_maximo
+        self.timeout = timeout
+        self.sessao = requests.Session()
+        self.sessao.headers['Ocp-Apim-Subscription-Key'] = translator_key
+        adaptador = HTTPAdapter(pool_maxsize=32)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+        # Métricas
+        self.consultas = 0
+        self.respostas_429 = 0
+
+    def _consultar(self, status_url):
+        if self.limitador is not None:
+            self.limitador.adquirir()
+        self.consultas += 1
+        return self.sessao.get(status_url, timeout=self.timeout)
+
+    @staticmethod
+    def _progresso(status_data):
+        resumo = status_data.get('summary') or {}
+        feitos = resumo.get('success', 0) + resumo.get('failed', 0) + resumo.get('cancelled', 0)
+        return feitos, resumo.get('total', 0)
+
+    async def acompanhar(self, status_url):
+        """Consulta o trabalho até um estado final e retorna o último JSON de status."""
+        inicio = time.monotonic()
+        intervalo = self.intervalo_inicial
+        ultimo_relatorio = None
+        feitos_antes, fim_previsto, consulta_anterior = 0, None, inicio
+        falhas = 0
+        while True:
+            try:
+                response = await asyncio.to_thread(self._consultar, status_url)
+            except (requests.ConnectionError, requests.Timeout):
+                falhas += 1
+                if falhas > MAX_FALHAS_SEGUIDAS:
+                    raise
+                await asyncio.sleep(com_jitter(intervalo))
+                intervalo = min(self.intervalo_maximo, intervalo * FATOR_DE_CRESCIMENTO)
+                continue
+
+            retry_after = segundos_do_retry_after(response.headers.get('Retry-After'))
+            if response.status_code in STATUS_RETENTAVEIS:
+                falhas += 1
+                if response.status_code == 429:
+                    self.respostas_429 += 1
+                    if self.limitador is not None:
+                        self.limitador.registrar_429()
+                if falhas > (MAX_RECUSAS_SEGUIDAS if response.status_code == 429 else MAX_FALHAS_SEGUIDAS):
+                    response.raise_for_status()
+                intervalo = min(self.intervalo_maximo, intervalo * FATOR_DE_CRESCIMENTO)
+                await asyncio.sleep(retry_after if retry_after is not None else com_jitter(intervalo))
+                continue
+            response.raise_for_status()
+            falhas = 0
+            if self.limitador is not None:
+                self.limitador.registrar_sucesso()
+
+            status_data = response.json()
+            relatorio = (status_data['status'], tuple(sorted((status_data.get('summary') or {}).items())))
+            if relatorio != ultimo_relatorio:
+                ultimo_relatorio = relatorio
+                if self.ao_progredir:
+                    self.ao_progredir(status_url, status_data)
+            if status_data['status'] in ESTADOS_FINAIS:
+                return status_data
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+                continue
+            # Fim previsto pelo ritmo dos documentos. A contagem avançou algures
+            # entre a consulta anterior e esta: mede-se pelo meio do intervalo
+            agora = time.monotonic()
+            feitos, total = self._progresso(status_data)
+            if feitos > feitos_antes and total:
+                feitos_antes = feitos
+                fim_previsto = inicio + ((consulta_anterior + agora) / 2 - inicio) * total / feitos
+            consulta_anterior = agora
+            espera = com_jitter(intervalo)
+            intervalo = min(self.intervalo_maximo, intervalo * FATOR_DE_CRESCIMENTO)
+            if fim_previsto is not None:
+                if fim_previsto <= agora:
+                    # Previsão vencida: recomeça o backoff curto uma única vez
+                    fim_previsto = None
+                    espera = self.intervalo_inicial
+                    intervalo = self.intervalo_inicial * FATOR_DE_CRESCIMENTO
+                else:
+                    espera = min(espera, max(self.intervalo_inicial, fim_previsto - agora))
+            await asyncio.sleep(espera)
+
+    async def acompanhar_varios(self, status_urls):
+        """Segue várias operações em paralelo; retorna os JSON de status na mesma ordem."""
+        return await asyncio.gather(*(self.acompanhar(url) for url in status_urls))
+
+    def fechar(self):
+        self.sessao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def aguardar(rastreador, status_urls):
+    """Atalho síncrono: executa o laço de eventos até todos os trabalhos terminarem."""
+    inicio = time.perf_counter()
+    resultados = asyncio.run(rastreador.acompanhar_varios(status_urls))
+    return resultados, time.perf_counter() - inicio
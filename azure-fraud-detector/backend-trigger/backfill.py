@@ -0,0 +1,459 @@
+"""
+Reconciliação entre o contêiner `documentos-brutos` e o índice `index-vigilancia-fraudes`.
+
+Se o Blob Trigger perder eventos, ou se o índice for recriado, nada volta a
+sincronizar os dois. Este comando percorre o contêiner página a página e,
+para cada página:
+
+1. calcula o SHA-256 de cada blob em streaming (o mesmo `stream_sha256` /
+   `fingerprint_stream` do `ProcessDocumentHash`), num pool de threads
+   limitado por `--workers`;
+2. consulta em bloco quais hashes já são chaves do índice (`search.in` na
+   chave, 500 por pedido);
+3. grava só os que faltam, em lotes grandes, pelo `BatchingIndexWriter`
+   (com os seus reenvios), com o mesmo documento que o trigger gravaria.
+
+Com `--trust-names`, blobs cujo nome já é `<sha256>.<ext>` (o nome dado pelo
+frontend) são conferidos primeiro pelo nome: os que já estão no índice não
+são baixados. Os outros, e todos os de nome fora do padrão, são hasheados.
+
+Checkpoint: depois de cada página gravada, o token de continuação da
+listagem e os contadores vão para `--checkpoint` (JSON, gravado de forma
+atômica). Uma execução interrompida retoma na página seguinte; refazer uma
+página é inofensivo, porque a escrita é `merge_or_upload` pela chave. Os
+blobs que falham no hash ou na indexação não seguram a listagem: todos vão,
+pelo nome, para `<checkpoint>.failures.jsonl`, e `--retry-failures` tenta
+de novo só esses.
+
+`--dead-letters` não lista `documentos-brutos`: reenvia ao índice os
+documentos que a função deixou no contêiner de falhas (ver `BlobDeadLetter`
+em index_writer.py) e apaga os blobs dos que entram.
+
+Com `ENABLE_FINGERPRINTS`, as impressões digitais também são calculadas e
+gravadas, mas a busca por quase-duplicatas não é feita aqui: ela compara
+cada documento com o acervo, e a reconciliação só repõe o que falta.
+
+Uso (mesmas variáveis de ambiente da função, mais a connection string do
+Storage em AZURE_STORAGE_CONNECTION_STRING ou AzureWebJobsStorage):
+    python backfill.py --checkpoint backfill.json
+    python backfill.py --checkpoint backfill.json --trust-names --workers 32
+    python backfill.py --checkpoint backfill.json --retry-failures
+    python backfill.py --dead-letters
+    python backfill.py --dry-run
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fingerprint import fingerprint_stream
+from hash_stream import stream_sha256
+from index_writer import DEAD_LETTER_CONTAINER, BatchingIndexWriter, build_index_document
+
+RAW_CONTAINER = "documentos-brutos"
+DEFAULT_PAGE_SIZE = 5000
+DEFAULT_WORKERS = 16
+# Hashes por consulta search.in ao índice
+LOOKUP_BATCH_SIZE = 500
+
+_HASH_NAME = re.compile(r"^([0-9a-f]{64})(\.[^/]*)?$")
+_COUNTERS = ("pages", "blobs_listed", "blobs_hashed", "bytes_hashed", "skipped_by_name", "duplicate_blobs",
+             "already_indexed", "indexed", "hash_failures", "index_failures", "failures_retried",
+             "failures_recovered")
+
+
+class _DownloadReader:
+    """
+    Expõe só `read(size)` de um download do Blob. O `readinto` do SDK escreve
+    num stream de destino, não num buffer, e por isso não pode ser usado
+    pelo `stream_chunks`.
+    """
+
+    def __init__(self, downloader):
+        self._downloader = downloader
+
+    def read(self, size):
+        return self._downloader.read(size)
+
+
+def hash_blob(container_client, blob_name, fingerprints=False):
+    """Hash (e impressões digitais, se pedidas) de um blob lido em streaming. Retorna (hash, bytes, fingerprint)."""
+    downloader = container_client.get_blob_client(blob_name).download_blob(max_concurrency=1)
+    reader = _DownloadReader(downloader)
+    if fingerprints:
+        fingerprint = fingerprint_stream(reader)
+        return fingerprint["document_hash"], fingerprint["size_bytes"], fingerprint
+    document_hash, bytes_read = stream_sha256(reader)
+    return document_hash, bytes_read, None
+
+
+def name_hash(blob_name):
+    """O hash contido no nome do blob (`<sha256>.<ext>`), ou None."""
+    match = _HASH_NAME.match(blob_name.rsplit('/', 1)[-1])
+    return match.group(1) if match else None
+
+
+def existing_keys(search_client, keys, batch_size=LOOKUP_BATCH_SIZE):
+    """Subconjunto de `keys` que já existe como chave no índice (um `search.in` por lote)."""
+    unique = list(dict.fromkeys(keys))
+    found = set()
+    for i in range(0, len(unique), batch_size):
+        batch = unique[i:i + batch_size]
+        results = search_client.search(search_text="*", filter=f"search.in(id, '{','.join(batch)}', ',')",
+                                       select=["id"], top=len(batch))
+        found.update(doc["id"] for doc in results)
+    return found
+
+
+class Checkpoint:
+    """
+    Estado retomável da reconciliação: token da próxima página e contadores acumulados.
+
+    Os blobs que falham (no hash ou na indexação) vão todos, pelo nome, para
+    um arquivo JSONL ao lado do checkpoint (`<checkpoint>.failures.jsonl`),
+    acrescentado a cada página gravada. A listagem segue em frente sem eles;
+    `--retry-failures` os tenta de novo depois.
+    """
+
+    def __init__(self, path, container, resume=True):
+        self.path = path
+        self.failures_path = f"{path}.failures.jsonl" if path else None
+        self.container = container
+        self.continuation_token = None
+        self.completed = False
+        self.elapsed_seconds = 0.0
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        self._new_failures = []
+        # Sem retomar, o primeiro save começa o arquivo de falhas do zero
+        self._truncate_failures = not resume
+        if resume and path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("container") != container:
+                raise ValueError(f"O checkpoint {path} é do contêiner {state.get('container')!r}, não de {container!r}.")
+            self.continuation_token = state.get("continuation_token")
+            self.completed = state.get("completed", False)
+            self.elapsed_seconds = state.get("elapsed_seconds", 0.0)
+            self.counters.update(state.get("counters", {}))
+            # Checkpoints antigos guardavam (parte d)as falhas na própria lista
+            self._new_failures = state.get("failures", [])
+
+    def record_failure(self, blob_name, error):
+        self._new_failures.append({"blob": blob_name, "error": str(error)})
+
+    def pending_failures(self):
+        """Nomes distintos dos blobs que falharam, na ordem da primeira falha."""
+        names = {}
+        if self.failures_path and os.path.exists(self.failures_path) and not self._truncate_failures:
+            with open(self.failures_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        names.setdefault(json.loads(line)["blob"], None)
+        for failure in self._new_failures:
+            names.setdefault(failure["blob"], None)
+        return list(names)
+
+    def take_failures(self):
+        """Para uma nova tentativa: os nomes pendentes, com a lista em memória recomeçando vazia."""
+        names = self.pending_failures()
+        self._new_failures = []
+        return names
+
+    def unsaved_failure_names(self):
+        return list(dict.fromkeys(failure["blob"] for failure in self._new_failures))
+
+    def replace_failures(self):
+        """Depois de uma nova tentativa: o arquivo passa a ter só as falhas registradas desde então."""
+        if self.failures_path:
+            self._write_failures("w")
+
+    def save(self):
+        if not self.path:
+            return
+        if self._new_failures or self._truncate_failures:
+            self._write_failures("w" if self._truncate_failures else "a")
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"container": self.container, "continuation_token": self.continuation_token,
+                       "completed": self.completed, "elapsed_seconds": self.elapsed_seconds,
+                       "counters": self.counters}, f, indent=1)
+        os.replace(temporary, self.path)
+
+    def _write_failures(self, mode):
+        # Falhas antes do checkpoint: se o processo cair entre os dois, a página é refeita e a falha
+        # aparece duas vezes no arquivo (inofensivo, os nomes são deduplicados na nova tentativa)
+        temporary = self.failures_path + ".tmp"
+        target = temporary if mode == "w" else self.failures_path
+        with open(target, mode, encoding="utf-8") as f:
+            for failure in self._new_failures:
+                f.write(json.dumps(failure) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if mode == "w":
+            os.replace(temporary, self.failures_path)
+        self._new_failures = []
+        self._truncate_failures = False
+
+
+def _report(checkpoint, run_seconds, run_bytes, run_blobs):
+    counters = checkpoint.counters
+    total_seconds = checkpoint.elapsed_seconds
+    return {
+        **counters,
+        "completed": checkpoint.completed,
+        "seconds": total_seconds,
+        "blobs_per_s": counters["blobs_listed"] / total_seconds if total_seconds else 0.0,
+        "hash_mb_per_s": counters["bytes_hashed"] / 2 ** 20 / total_seconds if total_seconds else 0.0,
+        "this_run": {"seconds": run_seconds, "blobs": run_blobs, "bytes_hashed": run_bytes,
+                     "blobs_per_s": run_blobs / run_seconds if run_seconds else 0.0},
+        "failures_pending": len(checkpoint.pending_failures()),
+    }
+
+
+def backfill(container_client, search_client, checkpoint_path=None, page_size=DEFAULT_PAGE_SIZE,
+             workers=DEFAULT_WORKERS, batch_size=BatchingIndexWriter.MAX_SERVICE_BATCH, trust_names=False,
+             dry_run=False, fingerprints=False, max_pages=None, restart=False, progress=print,
+             max_retries=3, retry_backoff_seconds=0.5, retry_failures=False):
+    """
+    Reconcilia o contêiner com o índice e retorna o relatório de vazão.
+
+    `container_client` precisa de `list_blobs(results_per_page=...).by_page(continuation_token=...)`
+    e `get_blob_client(nome).download_blob()`; `search_client`, de `search` e
+    `merge_or_upload_documents`. `max_pages` para depois de N páginas (o
+    checkpoint permite continuar depois). `max_retries` e `retry_backoff_seconds`
+    são os reenvios do `BatchingIndexWriter` para as chaves recusadas.
+
+    Com `retry_failures`, em vez de listar o contêiner, refaz só os blobs do
+    arquivo de falhas do checkpoint; os que voltarem a falhar ficam nele.
+    """
+    if retry_failures and not checkpoint_path:
+        raise ValueError("retry_failures precisa do checkpoint com o arquivo de falhas.")
+    checkpoint = Checkpoint(checkpoint_path, container_client.container_name, resume=not restart)
+    if checkpoint.completed and not retry_failures:
+        progress("O checkpoint indica uma reconciliação já concluída (use --restart para refazer).")
+        return _report(checkpoint, 0.0, 0, 0)
+
+    writer = BatchingIndexWriter(search_client, max_batch_size=batch_size, background_flush=False,
+                                 max_retries=max_retries, retry_backoff_seconds=retry_backoff_seconds)
+    run_start = time.perf_counter()
+    run_bytes = 0
+
+    def hash_one(blob_name):
+        try:
+            return blob_name, hash_blob(container_client, blob_name, fingerprints), None
+        except Exception as e:
+            return blob_name, None, e
+
+    def process(executor, names, counters):
+        """Hash, diferença contra o índice e gravação de uma lista de blobs. Retorna (hasheados, em falta)."""
+        nonlocal run_bytes
+
+        # 1. Pelo nome (opcional): blobs já indexados com o hash no nome não são baixados
+        to_hash = names
+        if trust_names:
+            named = {name: name_hash(name) for name in names}
+            present = existing_keys(search_client, [h for h in named.values() if h])
+            to_hash = [name for name in names if named[name] not in present]
+            counters["skipped_by_name"] += len(names) - len(to_hash)
+            counters["already_indexed"] += len(names) - len(to_hash)
+
+        # 2. Hash em streaming, com no máximo `workers` downloads simultâneos
+        hashed = {}
+        hashed_blobs = 0
+        for blob_name, result, error in executor.map(hash_one, to_hash):
+            if error is not None:
+                counters["hash_failures"] += 1
+                checkpoint.record_failure(blob_name, error)
+                logging.warning(f"Falha ao hashear {blob_name}: {error}")
+                continue
+            document_hash, bytes_read, fingerprint = result
+            hashed_blobs += 1
+            counters["bytes_hashed"] += bytes_read
+            run_bytes += bytes_read
+            # O primeiro blob de cada conteúdo representa o documento
+            hashed.setdefault(document_hash, (blob_name, fingerprint))
+
+        counters["blobs_hashed"] += hashed_blobs
+        counters["duplicate_blobs"] += hashed_blobs - len(hashed)
+
+        # 3. Diferença em bloco contra as chaves do índice
+        present = existing_keys(search_client, hashed)
+        missing = [h for h in hashed if h not in present]
+        counters["already_indexed"] += len(present)
+
+        # 4. Só os que faltam, em lotes grandes
+        failed = []
+        if missing and not dry_run:
+            for document_hash in missing:
+                blob_name, fingerprint = hashed[document_hash]
+                writer.add(build_index_document(document_hash, blob_name.split('/')[-1], fingerprint))
+            # Inclui as chaves dos lotes que o próprio `add` enviou ao encher
+            failed = writer.flush()
+            for key in failed:
+                checkpoint.record_failure(hashed[key][0], "falha ao indexar")
+        counters["indexed"] += len(missing) - len(failed)
+        counters["index_failures"] += len(failed)
+        return len(to_hash), len(missing)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill-hash") as executor:
+        if retry_failures:
+            names = checkpoint.take_failures()
+            retry_counters = dict.fromkeys(_COUNTERS, 0)
+            for i in range(0, len(names), page_size):
+                process(executor, names[i:i + page_size], retry_counters)
+            still_failing = len(checkpoint.unsaved_failure_names())
+            for key in ("indexed", "bytes_hashed"):
+                checkpoint.counters[key] += retry_counters[key]
+            checkpoint.counters["failures_retried"] += len(names)
+            checkpoint.counters["failures_recovered"] += len(names) - still_failing
+            if not dry_run:
+                checkpoint.replace_failures()
+                checkpoint.save()
+            progress(f"Nova tentativa: {len(names)} blobs que tinham falhado, {len(names) - still_failing} "
+                     f"resolvidos, {still_failing} ainda com falha{' (simulação)' if dry_run else ''}.")
+            report = _report(checkpoint, time.perf_counter() - run_start, run_bytes, 0)
+            report["retry"] = {"retried": len(names), "recovered": len(names) - still_failing,
+                               "still_failing": still_failing, "indexed": retry_counters["indexed"]}
+            return report
+
+        counters = checkpoint.counters
+        run_blobs = 0
+        pages = container_client.list_blobs(results_per_page=page_size).by_page(
+            continuation_token=checkpoint.continuation_token)
+        for page_number, page in enumerate(pages, start=1):
+            page_start = time.perf_counter()
+            names = [blob.name for blob in page]
+            hashed_count, missing_count = process(executor, names, counters)
+
+            counters["pages"] += 1
+            counters["blobs_listed"] += len(names)
+            run_blobs += len(names)
+            checkpoint.continuation_token = pages.continuation_token
+            checkpoint.completed = not pages.continuation_token
+            checkpoint.elapsed_seconds += time.perf_counter() - page_start
+            if not dry_run:
+                # Uma simulação não avança o checkpoint: a execução real ainda tem de gravar estas páginas
+                checkpoint.save()
+
+            page_seconds = time.perf_counter() - page_start
+            progress(f"Página {counters['pages']}: {len(names)} blobs, {hashed_count} hasheados, "
+                     f"{missing_count} em falta{' (simulação)' if dry_run else ''} | "
+                     f"{len(names) / page_seconds if page_seconds else 0:.0f} blobs/s | "
+                     f"total {counters['blobs_listed']} blobs, {counters['indexed']} indexados")
+            if max_pages is not None and page_number >= max_pages:
+                break
+
+    return _report(checkpoint, time.perf_counter() - run_start, run_bytes, run_blobs)
+
+
+def replay_dead_letters(container_client, search_client, page_size=DEFAULT_PAGE_SIZE,
+                        batch_size=BatchingIndexWriter.MAX_SERVICE_BATCH, dry_run=False, progress=print,
+                        max_retries=3, retry_backoff_seconds=0.5):
+    """
+    Reenvia ao índice os documentos guardados pelo `BlobDeadLetter` da função
+    e apaga os blobs dos que entram; os que voltam a falhar ficam para a
+    próxima. Retorna {"dead_letters", "indexed", "still_failing"}.
+    """
+    writer = BatchingIndexWriter(search_client, max_batch_size=batch_size, background_flush=False,
+                                 max_retries=max_retries, retry_backoff_seconds=retry_backoff_seconds)
+    # Os nomes vêm todos antes: apagar blobs no meio da listagem não mexe na paginação
+    names = [blob.name for blob in container_client.list_blobs(results_per_page=page_size)]
+    report = {"dead_letters": len(names), "indexed": 0, "still_failing": 0}
+    if dry_run:
+        progress(f"Documentos recusados pela função: {len(names)} (simulação).")
+        return report
+    for i in range(0, len(names), page_size):
+        markers = {}
+        for name in names[i:i + page_size]:
+            document = json.loads(container_client.get_blob_client(name).download_blob().readall())
+            markers[document["id"]] = name
+            writer.add(document)
+        failed = set(writer.flush())
+        for key, name in markers.items():
+            if key not in failed:
+                container_client.get_blob_client(name).delete_blob()
+        report["indexed"] += len(markers) - len(failed)
+        report["still_failing"] += len(failed)
+    progress(f"Documentos recusados pela função: {len(names)}, {report['indexed']} gravados agora, "
+             f"{report['still_failing']} ainda com falha.")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--container", default=RAW_CONTAINER)
+    parser.add_argument("--checkpoint", help="Arquivo JSON para retomar uma execução interrompida.")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint existente e começa do início.")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Blobs por página da listagem.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Downloads/hashes simultâneos.")
+    parser.add_argument("--batch-size", type=int, default=BatchingIndexWriter.MAX_SERVICE_BATCH,
+                        help="Documentos por pedido de indexação.")
+    parser.add_argument("--trust-names", action="store_true",
+                        help="Não baixa blobs cujo nome já é um hash presente no índice.")
+    parser.add_argument("--dry-run", action="store_true", help="Só relata o que falta, sem gravar no índice.")
+    parser.add_argument("--max-pages", type=int, help="Para depois de N páginas (retomável pelo checkpoint).")
+    parser.add_argument("--retry-failures", action="store_true",
+                        help="Tenta de novo só os blobs do arquivo de falhas do --checkpoint.")
+    parser.add_argument("--dead-letters", action="store_true",
+                        help="Reenvia só os documentos que a função não conseguiu indexar "
+                             "(contêiner INDEX_DEAD_LETTER_CONTAINER).")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo.")
+    args = parser.parse_args()
+    if args.retry_failures and not args.checkpoint:
+        parser.error("--retry-failures precisa do --checkpoint da execução que registrou as falhas.")
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING'))
+
+    from azure.storage.blob import BlobServiceClient
+
+    from clients import get_search_client
+
+    connection_string = os.environ.get('AZURE_STORAGE_CONNECTION_STRING') or os.environ.get('AzureWebJobsStorage')
+    search_client = get_search_client()
+    if not connection_string or search_client is None:
+        parser.error("Defina AZURE_STORAGE_CONNECTION_STRING (ou AzureWebJobsStorage) e as variáveis AZURE_SEARCH_*.")
+    blob_service = BlobServiceClient.from_connection_string(connection_string)
+
+    if args.dead_letters:
+        dead_letters = blob_service.get_container_client(
+            os.environ.get('INDEX_DEAD_LETTER_CONTAINER', DEAD_LETTER_CONTAINER))
+        # O contêiner só é criado pela função na primeira recusa definitiva
+        report = (replay_dead_letters(dead_letters, search_client, page_size=args.page_size,
+                                      batch_size=args.batch_size, dry_run=args.dry_run)
+                  if dead_letters.exists() else {"dead_letters": 0, "indexed": 0, "still_failing": 0})
+    else:
+        container_client = blob_service.get_container_client(args.container)
+        fingerprints = os.environ.get('ENABLE_FINGERPRINTS', '').lower() in ('1', 'true', 'yes')
+        report = backfill(container_client, search_client, checkpoint_path=args.checkpoint, page_size=args.page_size,
+                          workers=args.workers, batch_size=args.batch_size, trust_names=args.trust_names,
+                          dry_run=args.dry_run, fingerprints=fingerprints, max_pages=args.max_pages,
+                          restart=args.restart, retry_failures=args.retry_failures)
+        print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def print_report(report):
+    print("--- Reconciliação ---")
+    print(f"{'Concluída' if report['completed'] else 'Parcial (retome com o mesmo --checkpoint)'}: "
+          f"{report['pages']} páginas, {report['blobs_listed']} blobs em {report['seconds']:.1f} s "
+          f"({report['blobs_per_s']:.0f} blobs/s, hash a {report['hash_mb_per_s']:.1f} MB/s)")
+    print(f"Hasheados: {report['blobs_hashed']} ({report['bytes_hashed'] / 2 ** 20:.1f} MB) | "
+          f"conferidos pelo nome: {report['skipped_by_name']} | cópias do mesmo conteúdo: {report['duplicate_blobs']}")
+    print(f"Já no índice: {report['already_indexed']} | gravados agora: {report['indexed']} | "
+          f"falhas de hash: {report['hash_failures']} | falhas de indexação: {report['index_failures']}")
+    if report["failures_pending"]:
+        print(f"Blobs com falha à espera de nova tentativa (--retry-failures): {report['failures_pending']}")
+    if "retry" in report:
+        retry = report["retry"]
+        print(f"Nova tentativa: {retry['retried']} blobs, {retry['recovered']} resolvidos "
+              f"({retry['indexed']} gravados), {retry['still_failing']} ainda com falha")
+    run = report["this_run"]
+    print(f"Esta execução: {run['blobs']} blobs em {run['seconds']:.1f} s ({run['blobs_per_s']:.0f} blobs/s)")
+
+
+if __name__ == "__main__":
+    main()
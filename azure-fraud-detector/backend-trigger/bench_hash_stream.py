@@ -0,0 +1,102 @@
+"""
+Benchmark: hash do blob inteiro (myblob.read()) vs hash em streaming.
+
+Cada cenário roda num subprocesso isolado para que o pico de RSS medido
+(ru_maxrss) reflita apenas aquele caminho. Os blobs são sintéticos e gerados
+sob demanda, sem ocupar memória além do que o caminho testado pede.
+
+Uso:
+    python bench_hash_stream.py                 # 1 MB, 16 MB, 128 MB, 1 GB
+    python bench_hash_stream.py --sizes 1 64    # tamanhos em MB
+"""
+import argparse
+import hashlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from hash_stream import DEFAULT_CHUNK_SIZE, stream_sha256
+
+MB = 1024 * 1024
+_PATTERN = bytes(range(256)) * 4096  # 1 MiB de padrão repetido
+
+
+class SyntheticBlob(io.RawIOBase):
+    """Stream somente-leitura de `size` bytes, gerado sem materializar o conteúdo."""
+
+    def __init__(self, size):
+        self.length = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        remaining = self.length - self._pos
+        if remaining <= 0:
+            return 0
+        n = min(len(b), remaining, len(_PATTERN))
+        b[:n] = _PATTERN[:n]
+        self._pos += n
+        return n
+
+
+def _hash_full_read(blob):
+    """Caminho antigo: lê o blob inteiro para memória e depois calcula o hash."""
+    file_bytes = blob.read()
+    hasher = hashlib.sha256()
+    hasher.update(file_bytes)
+    return hasher.hexdigest(), len(file_bytes)
+
+
+def _run_case(mode, size_mb, chunk_size):
+    blob = SyntheticBlob(size_mb * MB)
+    start = time.perf_counter()
+    if mode == "read":
+        digest, total = _hash_full_read(blob)
+    else:
+        digest, total = stream_sha256(blob, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss é em KiB no Linux (e em bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (MB if sys.platform == "darwin" else 1024)
+    print(json.dumps({
+        "mode": mode, "size_mb": size_mb, "seconds": elapsed,
+        "mb_per_s": total / MB / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_mb, "digest": digest,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 128, 1024], help="Tamanhos dos blobs em MB.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--_case", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._case:
+        _run_case(args._case[0], int(args._case[1]), args.chunk_size)
+        return
+
+    print(f"{'tamanho':>8} | {'modo':>6} | {'MB/s':>8} | {'pico RSS (MB)':>13}")
+    print("-" * 46)
+    for size_mb in args.sizes:
+        digests = set()
+        for mode in ("read", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--chunk-size", str(args.chunk_size), "--_case", mode, str(size_mb)],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout)
+            digests.add(result["digest"])
+            print(f"{size_mb:>6}MB | {mode:>6} | {result['mb_per_s']:>8.1f} | {result['peak_rss_mb']:>13.1f}")
+        if len(digests) != 1:
+            print(f"ERRO: os caminhos produziram hashes diferentes para {size_mb} MB!")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
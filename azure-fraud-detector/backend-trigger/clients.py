@@ -0,0 +1,108 @@
+"""
+Clientes do Azure criados sob demanda e compartilhados pelo processo.
+
+O host do Functions importa `function_app.py` para descobrir as funções antes
+da primeira invocação. Importar o SDK do AI Search e montar o cliente nesse
+momento atrasava o arranque a frio. Aqui o import pesado e a construção só
+acontecem na primeira chamada; as seguintes devolvem a mesma instância. A
+inicialização é protegida por um lock (double-checked), então invocações
+concorrentes no arranque criam um único cliente.
+
+Uma falha de configuração (variável de ambiente ausente) não fica em cache:
+é registrada e a próxima chamada tenta de novo.
+
+`prewarm()` adianta essa construção numa thread de fundo, enquanto o host
+termina de arrancar: se o primeiro blob chegar antes do fim, a invocação
+espera só o que falta (pelo lock), sem construir nada em dobro.
+"""
+import atexit
+import logging
+import os
+import threading
+
+_lock = threading.Lock()
+_search_client = None
+_index_writer = None
+
+
+def _create_search_client():
+    # Imports adiados: só pagam o custo quando o primeiro blob chega
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+
+    from instrumentation import get_metrics
+
+    search_service_name = os.environ['AZURE_SEARCH_SERVICE_NAME']
+    search_key = os.environ['AZURE_SEARCH_KEY']
+    search_index_name = os.environ['AZURE_SEARCH_INDEX_NAME']
+
+    client = SearchClient(endpoint=f"https://{search_service_name}.search.windows.net",
+                          index_name=search_index_name,
+                          credential=AzureKeyCredential(search_key),
+                          **get_metrics().client_kwargs("search"))
+    logging.info(f"Conexão com Search Service '{search_service_name}' estabelecida.")
+    return client
+
+
+def _create_dead_letter_container():
+    # Só na primeira recusa definitiva do índice: o SDK do Storage fica fora do arranque
+    from azure.core.exceptions import ResourceExistsError
+    from azure.storage.blob import BlobServiceClient
+
+    from index_writer import DEAD_LETTER_CONTAINER
+
+    container_client = BlobServiceClient.from_connection_string(os.environ['AzureWebJobsStorage']).get_container_client(
+        os.environ.get('INDEX_DEAD_LETTER_CONTAINER', DEAD_LETTER_CONTAINER))
+    try:
+        container_client.create_container()
+    except ResourceExistsError:
+        pass
+    return container_client
+
+
+def _create_index_writer(search_client):
+    from index_writer import BatchingIndexWriter, BlobDeadLetter
+
+    # Escritor em lote: agrupa os documentos de várias invocações num único
+    # pedido ao índice (INDEX_BATCH_SIZE=1 volta ao envio imediato). Os
+    # documentos que o índice recusa até ao fim ficam como blobs no contêiner
+    # de falhas, para o `backfill.py --dead-letters`.
+    writer = BatchingIndexWriter(
+        search_client,
+        max_batch_size=int(os.environ.get('INDEX_BATCH_SIZE', '100')),
+        max_age_seconds=float(os.environ.get('INDEX_BATCH_MAX_AGE_SECONDS', '5')),
+        dead_letter=BlobDeadLetter(_create_dead_letter_container),
+    )
+    atexit.register(writer.close)
+    return writer
+
+
+def get_search_client():
+    """Cliente do AI Search do processo, ou None se a configuração estiver incompleta."""
+    global _search_client
+    if _search_client is None:
+        with _lock:
+            if _search_client is None:
+                try:
+                    _search_client = _create_search_client()
+                except KeyError as e:
+                    logging.error(f"ERRO CRÍTICO: Variável de ambiente não encontrada: {e}. A função não pode iniciar.")
+    return _search_client
+
+
+def get_index_writer():
+    """Escritor em lote do processo (criado junto com o cliente), ou None sem cliente."""
+    global _index_writer
+    if _index_writer is None:
+        search_client = get_search_client()
+        if search_client is None:
+            return None
+        with _lock:
+            if _index_writer is None:
+                _index_writer = _create_index_writer(search_client)
+    return _index_writer
+
+
+def prewarm():
+    """Cria o cliente e o escritor numa thread de fundo, sem bloquear o import."""
+    threading.Thread(target=get_index_writer, name="prewarm-clients", daemon=True).start()
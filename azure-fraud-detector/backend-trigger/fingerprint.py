@@ -0,0 +1,289 @@
+"""
+Impressões digitais de documentos, calculadas numa única passada pelos bytes.
+
+O SHA-256 continua sendo a identidade exata do documento (mesmo cálculo do
+frontend e da Custom Skill). Junto dele saem:
+
+* `fast_hash`: CRC-32 + tamanho, um pré-filtro barato e não criptográfico;
+* `minhash`: assinatura MinHash sobre shingles do texto extraído do PDF,
+  que sobrevive a re-salvamentos e re-digitalizações com o mesmo conteúdo;
+* `image_hash`: dHash de 64 bits para imagens (requer Pillow);
+* `lsh_bands`: chaves de banda (LSH) da assinatura, que permitem encontrar
+  quase-duplicatas por igualdade de chave, sem comparar com todo o acervo.
+
+As dependências pesadas (pypdf, Pillow) são opcionais; sem elas o texto do
+PDF é extraído dos content streams com a biblioteca padrão e imagens ficam
+sem `image_hash`.
+"""
+import hashlib
+import re
+import struct
+import zlib
+
+from hash_stream import DEFAULT_CHUNK_SIZE, stream_chunks
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16  # 16 bandas x 8 linhas: limiar de similaridade ~0,7
+SHINGLE_SIZE = 3
+# Documentos maiores que isto ficam só com os hashes exatos
+MAX_SIMILARITY_BYTES = 32 * 1024 * 1024
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations(count, seed=0x5EED):
+    """Coeficientes (a, b) fixos das permutações do MinHash (determinísticos)."""
+    coefficients = []
+    state = seed
+    for _ in range(count):
+        pair = []
+        for _ in range(2):
+            state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+            pair.append(state % _MERSENNE_PRIME or 1)
+        coefficients.append(tuple(pair))
+    return coefficients
+
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+# --- Extração de texto ---
+
+_STREAM_RE = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+_TEXT_OP_RE = re.compile(rb"\((?:\\.|[^\\)])*\)\s*Tj|\[(?:\\.|[^\]])*\]\s*TJ", re.S)
+_LITERAL_RE = re.compile(rb"\(((?:\\.|[^\\)])*)\)", re.S)
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+
+def _unescape_pdf_literal(raw):
+    def _sub(match):
+        seq = match.group(1)
+        if seq[:1].isdigit():
+            return bytes([int(seq, 8) & 0xFF])
+        return _PDF_ESCAPES.get(seq, seq)
+    return re.sub(rb"\\([0-7]{1,3}|.)", _sub, raw, flags=re.S)
+
+
+def extract_pdf_text(data):
+    """
+    Extrai o texto de um PDF. Usa o pypdf se estiver instalado; senão lê os
+    operadores Tj/TJ dos content streams (descomprimindo FlateDecode).
+    """
+    try:
+        import io
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(bytes(data)))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except ImportError:
+        pass
+    except Exception:
+        # PDF que o pypdf não entende: tenta o extrator simples abaixo
+        pass
+
+    parts = []
+    for match in _STREAM_RE.finditer(data):
+        content = match.group(1)
+        try:
+            content = zlib.decompress(content)
+        except zlib.error:
+            pass
+        for op in _TEXT_OP_RE.finditer(content):
+            for literal in _LITERAL_RE.finditer(op.group(0)):
+                parts.append(_unescape_pdf_literal(literal.group(1)).decode("latin-1"))
+        parts.append("\n")
+    return " ".join(parts)
+
+
+def text_shingles(text, size=SHINGLE_SIZE):
+    """Conjunto de shingles de `size` palavras do texto normalizado."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+# --- MinHash e LSH ---
+
+def minhash(shingles):
+    """Assinatura MinHash (NUM_PERMUTATIONS inteiros de 32 bits) de um conjunto."""
+    if not shingles:
+        return None
+    hashes = [struct.unpack("<Q", hashlib.blake2b(s.encode(), digest_size=8).digest())[0] for s in shingles]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature, bands=LSH_BANDS):
+    """Chaves de banda de uma assinatura: documentos com uma chave em comum são candidatos."""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = struct.pack(f"<{rows}I", *signature[band * rows:(band + 1) * rows])
+        keys.append(f"{band:02d}{hashlib.blake2b(chunk, digest_size=8).hexdigest()}")
+    return keys
+
+
+def estimated_similarity(sig_a, sig_b):
+    """Similaridade de Jaccard estimada a partir de duas assinaturas MinHash."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def image_dhash(data):
+    """dHash de 64 bits (hex) de uma imagem, ou None sem Pillow / se não for imagem."""
+    try:
+        import io
+        from PIL import Image
+        image = Image.open(io.BytesIO(bytes(data))).convert("L").resize((9, 8))
+    except Exception:
+        return None
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+# --- Passada única ---
+
+class FingerprintHasher:
+    """
+    Acumula, numa única passada pelos blocos, o SHA-256, o CRC-32 e (até
+    `max_similarity_bytes`) o conteúdo usado pelas assinaturas de similaridade.
+    """
+
+    def __init__(self, max_similarity_bytes=MAX_SIMILARITY_BYTES):
+        self.sha256 = hashlib.sha256()
+        self.crc32 = 0
+        self.size = 0
+        self.max_similarity_bytes = max_similarity_bytes
+        self._content = bytearray()
+        self._too_large = False
+
+    def update(self, chunk):
+        self.sha256.update(chunk)
+        self.crc32 = zlib.crc32(chunk, self.crc32)
+        self.size += len(chunk)
+        if not self._too_large:
+            if self.size > self.max_similarity_bytes:
+                self._too_large = True
+                self._content = bytearray()
+            else:
+                self._content += chunk
+
+    def finish(self):
+        fingerprint = {
+            "document_hash": self.sha256.hexdigest(),
+            "fast_hash": f"{self.crc32:08x}-{self.size:x}",
+            "size_bytes": self.size,
+            "minhash": None,
+            "image_hash": None,
+            "lsh_bands": [],
+        }
+        if self._too_large or not self._content:
+            return fingerprint
+
+        content = self._content
+        if content[:5] == b"%PDF-":
+            signature = minhash(text_shingles(extract_pdf_text(content)))
+            if signature is not None:
+                fingerprint["minhash"] = signature
+                fingerprint["lsh_bands"] = lsh_bands(signature)
+        else:
+            image_hash = image_dhash(content)
+            if image_hash is not None:
+                fingerprint["image_hash"] = image_hash
+                # 4 bandas de 16 bits: imagens a até 3 bits de distância colidem em alguma banda
+                fingerprint["lsh_bands"] = [f"img{i}{image_hash[i * 4:(i + 1) * 4]}" for i in range(4)]
+        return fingerprint
+
+
+def fingerprint_stream(stream, chunk_size=DEFAULT_CHUNK_SIZE, max_similarity_bytes=MAX_SIMILARITY_BYTES, timings=None):
+    """Calcula todas as impressões digitais de um stream numa única leitura."""
+    hasher = FingerprintHasher(max_similarity_bytes)
+    stream_chunks(stream, hasher.update, chunk_size, timings)
+    return hasher.finish()
+
+
+class LSHIndex:
+    """
+    Índice LSH em memória para quase-duplicatas.
+
+    Cada documento entra nos baldes das suas chaves de banda; uma consulta
+    só olha os documentos que partilham pelo menos uma chave, e confirma os
+    candidatos pela similaridade estimada. O custo de consulta depende do
+    tamanho dos baldes, não do tamanho do acervo.
+    """
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._buckets = {}
+        self._signatures = {}
+
+    def add(self, doc_id, fingerprint):
+        if not fingerprint.get("lsh_bands"):
+            return
+        self._signatures[doc_id] = fingerprint
+        for key in fingerprint["lsh_bands"]:
+            self._buckets.setdefault(key, set()).add(doc_id)
+
+    def query(self, fingerprint):
+        """Retorna [(doc_id, similaridade)] dos quase-duplicados, do mais ao menos parecido."""
+        candidates = set()
+        for key in fingerprint.get("lsh_bands") or []:
+            candidates |= self._buckets.get(key, set())
+        matches = []
+        for doc_id in candidates:
+            other = self._signatures[doc_id]
+            score = _similarity(fingerprint, other)
+            if score >= self.threshold:
+                matches.append((doc_id, score))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+def _similarity(a, b):
+    if a.get("minhash") and b.get("minhash"):
+        return estimated_similarity(a["minhash"], b["minhash"])
+    if a.get("image_hash") and b.get("image_hash"):
+        distance = bin(int(a["image_hash"], 16) ^ int(b["image_hash"], 16)).count("1")
+        return 1 - distance / 64
+    return 0.0
+
+
+def near_duplicate_filter(fingerprint):
+    """
+    Filtro OData para buscar candidatos a quase-duplicata no Azure AI Search
+    (exige o campo `lsh_bands` como Collection(Edm.String) filtrável).
+    """
+    keys = fingerprint.get("lsh_bands") or []
+    if not keys:
+        return None
+    return f"lsh_bands/any(b: search.in(b, '{','.join(keys)}', ','))"
+
+
+def find_near_duplicates(search_client, fingerprint, exclude_id=None, threshold=0.8, top=50):
+    """
+    Busca no índice os documentos que partilham alguma banda LSH com
+    `fingerprint` e confirma cada candidato pela similaridade estimada.
+    Retorna [(id, similaridade)] acima de `threshold`.
+    """
+    lsh_filter = near_duplicate_filter(fingerprint)
+    if lsh_filter is None:
+        return []
+    results = search_client.search(
+        search_text="*",
+        filter=lsh_filter,
+        select=["id", "minhash", "image_hash"],
+        top=top,
+    )
+    matches = []
+    for doc in results:
+        if doc["id"] == exclude_id:
+            continue
+        score = _similarity(fingerprint, doc)
+        if score >= threshold:
+            matches.append((doc["id"], score))
+    return sorted(matches, key=lambda m: m[1], reverse=True)
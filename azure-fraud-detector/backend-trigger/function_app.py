@@ -1,34 +1,28 @@
 import logging
 import os
-import hashlib
 import time
-from io import BytesIO
 
 import azure.functions as func
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-
-# --- Inicialização Global (Executa uma vez) ---
-# O modelo v2 gerencia melhor os clientes, mas inicializar
-# o cliente do Search aqui ainda é uma boa prática.
-try:
-    search_service_name = os.environ['AZURE_SEARCH_SERVICE_NAME']
-    search_key = os.environ['AZURE_SEARCH_KEY']
-    search_index_name = os.environ['AZURE_SEARCH_INDEX_NAME']
-
-    search_endpoint = f"https://{search_service_name}.search.windows.net"
-    search_credential = AzureKeyCredential(search_key)
-    
-    # Cliente do Cognitive Search
-    search_client = SearchClient(endpoint=search_endpoint, 
-                                 index_name=search_index_name, 
-                                 credential=search_credential)
-    
-    logging.info(f"Conexão com Search Service '{search_service_name}' estabelecida.")
 
-except KeyError as e:
-    logging.error(f"ERRO CRÍTICO: Variável de ambiente não encontrada: {e}. A função não pode iniciar.")
-    search_client = None
+from clients import get_index_writer, get_search_client, prewarm
+from fingerprint import fingerprint_stream, find_near_duplicates
+from hash_stream import stream_sha256
+from index_writer import build_index_document
+from instrumentation import get_metrics
+
+# Histogramas por fase e contadores (desligados sem METRICS_EXPORTER)
+metrics = get_metrics()
+
+# --- Inicialização Global ---
+# O cliente do Search e o escritor em lote são criados na primeira invocação
+# (ver clients.py), não no import: o arranque a frio do host fica mais curto.
+# Por padrão a construção começa já numa thread de fundo (PREWARM_CLIENTS=false desliga).
+if os.environ.get('PREWARM_CLIENTS', 'true').lower() in ('1', 'true', 'yes'):
+    prewarm()
+
+# Impressões digitais extras (CRC-32, MinHash/dHash e bandas LSH). Exige os
+# campos correspondentes no índice; desligado por padrão.
+fingerprints_enabled = os.environ.get('ENABLE_FINGERPRINTS', '').lower() in ('1', 'true', 'yes')
 
 # -------------------------------------------------
 
@@ -43,46 +37,68 @@ app = func.FunctionApp()
 def ProcessDocumentHash(myblob: func.InputStream):
     """
     Função V5 (Modelo v2): Disparada por Blob Trigger.
-    Calcula o hash e salva diretamente no Cognitive Search.
+    Calcula o hash e enfileira o documento para o Cognitive Search.
+
+    A invocação termina antes de o documento chegar ao índice: a gravação é
+    feita em lote pelo BatchingIndexWriter. O que o índice recusar até ao
+    fim fica no contêiner de falhas (INDEX_DEAD_LETTER_CONTAINER), e o
+    `backfill.py --dead-letters` reenvia.
     """
     
+    search_client = get_search_client()
     if not search_client:
         logging.error("Cliente do Search não inicializado. Verifique as variáveis de ambiente.")
         return
+    index_writer = get_index_writer()
 
     logging.info(f"Processando blob: {myblob.name} (Tamanho: {myblob.length} bytes)")
 
+    # Tempos de leitura e de hash acumulados ao longo do stream (só com métricas ligadas)
+    timings = {} if metrics.enabled else None
+    started = time.perf_counter()
     try:
-        # 1. Ler o arquivo inteiro
-        file_bytes = myblob.read()
-        
-        # 2. Calcular o Hash (Exatamente como o frontend faz)
-        hasher = hashlib.sha256()
-        hasher.update(file_bytes)
-        document_hash = hasher.hexdigest()
+        # 1 e 2. Ler o blob em blocos e calcular o Hash (mesmo SHA-256 do frontend)
+        # O stream é consumido com um buffer fixo: o pico de memória não
+        # cresce com o tamanho do documento.
+        fingerprint = None
+        if fingerprints_enabled:
+            # Mesma passada única calcula também as assinaturas de similaridade
+            fingerprint = fingerprint_stream(myblob, timings=timings)
+            document_hash, bytes_read = fingerprint["document_hash"], fingerprint["size_bytes"]
+        else:
+            document_hash, bytes_read = stream_sha256(myblob, timings=timings)
+        if timings:
+            metrics.observe_phases(timings)
+        metrics.count("bytes_processed", bytes_read)
 
-        logging.info(f"Hash calculado para {myblob.name}: {document_hash[:10]}...")
+        logging.info(f"Hash calculado para {myblob.name}: {document_hash[:10]}... ({bytes_read} bytes lidos)")
 
-        # 3. Preparar o documento para o Cognitive Search
+        # 3. Preparar o documento para o Cognitive Search ('id' é a chave do índice)
         document_key = document_hash
-        
-        document_to_index = {
-            "id": document_key, # Assumindo que 'id' é sua chave no índice
-            "document_hash": document_hash,
-            "status": "Processado_V5",
-            "filename": myblob.name.split('/')[-1],
-            "processed_timestamp": time.time()
-        }
-
-        # 4. Enviar para o Cognitive Search
-        logging.info(f"Enviando documento {document_key} para o índice...")
-        result = search_client.upload_documents(documents=[document_to_index])
-        
-        if result[0].succeeded:
-            logging.info(f"Documento {document_key} indexado com sucesso.")
-        else:
-            logging.error(f"Falha ao indexar {document_key}. Razão: {result[0].error_message}")
+        document_to_index = build_index_document(document_hash, myblob.name.split('/')[-1], fingerprint)
+
+        if fingerprint is not None:
+            try:
+                with metrics.timer("index_lookup_seconds"):
+                    near_duplicates = find_near_duplicates(search_client, fingerprint, exclude_id=document_key)
+                if near_duplicates:
+                    logging.warning(f"Documento {document_key} é quase-duplicata de: {near_duplicates}")
+                    document_to_index["status"] = "Suspeito_QuaseDuplicata"
+                    document_to_index["near_duplicate_of"] = [doc_id for doc_id, _ in near_duplicates]
+                    metrics.count("near_duplicates_found")
+            except Exception as e:
+                metrics.count("index_lookup_errors")
+                logging.error(f"Falha na busca por quase-duplicatas de {document_key}: {e}")
+
+        # 4. Enfileirar para o Cognitive Search (o flush ocorre por tamanho ou idade do lote)
+        logging.info(f"Enfileirando documento {document_key} para o índice...")
+        with metrics.timer("index_enqueue_seconds"):
+            index_writer.add(document_to_index)
+        metrics.count("documents_processed")
 
     except Exception as e:
+        metrics.count("documents_failed")
         logging.error(f"Erro catastrófico ao processar {myblob.name}: {e}")
-        raise e # Lança a exceção para o runtime do Functions
\ No newline at end of file
+        raise e # Lança a exceção para o runtime do Functions
+    finally:
+        metrics.observe("document_seconds", time.perf_counter() - started)
\ No newline at end of file
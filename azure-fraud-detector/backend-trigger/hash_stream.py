@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+# Tamanho padrão do bloco de leitura (1 MiB). Grande o suficiente para que o
+# hashlib libere o GIL e amortize o custo por chamada, pequeno o suficiente
+# para manter o consumo de memória constante.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def stream_chunks(stream, update, chunk_size=DEFAULT_CHUNK_SIZE, timings=None):
+    """
+    Lê um stream em blocos de tamanho fixo e entrega cada bloco a `update`.
+
+    Usa um único buffer pré-alocado (bytearray + memoryview) reaproveitado a
+    cada leitura via `readinto`, de modo que o pico de memória não depende do
+    tamanho do blob. `update` recebe uma memoryview válida só durante a
+    chamada. Retorna o total de bytes lidos.
+
+    Com `timings` (um dicionário), acumula nele os segundos gastos em
+    `read_seconds` (leitura do stream) e `hash_seconds` (em `update`).
+    """
+    if timings is not None:
+        return _timed_stream_chunks(stream, update, chunk_size, timings)
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+
+    readinto = getattr(stream, "readinto", None)
+    try:
+        if readinto is not None:
+            while True:
+                n = readinto(view)
+                if not n:
+                    break
+                update(view[:n])
+                total += n
+        else:
+            # Fallback para streams que só expõem read(size)
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                update(chunk)
+                total += len(chunk)
+    finally:
+        view.release()
+
+    return total
+
+
+class _TimedReader:
+    """Envolve um stream e acumula o tempo gasto nas leituras."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.seconds = 0.0
+        if getattr(stream, "readinto", None) is None:
+            self.readinto = None
+
+    def readinto(self, view):
+        start = time.perf_counter()
+        n = self.stream.readinto(view)
+        self.seconds += time.perf_counter() - start
+        return n
+
+    def read(self, size):
+        start = time.perf_counter()
+        chunk = self.stream.read(size)
+        self.seconds += time.perf_counter() - start
+        return chunk
+
+
+def _timed_stream_chunks(stream, update, chunk_size, timings):
+    """`stream_chunks` cronometrado. Caminho separado: sem métricas, o laço fica intacto."""
+    reader = _TimedReader(stream)
+    hash_seconds = 0.0
+
+    def timed_update(chunk):
+        nonlocal hash_seconds
+        start = time.perf_counter()
+        update(chunk)
+        hash_seconds += time.perf_counter() - start
+
+    total = stream_chunks(reader, timed_update, chunk_size)
+    timings["read_seconds"] = timings.get("read_seconds", 0.0) + reader.seconds
+    timings["hash_seconds"] = timings.get("hash_seconds", 0.0) + hash_seconds
+    return total
+
+
+def stream_sha256(stream, chunk_size=DEFAULT_CHUNK_SIZE, timings=None):
+    """
+    Calcula o hash SHA-256 de um stream lendo em blocos de tamanho fixo
+    (ver `stream_chunks`). Retorna a tupla (hexdigest, bytes_lidos).
+    """
+    hasher = hashlib.sha256()
+    total = stream_chunks(stream, hasher.update, chunk_size, timings)
+    return hasher.hexdigest(), total
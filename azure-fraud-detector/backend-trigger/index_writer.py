@@ -0,0 +1,284 @@
+import json
+import logging
+import threading
+import time
+
+from instrumentation import THROTTLE_STATUS_CODES, get_metrics
+
+# Campos das impressões digitais copiados para o índice (ver fingerprint.py)
+FINGERPRINT_FIELDS = ("fast_hash", "size_bytes", "minhash", "image_hash", "lsh_bands")
+# Contêiner dos documentos que o índice recusou depois de todos os reenvios (ver BlobDeadLetter)
+DEAD_LETTER_CONTAINER = "indexacao-pendente"
+
+
+def build_index_document(document_hash, filename, fingerprint=None, status="Processado_V5"):
+    """
+    Documento do índice para um blob hasheado: o mesmo no Blob Trigger e na
+    reconciliação (backfill.py). A chave é o próprio hash.
+    """
+    document = {
+        "id": document_hash,
+        "document_hash": document_hash,
+        "status": status,
+        "filename": filename,
+        "processed_timestamp": time.time(),
+    }
+    if fingerprint is not None:
+        document.update({field: fingerprint[field] for field in FINGERPRINT_FIELDS})
+    return document
+
+
+class BatchingIndexWriter:
+    """
+    Escritor em lote para o Azure AI Search.
+
+    Acumula documentos entre invocações da função e envia-os num único
+    `merge_or_upload_documents` quando o lote atinge `max_batch_size` ou
+    quando o documento mais antigo pendente passa de `max_age_seconds`.
+    As chaves recusadas (result[i].succeeded == False, ou todas se o pedido
+    inteiro falhar) são reenviadas juntas num só pedido por rodada, com
+    backoff entre rodadas, até `max_retries` rodadas. Os documentos que
+    ainda assim falham vão para `dead_letter` (ex.: `BlobDeadLetter`), se
+    houver. Sem ele, ou se a gravação lá também falhar, as chaves de um
+    flush automático (disparado pelo `add` ou pelo flusher de fundo) são
+    guardadas e devolvidas pela próxima chamada a `flush()`.
+
+    Aceita qualquer objeto com a interface `merge_or_upload_documents` do
+    SearchClient, o que permite testá-lo contra um cliente falso local.
+
+    Com a instrumentação ligada, cada pedido ao índice alimenta o histograma
+    `index_write_seconds`, e os reenvios e as recusas 429/503 viram
+    contadores.
+
+    Atenção: documentos pendentes vivem apenas na memória do worker. O
+    `close` é registrado no atexit, mas se o host for reciclado à força
+    antes do flush eles se perdem; o blob continua no contêiner e a
+    reconciliação (backfill.py) repõe o documento no índice.
+    """
+
+    # Limite do serviço: 1000 ações por pedido de indexação
+    MAX_SERVICE_BATCH = 1000
+
+    def __init__(self, search_client, max_batch_size=100, max_age_seconds=5.0,
+                 max_retries=3, retry_backoff_seconds=0.5, key_field="id",
+                 background_flush=True, metrics=None, dead_letter=None):
+        self.search_client = search_client
+        self.max_batch_size = max(1, min(max_batch_size, self.MAX_SERVICE_BATCH))
+        self.max_age_seconds = max_age_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.key_field = key_field
+        self.background_flush = background_flush
+        self.instrumentation = metrics or get_metrics()
+        self.dead_letter = dead_letter
+
+        self._pending = {}  # chave -> documento (o mais recente vence)
+        self._unreported_failures = []  # chaves que falharam em flushes sem quem recebesse o retorno
+        self._oldest_pending = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+        self._metrics = {
+            "flushes": 0,
+            "documents_indexed": 0,
+            "documents_failed": 0,
+            "documents_dead_lettered": 0,
+            "retries": 0,
+            "last_batch_size": 0,
+            "last_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+    # --- API pública ---
+
+    def add(self, document):
+        """Enfileira um documento; dispara o flush se o lote estiver cheio ou velho."""
+        with self._lock:
+            self._pending[document[self.key_field]] = document
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            due = self._is_due_locked()
+        self._ensure_flusher()
+        if due:
+            self._keep_failures(self._flush())
+
+    def flush(self):
+        """
+        Envia tudo o que está pendente. Retorna a lista de chaves que falharam,
+        incluindo as dos flushes automáticos desde a chamada anterior.
+        """
+        failed = self._flush()
+        with self._lock:
+            unreported, self._unreported_failures = self._unreported_failures, []
+        return unreported + failed
+
+    def flush_if_due(self):
+        """Faz o flush apenas se o lote já atingiu o tamanho ou a idade limite."""
+        with self._lock:
+            due = self._is_due_locked()
+        return self.flush() if due else []
+
+    def metrics(self):
+        """Retorna uma cópia das métricas de flush (mais o número de pendentes)."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot["pending"] = len(self._pending)
+        return snapshot
+
+    def close(self):
+        """Para o flusher de fundo e envia o que restar."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.max_age_seconds + 1)
+        return self.flush()
+
+    # --- Internos ---
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.values())
+                self._pending = {}
+                self._oldest_pending = None
+            if not batch:
+                return []
+
+            start = time.perf_counter()
+            failed = []
+            for i in range(0, len(batch), self.max_batch_size):
+                failed.extend(self._send_batch(batch[i:i + self.max_batch_size]))
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._metrics["flushes"] += 1
+                self._metrics["documents_indexed"] += len(batch) - len(failed)
+                self._metrics["documents_failed"] += len(failed)
+                self._metrics["last_batch_size"] = len(batch)
+                self._metrics["last_flush_seconds"] = elapsed
+                self._metrics["total_flush_seconds"] += elapsed
+
+            logging.info(f"Flush do índice: {len(batch) - len(failed)}/{len(batch)} documentos em {elapsed:.3f}s.")
+            if failed and self.dead_letter is not None:
+                by_key = {doc[self.key_field]: doc for doc in batch}
+                failed = self._send_to_dead_letter([by_key[key] for key in failed])
+            return failed
+
+    def _send_to_dead_letter(self, documents):
+        """Entrega ao `dead_letter` os documentos recusados. Retorna as chaves que não ficaram guardadas."""
+        try:
+            self.dead_letter(documents)
+        except Exception as e:
+            keys = [doc[self.key_field] for doc in documents]
+            logging.error(f"Falha ao guardar {len(keys)} documentos recusados pelo índice: {e}. Chaves: {keys}")
+            return keys
+        with self._lock:
+            self._metrics["documents_dead_lettered"] += len(documents)
+        self.instrumentation.count("index_dead_lettered", len(documents))
+        logging.warning(f"{len(documents)} documentos recusados pelo índice guardados para nova tentativa.")
+        return []
+
+    def _keep_failures(self, failed):
+        if failed:
+            with self._lock:
+                self._unreported_failures.extend(failed)
+
+    def _is_due_locked(self):
+        if len(self._pending) >= self.max_batch_size:
+            return True
+        return (self._oldest_pending is not None
+                and time.monotonic() - self._oldest_pending >= self.max_age_seconds)
+
+    def _ensure_flusher(self):
+        if not self.background_flush or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="index-writer-flusher", daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        interval = max(self.max_age_seconds / 2, 0.05)
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    due = self._is_due_locked()
+                if due:
+                    self._keep_failures(self._flush())
+            except Exception as e:
+                logging.error(f"Falha no flush em segundo plano: {e}")
+
+    def _send_batch(self, batch):
+        """
+        Envia um lote e reenvia as chaves recusadas em rodadas: uma espera por
+        rodada e um só pedido com todas as que ainda falham. Retorna as chaves
+        que falharam em todas as rodadas.
+        """
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff_seconds * (2 ** (attempt - 1)))
+                with self._lock:
+                    self._metrics["retries"] += 1
+                self.instrumentation.count("index_write_retries")
+            pending = self._send_once(pending, attempt)
+            if not pending:
+                return []
+        logging.error(f"{len(pending)} documentos não puderam ser indexados após {self.max_retries} novas tentativas.")
+        self.instrumentation.count("index_write_failed", len(pending))
+        return [doc[self.key_field] for doc in pending]
+
+    def _send_once(self, documents, attempt):
+        """Um pedido ao índice. Retorna os documentos recusados (todos, se o pedido inteiro falhar)."""
+        label = f"tentativa {attempt}" if attempt else "primeiro envio"
+        try:
+            with self.instrumentation.timer("index_write_seconds"):
+                results = self.search_client.merge_or_upload_documents(documents=documents)
+            self.instrumentation.count("index_documents_sent", len(documents))
+        except Exception as e:
+            # O pedido inteiro falhou (ex.: 503, timeout): todas as chaves seguem para a próxima rodada
+            logging.warning(f"Lote de {len(documents)} documentos falhou por inteiro ({label}): {e}")
+            self._count_failure(e)
+            return documents
+
+        failed = []
+        for doc, result in zip(documents, results):
+            if not result.succeeded:
+                logging.warning(f"Falha ao indexar {doc[self.key_field]} ({label}, status {result.status_code}): "
+                                f"{result.error_message}")
+                self._count_failure(status_code=result.status_code)
+                failed.append(doc)
+        return failed
+
+    def _count_failure(self, error=None, status_code=None):
+        """Conta a recusa por limite do serviço (429/503) separada das outras falhas."""
+        if status_code is None:
+            status_code = getattr(error, "status_code", None)
+        if status_code in THROTTLE_STATUS_CODES:
+            self.instrumentation.count("index_write_throttled")
+
+
+class BlobDeadLetter:
+    """
+    Destino dos documentos que o índice recusou depois de todos os reenvios:
+    um blob JSON por documento (`<chave>.json`) num contêiner próprio. O
+    `backfill.py --dead-letters` reenvia-os ao índice e apaga os que entram.
+
+    `get_container_client` só é chamado na primeira falha, para o SDK do
+    Storage não pesar no arranque da função.
+    """
+
+    def __init__(self, get_container_client, key_field="id"):
+        self.get_container_client = get_container_client
+        self.key_field = key_field
+        self._container_client = None
+        self._lock = threading.Lock()
+
+    def __call__(self, documents):
+        with self._lock:
+            if self._container_client is None:
+                self._container_client = self.get_container_client()
+        for document in documents:
+            self._container_client.get_blob_client(f"{document[self.key_field]}.json").upload_blob(
+                json.dumps(document), overwrite=True)
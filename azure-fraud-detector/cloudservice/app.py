@@ -1,75 +1,100 @@
 import streamlit as st
 import os
-import hashlib
 import time
 import base64
 import logging
+from collections import deque
 from dotenv import load_dotenv
-from azure.core.credentials import AzureKeyCredential
-# ResourceExistsError não é mais pego no frontend, mas mantido para referência
-from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
-from azure.storage.blob import BlobServiceClient
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes.models import SearchIndex
-from azure.search.documents.indexes import SearchIndexClient
+# ResourceExistsError é tratado em submission.upload_document (reivindicação atômica)
+# e ResourceNotFoundError em index_lookup.hash_exists. Os SDKs do Blob e do
+# Search só são importados quando clients.py cria o primeiro cliente.
+
+from clients import get_blob_service_client, get_search_client
+from hash_cache import HashLookup, iter_index_hashes
+from index_lookup import existing_hashes, hash_exists
+from digest_cache import DigestCache
+from batch import VERDICT_ACCEPTED, VERDICT_BATCH_DUPLICATE, VERDICT_REJECTED, process_batch
+from submission import upload_document
+from instrumentation import get_metrics
 
 # --- 1. CONFIGURAÇÃO E FUNÇÕES DE APOIO ---
 
 st.set_page_config(layout="centered")
 
+# Histogramas por fase e contadores, compartilhados por todas as sessões do
+# processo (desligados sem METRICS_EXPORTER)
+metrics = get_metrics()
+
 def initialize_app():
-    """Carrega configs e inicializa clientes no st.session_state."""
+    """
+    Carrega configs e põe no st.session_state os clientes do processo
+    (criados uma vez e compartilhados por todas as sessões; ver clients.py).
+    """
     if 'initialized' in st.session_state:
         return True
     
     load_dotenv()
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
     required_vars = ['AZURE_STORAGE_CONNECTION_STRING', 'AZURE_SEARCH_SERVICE_NAME', 'AZURE_SEARCH_KEY']
     if not all(os.getenv(var) for var in required_vars):
         st.error("ERRO CRÍTICO: Variáveis de ambiente não encontradas no .env.")
         return False
 
-    st.session_state.blob_service_client = BlobServiceClient.from_connection_string(os.getenv('AZURE_STORAGE_CONNECTION_STRING'))
-    search_endpoint = f"https://{os.getenv('AZURE_SEARCH_SERVICE_NAME')}.search.windows.net"
-    search_credential = AzureKeyCredential(os.getenv('AZURE_SEARCH_KEY'))
-    st.session_state.search_client = SearchClient(endpoint=search_endpoint, index_name="index-vigilancia-fraudes", credential=search_credential)
+    st.session_state.blob_service_client = get_blob_service_client()
+    st.session_state.search_client = get_search_client()
     st.session_state.initialized = True
     return True
 
-def calculate_hash(file_bytes):
-    """Calcula o hash SHA256 do arquivo."""
-    hasher = hashlib.sha256()
-    hasher.update(file_bytes)
-    return hasher.hexdigest()
+def query_hash_in_index(search_client, document_hash):
+    """
+    Consulta remota: verifica se um hash já existe no índice por leitura
+    direta da chave (o backend grava id == document_hash).
+    """
+    with metrics.timer("index_lookup_seconds"):
+        exists = hash_exists(search_client, document_hash)
+    logging.debug(f"Hash {document_hash} encontrado no índice: {exists}")
+    return exists
+
+@st.cache_resource
+def get_hash_lookup(_search_client):
+    """
+    Camada de cache compartilhada por todas as sessões do processo:
+    hashes confirmados ficam em LRU/TTL e um filtro de Bloom dos hashes
+    conhecidos responde localmente os casos "com certeza novo".
+    """
+    return HashLookup(
+        remote_check=lambda document_hash: query_hash_in_index(_search_client, document_hash),
+        load_hashes=lambda since=None: iter_index_hashes(_search_client, since=since),
+        remote_check_many=lambda hashes: timed_existing_hashes(_search_client, hashes),
+    )
+
+def timed_existing_hashes(search_client, hashes):
+    """Consulta remota em lote, cronometrada como uma fase própria."""
+    with metrics.timer("index_lookup_many_seconds"):
+        return existing_hashes(search_client, hashes)
 
 def check_hash_in_index(document_hash):
     """
-    Verifica se um hash já existe no índice, usando o método de 'search' (V1).
-    Este método é o correto pois filtra pelo campo 'document_hash'.
+    Verifica se um hash já existe no índice, passando antes pelo cache local.
     """
     try:
-        # --- DEBUG ---
-        logging.basicConfig(level=logging.INFO)
-        logging.info(f"Depuração: Verificando hash {document_hash} no índice...")
-        
-        results = st.session_state.search_client.search(
-            search_text="*",  # Busca em tudo
-            filter=f"document_hash eq '{document_hash}'", # Filtra pelo campo 'document_hash'
-            include_total_count=True # Pede para o Azure contar o total
-        )
-        
-        count = results.get_count()
-        
-        # --- DEBUG ---
-        logging.info(f"Depuração: Contagem de resultados encontrada: {count}")
-        
-        return count > 0 # Se count > 0, o hash existe
-    
+        with metrics.timer("hash_lookup_seconds"):
+            return get_hash_lookup(st.session_state.search_client).contains(document_hash)
+
     except Exception as e:
+        metrics.count("index_lookup_errors")
         st.error(f"Erro ao consultar o índice: {e}")
         logging.error(f"Falha na consulta ao índice: {e}")
         # Doutrina "falhe em segurança"
         return True
 
+def check_hashes_in_index(hashes):
+    """
+    Versão em lote: retorna o conjunto dos hashes que já existem no índice.
+    Erros são propagados; o processamento em lote rejeita tudo nesse caso.
+    """
+    return get_hash_lookup(st.session_state.search_client).contains_many(hashes)
+
 def clear_status():
     """Limpa o status da operação anterior ao carregar um novo arquivo."""
     st.session_state.last_status = None
@@ -80,6 +105,11 @@ if 'processing' not in st.session_state:
     st.session_state.processing = False
 if 'last_status' not in st.session_state:
     st.session_state.last_status = None
+if 'digest_cache' not in st.session_state:
+    st.session_state.digest_cache = DigestCache(max_entries=int(os.getenv('DIGEST_CACHE_ENTRIES', '64')))
+if 'submission_metrics' not in st.session_state:
+    # Só as últimas entradas aparecem na barra lateral; as antigas não ficam na sessão
+    st.session_state.submission_metrics = deque(maxlen=10)
 
 if not initialize_app():
     st.stop()
@@ -100,6 +130,66 @@ if st.session_state.last_status:
     elif status_type == "error":
         st.error(message)
 
+with st.sidebar.expander("Métricas do cache de hashes"):
+    cache_stats = get_hash_lookup(st.session_state.search_client).stats()
+    st.metric("Taxa de acerto", f"{cache_stats['hit_rate']:.1%}")
+    st.caption(f"Latência poupada por acerto: p50 {cache_stats['saved_p50_seconds'] * 1000:.0f} ms, "
+               f"p99 {cache_stats['saved_p99_seconds'] * 1000:.0f} ms "
+               f"(total ~{cache_stats['saved_total_seconds']:.1f} s)")
+    if cache_stats["batch_calls"]:
+        st.caption(f"Consultas em lote: {cache_stats['batch_calls']} ({cache_stats['batch_hashes']} hashes), "
+                   f"p50 {cache_stats['batch_p50_seconds'] * 1000:.0f} ms, "
+                   f"p99 {cache_stats['batch_p99_seconds'] * 1000:.0f} ms")
+    st.json(cache_stats, expanded=False)
+
+if metrics.enabled:
+    with st.sidebar.expander("Métricas por fase (processo)"):
+        metrics_snapshot = metrics.snapshot()
+        for phase, histogram in metrics_snapshot["histograms"].items():
+            st.caption(f"{phase}: {histogram['count']} medidas, p50 {histogram['p50'] * 1000:.1f} ms, "
+                       f"p99 {histogram['p99'] * 1000:.1f} ms")
+        st.json(metrics_snapshot["counters"], expanded=False)
+
+with st.sidebar.expander("Métricas de hash por submissão"):
+    for entry in reversed(st.session_state.submission_metrics):
+        st.caption(f"{entry['arquivo']}: {entry['hash_seconds'] * 1000:.1f} ms de hash, "
+                   f"{entry['bytes_hashed']} bytes lidos, {entry['bytes_copied']} bytes copiados"
+                   f"{' (cache)' if entry['cache_hit'] else ''}")
+
+analysis_mode = st.radio("Modo de análise:", ["Documento único", "Lote (vários arquivos)"], horizontal=True)
+
+# --- MODO LOTE: vários comprovantes numa única submissão ---
+if analysis_mode == "Lote (vários arquivos)":
+    uploaded_files = st.file_uploader(
+        "Selecione os arquivos dos comprovantes:",
+        type=['pdf', 'png', 'jpg', 'jpeg'],
+        accept_multiple_files=True,
+        key='uploader_batch'
+    )
+
+    if uploaded_files and st.button("Analisar Lote"):
+        # Os uploads rodam em threads fora do contexto do Streamlit:
+        # os clientes são capturados aqui, e não lidos do session_state lá.
+        blob_service_client = st.session_state.blob_service_client
+        hash_lookup = get_hash_lookup(st.session_state.search_client)
+        with st.spinner(f"Analisando {len(uploaded_files)} documentos..."):
+            st.session_state.last_batch_results = process_batch(
+                [(f.name, f.getvalue()) for f in uploaded_files],
+                check_existing=check_hashes_in_index,
+                upload=lambda name, doc_hash, content: upload_document(blob_service_client, hash_lookup, name, doc_hash, content),
+                max_workers=int(os.getenv('BATCH_UPLOAD_CONCURRENCY', '8')),
+            )
+
+    batch_results = st.session_state.get('last_batch_results')
+    if batch_results:
+        verdicts = [row["veredito"] for row in batch_results]
+        col_ok, col_rejected, col_dup = st.columns(3)
+        col_ok.metric("Em análise", verdicts.count(VERDICT_ACCEPTED))
+        col_rejected.metric("Rejeitados", verdicts.count(VERDICT_REJECTED))
+        col_dup.metric("Duplicados no lote", verdicts.count(VERDICT_BATCH_DUPLICATE))
+        st.dataframe(batch_results, use_container_width=True)
+    st.stop()
+
 uploaded_file = st.file_uploader(
     "Selecione o arquivo do comprovante:",
     type=['pdf', 'png', 'jpg', 'jpeg'],
@@ -118,16 +208,21 @@ if st.session_state.processing:
     try:
         status_placeholder = st.empty()
         progress_bar = st.progress(0, "Iniciando análise...")
-        file_bytes = uploaded_file.getvalue()
-
         # FASE 1: Verificação de hash (Rápida)
+        # O hash sai do cache da sessão ou é calculado sobre a memoryview do
+        # upload, sem copiar o conteúdo (getvalue() faria uma cópia inteira).
         progress_bar.progress(33, "Fase 1: Verificando duplicatas...")
-        doc_hash = calculate_hash(file_bytes)
+        doc_hash, hash_metrics = st.session_state.digest_cache.digest(uploaded_file)
+        st.session_state.submission_metrics.append({"arquivo": uploaded_file.name, **hash_metrics})
+        if not hash_metrics["cache_hit"]:
+            metrics.observe("hash_seconds", hash_metrics["hash_seconds"])
+            metrics.count("bytes_processed", hash_metrics["bytes_hashed"])
         
         if check_hash_in_index(doc_hash):
             # --- CAMINHO 1: HASH ENCONTRADO (REJEITADO) ---
             progress_bar.progress(100, "Concluído.")
             st.session_state.last_status = {"type": "error", "message": f"Status: **REJEITADO**. Este documento (Hash: {doc_hash[:10]}...) já existe no sistema."}
+            metrics.count("documents_rejected")
             # (Não fazemos mais nada. O código pulará para o 'finally')
             
         else:
@@ -136,17 +231,19 @@ if st.session_state.processing:
             # FASE 2: Submissão para Pipeline (Rápida)
             progress_bar.progress(66, "Fase 2: Enviando para o pipeline de IA...")
             
-            file_extension = os.path.splitext(uploaded_file.name)[1]
-            blob_name = f"{doc_hash}{file_extension}"
-            
-            blob_client = st.session_state.blob_service_client.get_blob_client(container="documentos-brutos", blob=blob_name)
-            
-            blob_metadata = { "original_filename": uploaded_file.name }
-            blob_client.upload_blob(file_bytes, metadata=blob_metadata, overwrite=True) 
-            
+            uploaded_file.seek(0)
+            with metrics.timer("upload_seconds"):
+                claimed = upload_document(st.session_state.blob_service_client, get_hash_lookup(st.session_state.search_client),
+                                          uploaded_file.name, doc_hash, uploaded_file, length=uploaded_file.size)
+            metrics.count("documents_accepted" if claimed else "documents_rejected")
+
             # FASE 3: Veredito Imediato (Rápido)
             progress_bar.progress(100, "Fase 3: Documento protocolado.")
-            st.session_state.last_status = {"type": "success", "message": f"Status: **EM ANÁLISE**. O documento é novo e foi recebido com sucesso. O processamento de IA será concluído em segundo plano."}
+            if claimed:
+                st.session_state.last_status = {"type": "success", "message": f"Status: **EM ANÁLISE**. O documento é novo e foi recebido com sucesso. O processamento de IA será concluído em segundo plano."}
+            else:
+                # Outra submissão criou o blob entre a consulta e o upload
+                st.session_state.last_status = {"type": "error", "message": f"Status: **REJEITADO**. Este documento (Hash: {doc_hash[:10]}...) foi submetido por outra sessão neste instante."}
 
     except Exception as e:
         # Erro genérico na submissão
@@ -0,0 +1,88 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Abaixo deste volume total o custo de subir processos supera o ganho
+PROCESS_POOL_MIN_BYTES = 8 * 1024 * 1024
+
+VERDICT_REJECTED = "REJEITADO"
+VERDICT_ACCEPTED = "EM ANÁLISE"
+VERDICT_BATCH_DUPLICATE = "DUPLICADO NO LOTE"
+VERDICT_ERROR = "FALHA NA SUBMISSÃO"
+
+
+def hash_bytes(data):
+    """SHA-256 de um conteúdo (função de topo para poder ir a um ProcessPool)."""
+    hasher = hashlib.sha256()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def hash_many(contents, max_workers=None):
+    """Calcula os hashes de vários conteúdos, em paralelo quando compensa."""
+    if len(contents) < 2 or sum(len(c) for c in contents) < PROCESS_POOL_MIN_BYTES:
+        return [hash_bytes(c) for c in contents]
+    workers = min(max_workers or os.cpu_count() or 1, len(contents))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_bytes, contents, chunksize=max(1, len(contents) // (workers * 4))))
+
+
+def process_batch(files, check_existing, upload, max_workers=8):
+    """
+    Processa um lote de documentos: hash → deduplicação → consulta → upload.
+
+    `files` é uma lista de (nome, conteúdo). `check_existing(hashes)` recebe
+    os hashes únicos do lote e retorna o conjunto dos que já existem no
+    índice; `upload(nome, hash, conteúdo)` envia um documento novo e retorna
+    False se outra submissão já reivindicou o mesmo hash.
+
+    Arquivos idênticos dentro do mesmo lote são resolvidos antes de qualquer
+    chamada remota. Se a consulta ao índice falhar, todo o lote é rejeitado
+    (doutrina "falhe em segurança"). Retorna uma linha por arquivo, na ordem
+    de entrada.
+    """
+    hashes = hash_many([content for _, content in files])
+    results = [{"arquivo": name, "hash": h[:10] + "...", "veredito": None, "detalhe": ""}
+               for (name, _), h in zip(files, hashes)]
+
+    first_seen = {}
+    for i, h in enumerate(hashes):
+        if h in first_seen:
+            results[i]["veredito"] = VERDICT_BATCH_DUPLICATE
+            results[i]["detalhe"] = f"Idêntico a '{files[first_seen[h]][0]}'."
+        else:
+            first_seen[h] = i
+
+    try:
+        existing = check_existing(list(first_seen))
+    except Exception as e:
+        logging.error(f"Falha na consulta em lote ao índice: {e}")
+        for i in first_seen.values():
+            results[i]["veredito"] = VERDICT_REJECTED
+            results[i]["detalhe"] = f"Erro ao consultar o índice: {e}"
+        return results
+
+    to_upload = []
+    for h, i in first_seen.items():
+        if h in existing:
+            results[i]["veredito"] = VERDICT_REJECTED
+            results[i]["detalhe"] = "Documento já existe no sistema."
+        else:
+            to_upload.append(i)
+
+    def _submit(i):
+        name, content = files[i]
+        try:
+            if not upload(name, hashes[i], content):
+                return i, VERDICT_REJECTED, "Documento submetido em paralelo por outra sessão."
+            return i, VERDICT_ACCEPTED, "Recebido para processamento."
+        except Exception as e:
+            return i, VERDICT_ERROR, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, verdict, detail in pool.map(_submit, to_upload):
+            results[i]["veredito"] = verdict
+            results[i]["detalhe"] = detail
+
+    return results
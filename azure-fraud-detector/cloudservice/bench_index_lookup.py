@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: busca filtrada + contagem vs leitura por chave vs lote search.in.
+
+Roda contra um SearchClient falso local. O stub simula o custo de cada
+pedido com um tempo fixo de ida e volta (--rtt-ms) mais um custo de
+servidor por tipo de consulta (--search-ms para busca filtrada com
+contagem, --get-ms para leitura pela chave), e conta os pedidos feitos.
+Os números absolutos dependem desses parâmetros; o que o benchmark mostra
+é quantos pedidos cada caminho faz e quanto isso custa por hash.
+
+Uso:
+    python bench_index_lookup.py --docs 100000 --lookups 2000 --rtt-ms 5
+"""
+import argparse
+import random
+import re
+import time
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from index_lookup import existing_hashes, hash_exists, hash_exists_by_filter
+
+
+class _Results(list):
+    def __init__(self, docs, count=None):
+        super().__init__(docs)
+        self._count = count
+
+    def get_count(self):
+        return self._count
+
+
+class StubSearchClient:
+    """SearchClient falso: documentos num dict, custo simulado por pedido."""
+
+    def __init__(self, docs, rtt_ms, search_ms, get_ms):
+        self.docs = docs
+        self.rtt = rtt_ms / 1000
+        self.search_cost = search_ms / 1000
+        self.get_cost = get_ms / 1000
+        self.requests = 0
+
+    def _wait(self, cost):
+        self.requests += 1
+        time.sleep(self.rtt + cost)
+
+    def get_document(self, key, selected_fields=None):
+        self._wait(self.get_cost)
+        if key not in self.docs:
+            raise ResourceNotFoundError(f"Documento {key} não encontrado.")
+        return {"id": key}
+
+    def search(self, search_text=None, filter=None, include_total_count=False, select=None, top=None, **kwargs):
+        self._wait(self.search_cost)
+        match = re.fullmatch(r"document_hash eq '(\w+)'", filter or "")
+        if match:
+            hits = [self.docs[match.group(1)]] if match.group(1) in self.docs else []
+            return _Results(hits, count=len(hits) if include_total_count else None)
+        match = re.fullmatch(r"search\.in\(id, '([\w,]*)', ','\)", filter or "")
+        if match:
+            keys = match.group(1).split(",")
+            return _Results([{"id": k} for k in keys if k in self.docs][:top])
+        raise ValueError(f"Filtro não suportado pelo stub: {filter}")
+
+
+def _time(label, client, fn):
+    client.requests = 0
+    start = time.perf_counter()
+    found = fn()
+    elapsed = time.perf_counter() - start
+    return label, elapsed, client.requests, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000, help="Documentos no índice falso.")
+    parser.add_argument("--lookups", type=int, default=1000, help="Hashes consultados (metade existe).")
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--search-ms", type=float, default=1.0)
+    parser.add_argument("--get-ms", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    existing = [f"{rng.getrandbits(256):064x}" for _ in range(args.docs)]
+    docs = {h: {"id": h, "document_hash": h} for h in existing}
+    queries = rng.sample(existing, args.lookups // 2) + [f"{rng.getrandbits(256):064x}" for _ in range(args.lookups - args.lookups // 2)]
+    rng.shuffle(queries)
+
+    client = StubSearchClient(docs, args.rtt_ms, args.search_ms, args.get_ms)
+    runs = [
+        _time("busca filtrada + contagem", client, lambda: {h for h in queries if hash_exists_by_filter(client, h)}),
+        _time("leitura pela chave", client, lambda: {h for h in queries if hash_exists(client, h)}),
+        _time("lote search.in(id)", client, lambda: existing_hashes(client, queries, batch_size=args.batch_size)),
+    ]
+
+    expected = runs[0][3]
+    print(f"{'caminho':<28} | {'total (s)':>9} | {'pedidos':>7} | {'µs/hash':>9}")
+    print("-" * 63)
+    for label, elapsed, requests, found in runs:
+        flag = "" if found == expected else "  <-- RESULTADO DIVERGENTE"
+        print(f"{label:<28} | {elapsed:>9.3f} | {requests:>7} | {elapsed / len(queries) * 1e6:>9.1f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
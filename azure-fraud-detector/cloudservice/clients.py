@@ -0,0 +1,62 @@
+"""
+Clientes do Azure (Blob e AI Search) criados sob demanda e compartilhados pelo processo.
+
+Antes, cada sessão do Streamlit montava os seus próprios clientes em
+`initialize_app`, e os SDKs eram importados junto com o app. Aqui o import
+pesado e a construção só acontecem na primeira chamada de cada getter. Todas
+as sessões (e as threads do processamento em lote) recebem a mesma
+instância, que reaproveita o pool de conexões. Cada cliente tem o seu lock
+(double-checked): o Blob não espera pelo Search e vice-versa.
+
+Os getters leem o ambiente na primeira chamada, então o `.env` deve ser
+carregado antes (o app chama `load_dotenv()` no início).
+"""
+import os
+import threading
+
+from instrumentation import get_metrics
+
+DEFAULT_INDEX_NAME = "index-vigilancia-fraudes"
+
+_instances = {}
+_locks = {"blob": threading.Lock(), "search": threading.Lock()}
+
+
+def _create_blob_service_client():
+    from azure.storage.blob import BlobServiceClient
+
+    return BlobServiceClient.from_connection_string(os.environ['AZURE_STORAGE_CONNECTION_STRING'],
+                                                    **get_metrics().client_kwargs("blob"))
+
+
+def _create_search_client():
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+
+    return SearchClient(endpoint=f"https://{os.environ['AZURE_SEARCH_SERVICE_NAME']}.search.windows.net",
+                        index_name=os.environ.get('AZURE_SEARCH_INDEX_NAME', DEFAULT_INDEX_NAME),
+                        credential=AzureKeyCredential(os.environ['AZURE_SEARCH_KEY']),
+                        **get_metrics().client_kwargs("search"))
+
+
+_FACTORIES = {"blob": _create_blob_service_client, "search": _create_search_client}
+
+
+def _get(name):
+    instance = _instances.get(name)
+    if instance is None:
+        with _locks[name]:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = _FACTORIES[name]()
+    return instance
+
+
+def get_blob_service_client():
+    """BlobServiceClient do processo. KeyError se a connection string não estiver no ambiente."""
+    return _get("blob")
+
+
+def get_search_client():
+    """SearchClient do processo. KeyError se o serviço ou a chave não estiverem no ambiente."""
+    return _get("search")
@@ -0,0 +1,66 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+def hash_buffer(buffer):
+    """SHA-256 sobre um buffer (bytes, bytearray ou memoryview) sem copiá-lo."""
+    hasher = hashlib.sha256()
+    hasher.update(buffer)
+    return hasher.hexdigest()
+
+
+class DigestCache:
+    """
+    Memoização dos hashes dos arquivos enviados, para uso no escopo da sessão.
+
+    A chave é (id do upload, tamanho, nome): o mesmo arquivo não é relido nem
+    re-hasheado a cada `st.rerun()`. Sem id de upload, o arquivo não entra no
+    cache: (tamanho, nome) não identifica o conteúdo, e dois arquivos
+    diferentes com o mesmo nome e tamanho receberiam o mesmo hash. O hash é calculado direto sobre a
+    memoryview do UploadedFile (`getbuffer()`), sem a cópia de `getvalue()`.
+    As entradas mais antigas são descartadas além de `max_entries`.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._digests = OrderedDict()
+
+    @staticmethod
+    def key_for(uploaded_file):
+        """Chave do cache, ou None se o upload não tiver id."""
+        # `file_id` existe nas versões recentes do Streamlit; `id` nas antigas
+        upload_id = getattr(uploaded_file, "file_id", None) or getattr(uploaded_file, "id", None)
+        if upload_id is None:
+            return None
+        return (upload_id, uploaded_file.size, uploaded_file.name)
+
+    def digest(self, uploaded_file):
+        """
+        Retorna (hash, métricas). As métricas trazem o tempo de hash, os bytes
+        lidos pelo hasher, os bytes copiados pelo app e se houve acerto no cache.
+        """
+        key = self.key_for(uploaded_file)
+        cached = self._digests.get(key) if key is not None else None
+        if cached is not None:
+            self._digests.move_to_end(key)
+            return cached, {"cache_hit": True, "hash_seconds": 0.0, "bytes_hashed": 0, "bytes_copied": 0}
+
+        start = time.perf_counter()
+        view = uploaded_file.getbuffer()
+        try:
+            doc_hash = hash_buffer(view)
+            size = view.nbytes
+        finally:
+            view.release()
+        elapsed = time.perf_counter() - start
+
+        if key is not None:
+            self._digests[key] = doc_hash
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+
+        return doc_hash, {"cache_hit": False, "hash_seconds": elapsed, "bytes_hashed": size, "bytes_copied": 0}
+
+    def __len__(self):
+        return len(self._digests)
@@ -0,0 +1,299 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class TTLCache:
+    """Cache LRU com expiração (TTL) por entrada. Seguro para múltiplas threads."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BloomFilter:
+    """Filtro de Bloom simples sobre um bytearray (sem falsos negativos)."""
+
+    def __init__(self, capacity, false_positive_rate=0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing (Kirsch-Mitzenmacher) a partir de um único digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def iter_index_hashes(search_client, since=None, page_size=1000):
+    """
+    Percorre todos os valores de `document_hash` do índice (ou só os
+    processados desde o timestamp `since`), paginando por chave
+    (document_hash gt '<último>') para não esbarrar no limite de $skip.
+    """
+    last = ""
+    while True:
+        filters = [f"document_hash gt '{last}'"]
+        if since is not None:
+            filters.append(f"processed_timestamp ge {since}")
+        results = search_client.search(
+            search_text="*",
+            filter=" and ".join(filters),
+            select=["document_hash"],
+            order_by=["document_hash asc"],
+            top=page_size,
+        )
+        page = [doc["document_hash"] for doc in results]
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+class HashLookup:
+    """
+    Camada de consulta à frente do índice de hashes.
+
+    1. Hashes confirmados como existentes ficam num cache LRU/TTL local.
+    2. Um filtro de Bloom com todos os `document_hash` conhecidos é
+       reconstruído periodicamente (com atualizações incrementais entre as
+       reconstruções). Se o hash não está no filtro, ele é novo com certeza
+       e a consulta remota é evitada.
+    3. O resto cai na consulta remota (`remote_check`).
+
+    O filtro só responde "novo" enquanto a última atualização tiver menos de
+    `max_staleness_seconds`; fora dessa janela, ou se a carga falhar, todas
+    as consultas voltam ao caminho remoto. Exceções de `remote_check` são
+    propagadas para que o chamador aplique a sua própria política de erro.
+
+    Nas estatísticas, as consultas em lote (`remote_check_many`) contam à
+    parte das individuais: a latência de um lote não é a de uma consulta, e
+    a latência poupada por acerto vem só das individuais.
+    """
+
+    def __init__(self, remote_check, load_hashes=None, remote_check_many=None, cache_size=10000, cache_ttl_seconds=3600.0,
+                 refresh_seconds=30.0, rebuild_seconds=3600.0, max_staleness_seconds=60.0,
+                 bloom_capacity=1_000_000, false_positive_rate=0.001, overlap_seconds=120.0,
+                 latency_samples=1000):
+        self.remote_check = remote_check
+        self.remote_check_many = remote_check_many
+        self.load_hashes = load_hashes
+        self.present = TTLCache(cache_size, cache_ttl_seconds)
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.bloom_capacity = bloom_capacity
+        self.false_positive_rate = false_positive_rate
+        # Margem para documentos indexados com atraso (escrita em lote no backend)
+        self.overlap_seconds = overlap_seconds
+
+        self._bloom = None
+        self._bloom_refreshed_at = None  # time.monotonic() da última atualização bem-sucedida
+        self._bloom_rebuilt_at = None
+        self._last_refresh_wall = None  # time.time() usado no filtro incremental
+        self._refresh_lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"lookups": 0, "cache_hits": 0, "bloom_negatives": 0, "remote_calls": 0,
+                       "batch_calls": 0, "batch_hashes": 0}
+        self._remote_latencies = deque(maxlen=latency_samples)
+        self._batch_latencies = deque(maxlen=latency_samples)
+
+    # --- API pública ---
+
+    def contains(self, document_hash):
+        """True se o hash já existe no índice (pode levantar exceção do caminho remoto)."""
+        self._ensure_refresher()
+        self._count("lookups")
+
+        if self.present.get(document_hash):
+            self._count("cache_hits")
+            return True
+
+        bloom = self._fresh_bloom()
+        if bloom is not None and document_hash not in bloom:
+            self._count("bloom_negatives")
+            return False
+
+        return self._check_remote(document_hash)
+
+    def contains_many(self, hashes):
+        """
+        Versão em lote de `contains`: retorna o conjunto dos hashes existentes.
+        Os que não forem resolvidos localmente seguem numa única chamada a
+        `remote_check_many` (ou um a um, se ela não foi fornecida).
+        """
+        self._ensure_refresher()
+        found, pending = set(), []
+        bloom = self._fresh_bloom()
+        for document_hash in dict.fromkeys(hashes):
+            self._count("lookups")
+            if self.present.get(document_hash):
+                self._count("cache_hits")
+                found.add(document_hash)
+            elif bloom is not None and document_hash not in bloom:
+                self._count("bloom_negatives")
+            else:
+                pending.append(document_hash)
+
+        if pending:
+            if self.remote_check_many is None:
+                # Já contados como consultas acima: só o caminho remoto individual
+                found.update(h for h in pending if self._check_remote(h))
+                return found
+            start = time.perf_counter()
+            remote_found = set(self.remote_check_many(pending))
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self._stats["batch_calls"] += 1
+                self._stats["batch_hashes"] += len(pending)
+                self._batch_latencies.append(elapsed)
+            for document_hash in remote_found:
+                self.mark_present(document_hash)
+            found |= remote_found
+        return found
+
+    def mark_present(self, document_hash):
+        """Registra um hash como existente (ex.: logo após submeter o documento)."""
+        self.present.put(document_hash, True)
+        bloom = self._bloom
+        if bloom is not None and document_hash not in bloom:
+            bloom.add(document_hash)
+
+    def refresh(self):
+        """Reconstrói ou atualiza o filtro de Bloom a partir do índice."""
+        if self.load_hashes is None:
+            return
+        with self._refresh_lock:
+            now_mono, now_wall = time.monotonic(), time.time()
+            full = (self._bloom is None or self._bloom_rebuilt_at is None
+                    or now_mono - self._bloom_rebuilt_at >= self.rebuild_seconds)
+            try:
+                if full:
+                    bloom = BloomFilter(self.bloom_capacity, self.false_positive_rate)
+                    for h in self.load_hashes():
+                        bloom.add(h)
+                    if bloom.count > self.bloom_capacity:
+                        logging.warning(f"Filtro de Bloom acima da capacidade ({bloom.count} > {self.bloom_capacity}); "
+                                        "a taxa de falsos positivos vai subir.")
+                    self._bloom = bloom
+                    self._bloom_rebuilt_at = now_mono
+                else:
+                    since = self._last_refresh_wall - self.overlap_seconds
+                    for h in self.load_hashes(since=since):
+                        self._bloom.add(h)
+                self._bloom_refreshed_at = now_mono
+                self._last_refresh_wall = now_wall
+            except Exception as e:
+                # Sem atualização, o filtro envelhece e deixa de ser usado (fail safe)
+                logging.warning(f"Falha ao atualizar o filtro de hashes: {e}")
+
+    def stats(self):
+        """Taxa de acerto, latência remota evitada e latência dos lotes (p50/p99, em segundos)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._remote_latencies)
+            batch_latencies = sorted(self._batch_latencies)
+        hits = stats["cache_hits"] + stats["bloom_negatives"]
+        stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+        # Cada acerto local poupa uma consulta remota: a distribuição da latência
+        # remota observada é a distribuição da latência poupada por acerto.
+        stats["saved_p50_seconds"] = _percentile(latencies, 50)
+        stats["saved_p99_seconds"] = _percentile(latencies, 99)
+        stats["saved_total_seconds"] = hits * (sum(latencies) / len(latencies)) if latencies else 0.0
+        stats["batch_p50_seconds"] = _percentile(batch_latencies, 50)
+        stats["batch_p99_seconds"] = _percentile(batch_latencies, 99)
+        stats["cached_present"] = len(self.present)
+        stats["bloom_entries"] = self._bloom.count if self._bloom is not None else 0
+        stats["bloom_fresh"] = self._fresh_bloom() is not None
+        return stats
+
+    def close(self):
+        self._stop.set()
+
+    # --- Internos ---
+
+    def _check_remote(self, document_hash):
+        start = time.perf_counter()
+        exists = self.remote_check(document_hash)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats["remote_calls"] += 1
+            self._remote_latencies.append(elapsed)
+
+        if exists:
+            self.mark_present(document_hash)
+        return exists
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _fresh_bloom(self):
+        refreshed_at = self._bloom_refreshed_at
+        if self._bloom is None or refreshed_at is None:
+            return None
+        if time.monotonic() - refreshed_at > self.max_staleness_seconds:
+            return None
+        return self._bloom
+
+    def _ensure_refresher(self):
+        if self.load_hashes is None or self._refresher is not None:
+            return
+        with self._refresh_lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run_refresher, name="hash-lookup-refresher", daemon=True)
+                self._refresher.start()
+
+    def _run_refresher(self):
+        self.refresh()
+        while not self._stop.wait(self.refresh_seconds):
+            self.refresh()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
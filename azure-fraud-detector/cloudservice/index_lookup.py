@@ -0,0 +1,54 @@
+from azure.core.exceptions import ResourceNotFoundError
+
+# Quantos hashes vão num único filtro search.in (o serviço aceita listas
+# longas, mas pedidos menores mantêm a latência de cada chamada previsível)
+DEFAULT_BATCH_SIZE = 500
+
+
+def hash_exists_by_filter(search_client, document_hash):
+    """
+    Caminho antigo (V1): busca filtrada por `document_hash` com contagem total.
+    Mantido como referência e para o benchmark.
+    """
+    results = search_client.search(
+        search_text="*",
+        filter=f"document_hash eq '{document_hash}'",
+        include_total_count=True
+    )
+    return results.get_count() > 0
+
+
+def hash_exists(search_client, document_hash):
+    """
+    Verifica a existência de um hash com uma leitura direta pela chave.
+
+    O backend grava cada documento com `id == document_hash`, então um
+    GET /docs/{key} responde a pergunta sem consulta nem contagem.
+    ResourceNotFoundError significa que o hash é novo.
+    """
+    try:
+        search_client.get_document(key=document_hash, selected_fields=["id"])
+        return True
+    except ResourceNotFoundError:
+        return False
+
+
+def existing_hashes(search_client, hashes, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Verifica vários hashes de uma vez. Retorna o conjunto dos que já existem.
+
+    Cada lote vira uma única consulta `search.in(id, ...)` (filtro pela
+    chave, sem texto de busca nem contagem), em vez de uma chamada por hash.
+    """
+    unique = list(dict.fromkeys(hashes))
+    found = set()
+    for i in range(0, len(unique), batch_size):
+        batch = unique[i:i + batch_size]
+        results = search_client.search(
+            search_text="*",
+            filter=f"search.in(id, '{','.join(batch)}', ',')",
+            select=["id"],
+            top=len(batch),
+        )
+        found.update(doc["id"] for doc in results)
+    return found
@@ -0,0 +1,325 @@
+"""
+Instrumentação leve dos caminhos quentes: leitura, hash, consulta e escrita no índice.
+
+Cada fase vira um histograma de latência (buckets fixos, em segundos) e os
+volumes viram contadores (bytes processados, documentos, reenvios, respostas
+429/503 do serviço). O exportador é escolhido por variável de ambiente:
+
+* `METRICS_EXPORTER` vazio (padrão): desligado. `get_metrics()` devolve um
+  objeto nulo cujos métodos não fazem nada, e `timer()` devolve sempre o
+  mesmo gerenciador de contexto vazio: o custo é uma chamada de método.
+* `json`: o snapshot é regravado em `METRICS_JSON_PATH` (padrão
+  `metrics.json`) a cada `METRICS_EXPORT_INTERVAL_SECONDS` e na saída.
+* `prometheus`: um servidor HTTP local em `METRICS_PROMETHEUS_PORT` (padrão
+  9464) serve `/metrics` no formato texto do Prometheus e `/metrics.json`.
+  Escuta só em 127.0.0.1, salvo outro endereço em `METRICS_PROMETHEUS_HOST`
+  (ex.: 0.0.0.0 para um coletor fora do host).
+* `otel`: além da agregação local, cada medida vai para um Meter do
+  OpenTelemetry (com o `azure-monitor-opentelemetry` configurado, chega ao
+  Application Insights). Sem o pacote, fica só a agregação local.
+
+Este módulo é idêntico no backend-trigger, no cloudservice e na
+funcao-hash: cada um é implantado separadamente.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+# Limites superiores dos buckets (s): de 0,5 ms a 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Respostas que o serviço usa para pedir que o cliente desacelere
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class Histogram:
+    """Histograma de buckets fixos com contagem, soma e máximo."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # o último é o +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimativa por interpolação linear dentro do bucket (como o `histogram_quantile` do Prometheus)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= target:
+                return min(lower + (bound - lower) * (target - seen) / count, self.max)
+            seen += count
+            lower = bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Instrumentação desligada: todos os métodos são no-op."""
+
+    enabled = False
+
+    def timer(self, name):
+        return _NULL_TIMER
+
+    def observe(self, name, seconds):
+        pass
+
+    def observe_phases(self, timings):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def client_kwargs(self, prefix):
+        return {}
+
+    def snapshot(self):
+        return {}
+
+
+class Metrics:
+    """Registro em memória de histogramas (fases, em segundos) e contadores. Seguro para threads."""
+
+    enabled = True
+
+    def __init__(self, service="fraud-detector", meter=None):
+        self.service = service
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._meter = meter
+        self._instruments = {}
+
+    # --- Registro ---
+
+    def timer(self, name):
+        """Gerenciador de contexto que registra a duração do bloco no histograma `name`."""
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+        if self._meter is not None:
+            self._instrument(name, self._meter.create_histogram, "s").record(seconds)
+
+    def observe_phases(self, timings):
+        """Registra um dicionário {fase: segundos} acumulado ao longo de um documento."""
+        for name, seconds in timings.items():
+            self.observe(name, seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        if self._meter is not None:
+            self._instrument(name, self._meter.create_counter, "1").add(value)
+
+    def client_kwargs(self, prefix):
+        """
+        Argumentos para os clientes do Azure SDK: um `raw_response_hook` que
+        conta as respostas 429/503. O hook roda depois da política de retry,
+        então cada tentativa recusada é contada, inclusive as que o SDK
+        reenvia sozinho.
+        """
+        def hook(response):
+            status = response.http_response.status_code
+            if status in THROTTLE_STATUS_CODES:
+                self.count(f"{prefix}_throttled")
+        return {"raw_response_hook": hook}
+
+    # --- Exportação ---
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "service": self.service,
+                "uptime_seconds": time.time() - self.started_at,
+                "histograms": {name: h.snapshot() for name, h in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=1)
+
+    def to_prometheus(self, namespace="fraud"):
+        """Formato texto de exposição do Prometheus (histogramas cumulativos e contadores `_total`)."""
+        label = f'service="{self.service}"'
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                metric = f"{namespace}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{label}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+            for name, value in sorted(self._counters.items()):
+                metric = f"{namespace}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{{{label}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """Grava o snapshot de forma atômica (arquivo temporário e `os.replace`)."""
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+        os.replace(temporary, path)
+
+    # --- Internos ---
+
+    def _instrument(self, name, factory, unit):
+        # Duas threads com a mesma medida nova não podem criar dois instrumentos
+        with self._lock:
+            instrument = self._instruments.get(name)
+            if instrument is None:
+                instrument = self._instruments[name] = factory(name, unit=unit)
+            return instrument
+
+
+def _start_json_exporter(metrics, path, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.write_json(path)
+            except OSError as e:
+                logging.warning(f"Falha ao gravar as métricas em {path}: {e}")
+
+    threading.Thread(target=run, name="metrics-json-exporter", daemon=True).start()
+    atexit.register(metrics.write_json, path)
+
+
+def _start_prometheus_exporter(metrics, host, port):
+    # Import adiado: o http.server só entra no arranque quando o endpoint é pedido
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = metrics.to_json().encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        # Outro worker do mesmo host já ocupa a porta: as métricas seguem na memória
+        logging.warning(f"Endpoint de métricas indisponível em {host}:{port}: {e}")
+        return
+    threading.Thread(target=server.serve_forever, name="metrics-prometheus-exporter", daemon=True).start()
+    logging.info(f"Métricas em http://{host}:{port}/metrics")
+
+
+def _otel_meter(service):
+    try:
+        from opentelemetry import metrics as otel_metrics
+    except ImportError:
+        logging.warning("METRICS_EXPORTER=otel, mas o opentelemetry não está instalado: métricas só locais.")
+        return None
+    return otel_metrics.get_meter(service)
+
+
+def create_metrics(exporter=None, service=None):
+    """Cria a instrumentação a partir de `exporter` (ou de METRICS_EXPORTER) e liga o exportador."""
+    exporter = (os.environ.get("METRICS_EXPORTER", "") if exporter is None else exporter).strip().lower()
+    if exporter in ("", "0", "false", "off", "none"):
+        return NullMetrics()
+    service = service or os.environ.get("METRICS_SERVICE_NAME", "fraud-detector")
+    metrics = Metrics(service, meter=_otel_meter(service) if exporter == "otel" else None)
+    if exporter == "json":
+        _start_json_exporter(metrics, os.environ.get("METRICS_JSON_PATH", "metrics.json"),
+                             float(os.environ.get("METRICS_EXPORT_INTERVAL_SECONDS", "60")))
+    elif exporter == "prometheus":
+        _start_prometheus_exporter(metrics, os.environ.get("METRICS_PROMETHEUS_HOST", "127.0.0.1"),
+                                   int(os.environ.get("METRICS_PROMETHEUS_PORT", "9464")))
+    elif exporter != "otel":
+        logging.warning(f"METRICS_EXPORTER desconhecido: {exporter!r}. Métricas só na memória.")
+    return metrics
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Instrumentação do processo, criada na primeira chamada a partir do ambiente."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = create_metrics()
+    return _metrics
@@ -0,0 +1,56 @@
+import hashlib
+import logging
+import os
+
+from azure.core.exceptions import ResourceExistsError
+
+from batch import VERDICT_ACCEPTED, VERDICT_REJECTED
+
+# Contêiner monitorado pelo Blob Trigger do backend
+RAW_CONTAINER = "documentos-brutos"
+
+
+def upload_document(blob_service_client, hash_lookup, file_name, doc_hash, file_bytes, length=None):
+    """
+    Envia um documento novo para o contêiner monitorado pelo backend.
+    `file_bytes` pode ser o conteúdo ou um stream posicionado no início.
+
+    O upload é uma criação condicional (overwrite=False, ou seja,
+    If-None-Match: *) e funciona como a reivindicação atômica do hash: entre
+    submissões concorrentes do mesmo arquivo, só uma cria o blob. Retorna
+    True para quem criou e False se o blob já existia.
+    """
+    file_extension = os.path.splitext(file_name)[1].lower()
+    blob_name = f"{doc_hash}{file_extension}"
+
+    blob_client = blob_service_client.get_blob_client(container=RAW_CONTAINER, blob=blob_name)
+
+    blob_metadata = { "original_filename": file_name }
+    try:
+        blob_client.upload_blob(file_bytes, length=length, metadata=blob_metadata, overwrite=False)
+        claimed = True
+    except ResourceExistsError:
+        logging.info(f"Blob {blob_name} já existe: outra submissão reivindicou este hash.")
+        claimed = False
+    hash_lookup.mark_present(doc_hash)
+    return claimed
+
+
+def submit_document(blob_service_client, hash_lookup, file_name, file_bytes):
+    """
+    Fluxo completo de uma submissão, sem interface: hash → consulta → upload.
+    Retorna (veredito, hash). Erros na consulta rejeitam o documento
+    (doutrina "falhe em segurança"); erros no upload são propagados.
+    """
+    doc_hash = hashlib.sha256(file_bytes).hexdigest()
+    try:
+        exists = hash_lookup.contains(doc_hash)
+    except Exception as e:
+        logging.error(f"Falha na consulta ao índice: {e}")
+        exists = True
+    if exists:
+        return VERDICT_REJECTED, doc_hash
+
+    if not upload_document(blob_service_client, hash_lookup, file_name, doc_hash, file_bytes):
+        return VERDICT_REJECTED, doc_hash
+    return VERDICT_ACCEPTED, doc_hash
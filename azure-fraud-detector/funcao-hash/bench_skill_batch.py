@@ -0,0 +1,81 @@
+"""
+Benchmark: CalculateHash em linha vs em paralelo sobre lotes sintéticos.
+
+Gera lotes de Custom Skill ({"values": [...]}) com diferentes quantidades de
+registros e tamanhos de documento, e mede o tempo de cada modo de
+`process_values`. Também confere que os dois modos devolvem exatamente a
+mesma resposta (mesma ordem, mesmos hashes), e que um registro com `data`
+nulo ou que não é objeto só estraga o próprio resultado.
+
+Uso:
+    python bench_skill_batch.py
+    python bench_skill_batch.py --records 1 10 50 --sizes-kb 4 1024 8192
+"""
+import argparse
+import base64
+import hashlib
+import logging
+import os
+import time
+
+from skill_hash import PARALLEL_MIN_BATCH_CHARS, process_values
+
+
+def make_batch(records, size_kb):
+    payload = base64.b64encode(os.urandom(size_kb * 1024)).decode("ascii")
+    values = [{"recordId": str(i), "data": {"file_input": payload}} for i in range(records)]
+    # Um registro vazio e um inválido para exercitar o isolamento de erros
+    if records > 2:
+        values[1]["data"]["file_input"] = ""
+        values[2]["data"]["file_input"] = "nao-e-base64!"
+    return values
+
+
+def check_bad_data():
+    """Registros com `data` nulo ou texto no meio de um lote: erro ou aviso só neles, hash nos outros."""
+    values = [{"recordId": "1", "data": None}, {"recordId": "2", "data": {"file_input": "aGVsbG8="}},
+              {"recordId": "3", "data": "x"}]
+    expected_hash = hashlib.sha256(b"hello").hexdigest()
+    for parallel in (None, False, True):
+        result = process_values(values, parallel=parallel)
+        reported = all(("errors" in r or "warnings" in r) and not r["data"] for r in (result[0], result[2]))
+        if ([r["recordId"] for r in result] != ["1", "2", "3"] or not reported
+                or result[1]["data"].get("document_hash") != expected_hash):
+            raise SystemExit(f"ERRO: registro com data inválido não ficou isolado (parallel={parallel}): {result}")
+    print("Registros com data nulo/inválido isolados no próprio resultado: OK\n")
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[16, 512, 4096])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    # Os avisos por registro (vazio/inválido) poluiriam a tabela
+    logging.disable(logging.ERROR)
+
+    check_bad_data()
+    print(f"Limite para o modo paralelo automático: {PARALLEL_MIN_BATCH_CHARS} caracteres Base64\n")
+    print(f"{'registros':>9} | {'KB/reg':>7} | {'em linha (s)':>12} | {'paralelo (s)':>12} | {'ganho':>6}")
+    print("-" * 60)
+    for records in args.records:
+        for size_kb in args.sizes_kb:
+            values = make_batch(records, size_kb)
+            inline_s, inline_result = _best_of(lambda: process_values(values, parallel=False), args.repeat)
+            parallel_s, parallel_result = _best_of(lambda: process_values(values, parallel=True), args.repeat)
+            if inline_result != parallel_result:
+                raise SystemExit(f"ERRO: respostas divergentes para {records} registros de {size_kb} KB")
+            print(f"{records:>9} | {size_kb:>7} | {inline_s:>12.4f} | {parallel_s:>12.4f} | {inline_s / parallel_s:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
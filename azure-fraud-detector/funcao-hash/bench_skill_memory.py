@@ -0,0 +1,131 @@
+"""
+Teste de teto de memória do caminho em streaming do CalculateHash.
+
+Monta um pedido de Custom Skill sintético (por padrão ~100 MB de Base64) e
+mede com tracemalloc o pico de memória alocada por cada caminho, além do
+próprio corpo do pedido:
+
+* original:  json.loads + base64.b64decode + hashlib (process_values)
+* streaming: iter_skill_results (parse incremental + decodificação em blocos)
+
+Falha (código de saída 1) se o pico do caminho em streaming passar do teto
+(--ceiling-mb), que não depende do tamanho do pedido.
+
+Antes, confere que os dois caminhos dão o mesmo resultado (hash ou erro)
+para --malformed registros com Base64 malformado: `=` no meio, tamanhos
+inválidos, bytes fora do alfabeto e caracteres não ASCII, lidos em blocos
+minúsculos para cair em todas as fronteiras.
+
+Uso:
+    python bench_skill_memory.py
+    python bench_skill_memory.py --records 4 --size-mb 50 --ceiling-mb 8
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from skill_hash import process_record, process_values
+from skill_stream import DEFAULT_CHUNK_SIZE, iter_response_chunks, iter_skill_results
+
+MB = 1024 * 1024
+
+
+def build_body(records, size_mb):
+    document = base64.b64encode(os.urandom(size_mb * MB // records)).decode("ascii")
+    values = [{"recordId": str(i), "data": {"file_input": document}} for i in range(records)]
+    return json.dumps({"values": values}).encode("utf-8")
+
+
+def malformed_base64(rng):
+    """Base64 válido com algumas mutações aleatórias."""
+    chars = list(base64.b64encode(os.urandom(rng.randint(0, 20))).decode("ascii"))
+    for _ in range(rng.randint(1, 4)):
+        position = rng.randint(0, len(chars))
+        mutation = rng.random()
+        if mutation < 0.45:
+            chars.insert(position, rng.choice(["=", "=", "=="]))
+        elif mutation < 0.6:
+            chars.insert(position, rng.choice(" \n\t!*-_."))
+        elif mutation < 0.75 and chars:
+            del chars[rng.randrange(len(chars))]
+        elif mutation < 0.9:
+            chars.insert(position, rng.choice("AZaz09+/"))
+        else:
+            chars.insert(position, "é")
+    return "".join(chars)
+
+
+def check_malformed(cases, seed=0):
+    """Quantos registros malformados dão resultados diferentes nos dois caminhos."""
+    rng = random.Random(seed)
+    divergent = 0
+    for _ in range(cases):
+        record = {"recordId": "1", "data": {"file_input": malformed_base64(rng)}}
+        body = json.dumps({"values": [record]}).encode("utf-8")
+        expected = process_record(json.loads(body)["values"][0])
+        (streamed,) = iter_skill_results(body, chunk_size=rng.randint(1, 9))
+        if streamed != expected:
+            divergent += 1
+            if divergent <= 3:
+                print(f"divergência: {record['data']['file_input']!r}: {expected} != {streamed}")
+    return divergent
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return label, peak, elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2)
+    parser.add_argument("--size-mb", type=int, default=100, help="Tamanho total dos documentos (antes do Base64).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--ceiling-mb", type=float, default=4.0, help="Pico máximo aceito no caminho em streaming.")
+    parser.add_argument("--malformed", type=int, default=3000, help="Registros malformados comparados nos dois caminhos.")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    divergent = check_malformed(args.malformed)
+    if divergent:
+        print(f"ERRO: {divergent} de {args.malformed} registros malformados divergem entre os caminhos.")
+        sys.exit(1)
+    print(f"Base64 malformado: {args.malformed} registros, mesmo resultado nos dois caminhos.")
+
+    body = build_body(args.records, args.size_mb)
+    print(f"Pedido sintético: {len(body) / MB:.1f} MB, {args.records} registros\n")
+
+    runs = [
+        measure("original", lambda: json.dumps({"values": process_values(json.loads(body)["values"], parallel=False)}).encode()),
+        measure("streaming", lambda: b"".join(iter_response_chunks(iter_skill_results(body, chunk_size=args.chunk_size)))),
+    ]
+
+    print(f"{'caminho':<10} | {'pico extra (MB)':>15} | {'x corpo':>7} | {'tempo (s)':>9}")
+    print("-" * 52)
+    for label, peak, elapsed, _ in runs:
+        print(f"{label:<10} | {peak / MB:>15.1f} | {peak / len(body):>7.2f} | {elapsed:>9.2f}")
+
+    if json.loads(runs[0][3]) != json.loads(runs[1][3]):
+        print("\nERRO: as respostas dos dois caminhos divergem.")
+        sys.exit(1)
+    streaming_peak = runs[1][1] / MB
+    if streaming_peak > args.ceiling_mb:
+        print(f"\nFALHOU: pico do streaming ({streaming_peak:.1f} MB) acima do teto de {args.ceiling_mb} MB.")
+        sys.exit(1)
+    print(f"\nOK: pico do streaming ({streaming_peak:.1f} MB) dentro do teto de {args.ceiling_mb} MB.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 import logging
 import json
-import hashlib
-import base64
+import os
+import time
 import azure.functions as func
 
+from instrumentation import get_metrics
+
+from skill_hash import process_values
+from skill_stream import iter_response_chunks, iter_skill_results
+
+# Pedidos a partir deste tamanho seguem o caminho em streaming (memória constante)
+STREAMING_MIN_BODY_BYTES = int(os.environ.get('HASH_STREAMING_MIN_BODY_BYTES', str(16 * 1024 * 1024)))
+
+# Histogramas por fase e contadores (desligados sem METRICS_EXPORTER)
+metrics = get_metrics()
+
 app = func.FunctionApp()
 
 @app.route(route="CalculateHash", auth_level=func.AuthLevel.FUNCTION, methods=['POST'])
@@ -15,45 +26,32 @@ def CalculateHash(req: func.HttpRequest) -> func.HttpResponse:
     """
     logging.info('Função CalculateHash (Modelo V4 - Input Corrigido) recebendo um pedido.')
 
+    started = time.perf_counter()
     try:
+        raw_body = req.get_body()
+        metrics.count("request_bytes", len(raw_body))
+        if len(raw_body) >= STREAMING_MIN_BODY_BYTES:
+            # Parse incremental de 'values' e Base64 decodificado em blocos direto
+            # no hasher: nem o JSON nem os documentos são materializados.
+            # (HttpResponse exige o corpo completo; a resposta só traz hashes.)
+            logging.info(f"Pedido de {len(raw_body)} bytes: usando o caminho em streaming.")
+            response_chunks = iter_response_chunks(iter_skill_results(raw_body))
+            response_body = b"".join(response_chunks)
+            metrics.count("requests_streamed")
+            return func.HttpResponse(response_body, mimetype="application/json")
+
         body = req.get_json()
         values = body['values']
-        response_values = []
-
-        for record in values:
-            record_id = record['recordId']
-            result_data = { "recordId": record_id, "data": {} }
-
-            try:
-                # 1. Verifica se o input 'file_input' (vindo de /document/file_data) existe
-                if 'file_input' in record['data'] and record['data']['file_input']:
-                    
-                    # 2. O input é o Base64 (ASCII), que é o que queríamos
-                    base64_content = record['data']['file_input']
-                    document_bytes = base64.b64decode(base64_content)
-                    
-                    # 3. Calcula o hash (o mesmo cálculo do frontend)
-                    hasher = hashlib.sha256()
-                    hasher.update(document_bytes)
-                    document_hash = hasher.hexdigest()
-                    
-                    # 4. Retorna o hash
-                    result_data["data"]["document_hash"] = document_hash
-                
-                else:
-                    logging.warning(f"Nenhum 'file_input' (de /document/file_data) encontrado para o registro {record_id}.")
-                    result_data["warnings"] = [{"message": "O conteúdo do arquivo (file_data) estava vazio."}]
-
-            except Exception as e:
-                # Se o erro de ASCII acontecer de novo, ele será pego aqui
-                logging.error(f"Erro ao processar o registro {record_id}: {str(e)}")
-                result_data["errors"] = [{"message": f"Erro interno na função: {str(e)}"}]
-            
-            response_values.append(result_data)
+        metrics.count("records", len(values))
+        # Registros isolados entre si; lotes grandes são processados em paralelo
+        response_values = process_values(values)
 
         response_body = {"values": response_values}
         return func.HttpResponse(json.dumps(response_body), mimetype="application/json")
 
     except Exception as e:
         logging.error(f"Erro geral no pedido: {str(e)}")
-        return func.HttpResponse("Pedido inválido.", status_code=400)
\ No newline at end of file
+        metrics.count("requests_failed")
+        return func.HttpResponse("Pedido inválido.", status_code=400)
+    finally:
+        metrics.observe("request_seconds", time.perf_counter() - started)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import get_metrics
+
+# Abaixo deste volume de Base64 no lote, processar em linha é mais barato
+# do que despachar para o pool (o hashlib só libera o GIL em buffers grandes).
+PARALLEL_MIN_BATCH_CHARS = int(os.environ.get("HASH_PARALLEL_MIN_BATCH_CHARS", str(4 * 1024 * 1024)))
+MAX_WORKERS = int(os.environ.get("HASH_MAX_WORKERS", str(min(8, (os.cpu_count() or 1) + 1))))
+
+_executor = None
+
+
+def _get_executor():
+    """Pool de threads reaproveitado entre invocações (criado sob demanda)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="calculate-hash")
+    return _executor
+
+
+def process_record(record):
+    """
+    Processa um registro da Custom Skill e retorna o seu resultado.
+
+    Erros ficam isolados no próprio registro (`errors`/`warnings`); apenas a
+    falta de `recordId` é propagada, como no fluxo original.
+    """
+    record_id = record['recordId']
+    result_data = { "recordId": record_id, "data": {} }
+    metrics = get_metrics()
+
+    try:
+        # 1. Verifica se o input 'file_input' (vindo de /document/file_data) existe
+        if 'file_input' in record['data'] and record['data']['file_input']:
+
+            # 2. O input é o Base64 (ASCII), que é o que queríamos
+            base64_content = record['data']['file_input']
+            with metrics.timer("decode_seconds"):
+                document_bytes = base64.b64decode(base64_content)
+
+            # 3. Calcula o hash (o mesmo cálculo do frontend)
+            with metrics.timer("hash_seconds"):
+                hasher = hashlib.sha256()
+                hasher.update(document_bytes)
+                document_hash = hasher.hexdigest()
+            metrics.count("bytes_processed", len(document_bytes))
+
+            # 4. Retorna o hash
+            result_data["data"]["document_hash"] = document_hash
+
+        else:
+            logging.warning(f"Nenhum 'file_input' (de /document/file_data) encontrado para o registro {record_id}.")
+            result_data["warnings"] = [{"message": "O conteúdo do arquivo (file_data) estava vazio."}]
+
+    except Exception as e:
+        # Se o erro de ASCII acontecer de novo, ele será pego aqui
+        logging.error(f"Erro ao processar o registro {record_id}: {str(e)}")
+        metrics.count("records_failed")
+        result_data["errors"] = [{"message": f"Erro interno na função: {str(e)}"}]
+
+    return result_data
+
+
+def _batch_chars(values):
+    """Caracteres de Base64 no lote. Registros malformados contam 0: o `process_record` relata o erro."""
+    total = 0
+    for record in values:
+        data = record.get('data') if isinstance(record, dict) else None
+        content = data.get('file_input') if isinstance(data, dict) else None
+        if isinstance(content, str):
+            total += len(content)
+    return total
+
+
+def process_values(values, parallel=None):
+    """
+    Processa todos os registros de um lote, preservando a ordem de entrada.
+
+    Lotes grandes (acima de PARALLEL_MIN_BATCH_CHARS de Base64) são
+    decodificados e hasheados num pool de threads; os pequenos seguem em
+    linha. `parallel` força um dos modos (útil no benchmark).
+    """
+    if parallel is None:
+        parallel = len(values) > 1 and _batch_chars(values) >= PARALLEL_MIN_BATCH_CHARS
+    if not parallel:
+        return [process_record(record) for record in values]
+    # map() preserva a ordem e repropaga a exceção do primeiro registro que falhar
+    return list(_get_executor().map(process_record, values))
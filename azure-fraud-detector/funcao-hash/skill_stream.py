@@ -0,0 +1,312 @@
+import binascii
+import hashlib
+import io
+import json
+import logging
+
+from skill_hash import process_record
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+_WHITESPACE = b" \t\r\n"
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+# Bytes descartados antes de decodificar, como faz base64.b64decode (validate=False)
+_B64_DISCARD = bytes(b for b in range(128) if b not in _B64_ALPHABET)
+_SIMPLE_ESCAPES = {ord('"'): b'"', ord('\\'): b'\\', ord('/'): b'/', ord('b'): b'\b',
+                   ord('f'): b'\f', ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t'}
+
+
+class _Base64Hasher:
+    """
+    Decodifica Base64 em blocos direto para o SHA-256, sem materializar o documento.
+
+    Segue as regras do `binascii.a2b_base64` (o que `base64.b64decode` usa,
+    sem `validate`), para que o resultado e o erro sejam os mesmos do caminho
+    normal:
+
+    * bytes fora do alfabeto são descartados;
+    * um `=` só conta como preenchimento na 3ª ou 4ª posição de um grupo de
+      4; antes disso, ou se um caractere de dados vier antes de completar o
+      preenchimento, é ignorado;
+    * preenchimento completo encerra a decodificação (o resto é ignorado);
+    * no fim, sobrar 1 caractere num grupo é erro de tamanho, e 2 ou 3 é
+      "Incorrect padding".
+    """
+
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+        self._carry = b""     # caracteres de dados do grupo de 4 incompleto
+        self._pads = 0        # `=` contados desde o último caractere de dados
+        self._data_chars = 0  # caracteres de dados decodificados (para a mensagem de erro)
+        self._done = False
+        self.error = None
+
+    def feed(self, segment):
+        if self.error or not segment:
+            return
+        try:
+            # O b64decode recusa a string inteira antes de decodificar, mesmo depois do preenchimento
+            if not segment.isascii():
+                raise ValueError("string argument should contain only ASCII characters")
+            if self._done:
+                return
+            for i, part in enumerate(segment.translate(None, _B64_DISCARD).split(b"=")):
+                if i and self._pad():
+                    return
+                if part:
+                    self._pads = 0
+                    self._data_chars += len(part)
+                    data = self._carry + part
+                    usable = len(data) - len(data) % 4
+                    if usable:
+                        self.hasher.update(binascii.a2b_base64(data[:usable]))
+                    self._carry = data[usable:]
+        except Exception as e:
+            self.error = e
+
+    def _pad(self):
+        """Um `=` no fluxo; True se ele completa o preenchimento do grupo atual."""
+        position = len(self._carry)
+        if position < 2:
+            return False
+        self._pads += 1
+        if position + self._pads < 4:
+            return False
+        self.hasher.update(binascii.a2b_base64(self._carry + b"=" * (4 - position)))
+        self._carry = b""
+        self._done = True
+        return True
+
+    def finish(self):
+        if not self.error and self._carry:
+            # Mesmas mensagens do binascii.a2b_base64
+            if len(self._carry) == 1:
+                self.error = binascii.Error(f"Invalid base64-encoded string: number of data characters "
+                                            f"({self._data_chars}) cannot be 1 more than a multiple of 4")
+            else:
+                self.error = binascii.Error("Incorrect padding")
+        return self.hasher.hexdigest()
+
+
+class _Reader:
+    """Leitor com buffer de tamanho limitado sobre um stream binário."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+        self.fills = 0
+
+    def _fill(self, need=1):
+        """Garante pelo menos `need` bytes disponíveis; False no fim do stream."""
+        while len(self.buf) - self.pos < need:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                return False
+            self.buf = self.buf[self.pos:] + chunk
+            self.pos = 0
+            self.fills += 1
+        return True
+
+    def peek(self):
+        self.skip_ws()
+        if not self._fill():
+            raise ValueError("Fim inesperado do JSON.")
+        return self.buf[self.pos]
+
+    def skip_ws(self):
+        while self._fill():
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return
+
+    def expect(self, char):
+        if self.peek() != ord(char):
+            raise ValueError(f"JSON inválido: esperado '{char}' na posição {self.pos}.")
+        self.pos += 1
+
+    def consume_if(self, char):
+        if self.peek() == ord(char):
+            self.pos += 1
+            return True
+        return False
+
+    def read_string_into(self, sink, raw=False):
+        """
+        Lê uma string JSON (após as aspas de abertura) entregando-a em pedaços
+        a `sink`. Com `raw=True` os escapes são repassados sem interpretação.
+        """
+        quote, quote_fill = -1, None
+        while True:
+            if not self._fill():
+                raise ValueError("String JSON não terminada.")
+            # A posição das próximas aspas só é recalculada quando o buffer
+            # muda ou quando já foi ultrapassada (evita varrer o bloco a cada escape)
+            if quote_fill != self.fills or (quote != -1 and quote < self.pos):
+                quote, quote_fill = self.buf.find(b'"', self.pos), self.fills
+            backslash = self.buf.find(b'\\', self.pos, quote if quote != -1 else len(self.buf))
+            if backslash != -1:
+                sink(self.buf[self.pos:backslash])
+                self.pos = backslash
+                if not self._fill(2):
+                    raise ValueError("Escape JSON incompleto.")
+                size = 6 if self.buf[self.pos + 1] == ord('u') else 2
+                if not self._fill(size):
+                    raise ValueError("Escape JSON incompleto.")
+                escape = self.buf[self.pos:self.pos + size]
+                if raw:
+                    sink(escape)
+                elif size == 6:
+                    sink(chr(int(escape[2:], 16)).encode("utf-8", "surrogatepass"))
+                else:
+                    sink(_SIMPLE_ESCAPES[escape[1]])
+                self.pos += size
+            elif quote != -1:
+                sink(self.buf[self.pos:quote])
+                self.pos = quote + 1
+                return
+            else:
+                sink(self.buf[self.pos:])
+                self.pos = len(self.buf)
+
+    def read_string(self):
+        self.expect('"')
+        parts = [b'"']
+        self.read_string_into(parts.append, raw=True)
+        parts.append(b'"')
+        return json.loads(b"".join(parts))
+
+    def _read_scalar(self):
+        """Número ou literal (true/false/null): lê até o próximo delimitador."""
+        token = bytearray()
+        while self._fill():
+            end = self.pos
+            while end < len(self.buf) and self.buf[end] not in b",}] \t\r\n":
+                end += 1
+            token += self.buf[self.pos:end]
+            self.pos = end
+            if end < len(self.buf):
+                break
+        return json.loads(bytes(token))
+
+    def read_value(self):
+        """Lê um valor JSON qualquer (usado para os campos pequenos)."""
+        char = self.peek()
+        if char == ord('"'):
+            return self.read_string()
+        if char == ord('{'):
+            obj = {}
+            for key in self.iter_object_keys():
+                obj[key] = self.read_value()
+            return obj
+        if char == ord('['):
+            self.pos += 1
+            arr = []
+            if self.consume_if(']'):
+                return arr
+            while True:
+                arr.append(self.read_value())
+                if not self.consume_if(','):
+                    self.expect(']')
+                    return arr
+        return self._read_scalar()
+
+    def iter_object_keys(self):
+        """Itera as chaves de um objeto; o chamador consome cada valor."""
+        self.expect('{')
+        if self.consume_if('}'):
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            if not self.consume_if(','):
+                self.expect('}')
+                return
+
+
+def _read_record(reader):
+    """
+    Lê um registro de `values` e devolve o resultado no mesmo formato de
+    `skill_hash.process_record`. O `file_input` em string é decodificado e
+    hasheado em streaming; os demais casos usam o caminho normal.
+    """
+    record = {}
+    streamed = None  # (hash, erro, tamanho) quando o file_input veio como string
+    for key in reader.iter_object_keys():
+        if key != "data" or reader.peek() != ord('{'):
+            record[key] = reader.read_value()
+            continue
+        data = {}
+        for data_key in reader.iter_object_keys():
+            if data_key == "file_input" and reader.peek() == ord('"'):
+                reader.pos += 1
+                sink = _Base64Hasher()
+                length = [0]
+
+                def feed(segment, sink=sink, length=length):
+                    length[0] += len(segment)
+                    sink.feed(segment)
+
+                reader.read_string_into(feed)
+                digest = sink.finish()
+                streamed = (digest, sink.error, length[0])
+                data["file_input"] = None
+            else:
+                data[data_key] = reader.read_value()
+                if data_key == "file_input":
+                    streamed = None
+        record["data"] = data
+
+    if streamed is None or streamed[2] == 0:
+        # Ausente, vazio ou não-string: mesmo comportamento do caminho original
+        if streamed is not None:
+            record["data"]["file_input"] = ""
+        return process_record(record)
+
+    record_id = record['recordId']
+    digest, error, _ = streamed
+    if error is not None:
+        logging.error(f"Erro ao processar o registro {record_id}: {str(error)}")
+        return {"recordId": record_id, "data": {}, "errors": [{"message": f"Erro interno na função: {str(error)}"}]}
+    return {"recordId": record_id, "data": {"document_hash": digest}}
+
+
+def iter_skill_results(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lê um pedido de Custom Skill de forma incremental e gera um resultado por
+    registro de `values`, na ordem de entrada.
+
+    Só um bloco de `chunk_size` bytes do pedido fica em memória por vez (além
+    do que o chamador já tiver), e nenhum documento decodificado é
+    materializado. Levanta KeyError se `values` não existir.
+    """
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        stream = io.BytesIO(stream)
+    reader = _Reader(stream, chunk_size)
+    found_values = False
+    for key in reader.iter_object_keys():
+        if key != "values":
+            reader.read_value()
+            continue
+        found_values = True
+        reader.expect('[')
+        if reader.consume_if(']'):
+            continue
+        while True:
+            yield _read_record(reader)
+            if not reader.consume_if(','):
+                reader.expect(']')
+                break
+    if not found_values:
+        raise KeyError("values")
+
+
+def iter_response_chunks(results):
+    """Serializa a resposta {"values": [...]} em pedaços, um registro por vez."""
+    yield b'{"values": ['
+    for i, result in enumerate(results):
+        yield (b", " if i else b"") + json.dumps(result).encode("utf-8")
+    yield b"]}"
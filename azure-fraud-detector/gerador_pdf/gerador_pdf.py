@@ -1,64 +1,278 @@
+"""
+Gerador de comprovantes de residência em PDF.
+
+Sem argumentos, cria o `amostra.pdf` de sempre. Com `--quantidade`, gera um
+corpus para testes de carga e de deduplicação: N comprovantes com cliente,
+endereço e código de validação aleatórios, em paralelo num pool de
+processos. Uma fração controlada dos documentos são duplicatas exatas (os
+mesmos bytes de um original) e outra fração são quase-duplicatas (o mesmo
+comprovante re-renderizado, ou com um campo levemente alterado).
+
+Cada documento é descrito numa linha do manifesto JSONL (a verdade de
+referência): arquivo, grupo do original, tipo, variação, SHA-256 e tamanho.
+A geração é determinística para a mesma semente, seja qual for o número de
+processos. Os arquivos são espalhados em subpastas de 1000, para o corpus
+poder chegar a centenas de milhares de documentos.
+
+Uso:
+    python gerador_pdf.py
+    python gerador_pdf.py --quantidade 100000 --saida corpus --duplicatas 0.2 --quase-duplicatas 0.1
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+
 from fpdf import FPDF
 
-# --- INÍCIO DA CRIAÇÃO DO DOCUMENTO ---
-pdf = FPDF()
-pdf.add_page()
-pdf.set_font("Arial", size=12)
+AMOSTRA = {
+    "nome": "CARLOS MAGNUS",
+    "logradouro": "Rua da Passagem, 999, Apto 101",
+    "bairro": "Botafogo, Rio de Janeiro - RJ",
+    "cep": "22290-030",
+    "cliente": "8765432-1",
+    "referencia": "Setembro/2025",
+    "emissao": "15/10/2025",
+    "validacao": "9A8B7C6D-E5F4-G3H2-I1J0-K9L8M7N6P5O4",
+}
+
+NOMES = ["ANA", "BRUNO", "CARLOS", "DANIELA", "EDUARDO", "FERNANDA", "GABRIEL", "HELENA", "IGOR", "JULIANA",
+         "LUCAS", "MARIANA", "NATÁLIA", "OTÁVIO", "PAULA", "RAFAEL", "SOFIA", "TIAGO", "VALÉRIA", "WAGNER"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA",
+              "NASCIMENTO", "CARVALHO", "ARAÚJO", "RIBEIRO", "MAGNUS", "GOMES", "MARTINS", "ROCHA", "BARROS"]
+LOGRADOUROS = ["Rua da Passagem", "Rua Voluntários da Pátria", "Av. Atlântica", "Rua Barata Ribeiro",
+               "Rua Conde de Bonfim", "Av. das Américas", "Rua São Clemente", "Rua Haddock Lobo"]
+BAIRROS = ["Botafogo", "Copacabana", "Tijuca", "Barra da Tijuca", "Flamengo", "Laranjeiras", "Méier", "Leblon"]
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro",
+         "Novembro", "Dezembro"]
+ALFANUMERICOS = string.ascii_uppercase + string.digits
+
+# Data fixa de criação: o mesmo comprovante gera os mesmos bytes (o fpdf clássico ignora e usa a hora atual)
+DATA_DE_CRIACAO = datetime(2025, 10, 15, 8, 0, 0, tzinfo=timezone.utc)
+DOCUMENTOS_POR_PASTA = 1000
+
+
+def dados_aleatorios(rng):
+    """Cliente, endereço e código de validação de um comprovante."""
+    emissao = datetime(2025, 1, 1) + timedelta(days=rng.randrange(365))
+    referencia = emissao.replace(day=1) - timedelta(days=1)
+    complemento = f", Apto {rng.randint(1, 20)}{rng.randint(1, 8):02d}" if rng.random() < 0.6 else ""
+    return {
+        "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+        "logradouro": f"{rng.choice(LOGRADOUROS)}, {rng.randint(1, 3000)}{complemento}",
+        "bairro": f"{rng.choice(BAIRROS)}, Rio de Janeiro - RJ",
+        "cep": f"{rng.randint(20000, 23799)}-{rng.randint(0, 999):03d}",
+        "cliente": f"{rng.randint(1000000, 9999999)}-{rng.randint(0, 9)}",
+        "referencia": f"{MESES[referencia.month - 1]}/{referencia.year}",
+        "emissao": emissao.strftime("%d/%m/%Y"),
+        "validacao": "-".join("".join(rng.choice(ALFANUMERICOS) for _ in range(n)) for n in (8, 4, 4, 4, 12)),
+    }
+
+
+def desenhar_comprovante(dados, data_de_criacao=DATA_DE_CRIACAO):
+    """Monta o PDF de um comprovante com o layout da `amostra.pdf`."""
+    pdf = FPDF()
+    if hasattr(pdf, "creation_date"):
+        pdf.creation_date = data_de_criacao
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    # --- CABEÇALHO ---
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(200, 10, txt="Luz & Força do Rio S.A.", ln=1, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(200, 5, txt="CNPJ: 01.234.567/0001-89", ln=1, align='C')
+    pdf.cell(200, 5, txt="Av. Rio Branco, 1 - Centro, Rio de Janeiro - RJ, 20090-003", ln=2, align='C')
+
+    pdf.ln(15) # Adiciona um espaço
+
+    # --- TÍTULO DO DOCUMENTO ---
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="COMPROVANTE DE RESIDÊNCIA", ln=1, align='C')
+
+    pdf.ln(10) # Adiciona um espaço
+
+    # --- INFORMAÇÕES DO CLIENTE ---
+    pdf.set_font("Arial", size=12)
+    pdf.cell(40, 7, txt="Para:")
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(100, 7, txt=dados["nome"], ln=1)
+
+    pdf.set_font("Arial", size=12)
+    pdf.cell(40, 7, txt="Endereço:")
+    pdf.cell(100, 7, txt=dados["logradouro"], ln=1)
+    pdf.cell(40, 7, txt="")
+    pdf.cell(100, 7, txt=dados["bairro"], ln=1)
+    pdf.cell(40, 7, txt="")
+    pdf.cell(100, 7, txt=f"CEP: {dados['cep']}", ln=1)
+
+    pdf.ln(10)
+
+    # --- DETALHES DA CONTA ---
+    pdf.cell(40, 7, txt="Número do Cliente:")
+    pdf.cell(50, 7, txt=dados["cliente"], ln=1)
+
+    pdf.cell(40, 7, txt="Mês de Referência:")
+    pdf.cell(50, 7, txt=dados["referencia"], ln=1)
+
+    pdf.cell(40, 7, txt="Data de Emissão:")
+    pdf.cell(50, 7, txt=dados["emissao"], ln=1)
+
+
+    pdf.ln(20)
+
+    # --- TEXTO DE VALIDAÇÃO E RODAPÉ ---
+    pdf.set_font("Arial", 'I', 10)
+    pdf.multi_cell(0, 5, txt="Este documento é uma representação da sua fatura de energia e é válido como comprovante de residência para fins cadastrais em todo o território nacional.")
+    pdf.ln(5)
+    pdf.multi_cell(0, 5, txt=f"Código de Validação: {dados['validacao']}")
+    return pdf
+
+
+def bytes_do_pdf(pdf):
+    """Conteúdo do PDF em memória (o fpdf clássico devolve str latin-1; o fpdf2, bytearray)."""
+    conteudo = pdf.output(dest="S")
+    return conteudo.encode("latin-1") if isinstance(conteudo, str) else bytes(conteudo)
+
 
-# --- CABEÇALHO ---
-pdf.set_font("Arial", 'B', 16)
-pdf.cell(200, 10, txt="Luz & Força do Rio S.A.", ln=1, align='C')
-pdf.set_font("Arial", size=10)
-pdf.cell(200, 5, txt="CNPJ: 01.234.567/0001-89", ln=1, align='C')
-pdf.cell(200, 5, txt="Av. Rio Branco, 1 - Centro, Rio de Janeiro - RJ, 20090-003", ln=2, align='C')
+def quase_duplicata(dados, rng):
+    """Cópia levemente diferente: re-renderizada com outra data, ou com um campo alterado."""
+    variacao = rng.choice(["re-renderizado", "emissao", "complemento", "validacao"])
+    dados = dict(dados)
+    data_de_criacao = DATA_DE_CRIACAO
+    if variacao == "re-renderizado":
+        # Mesmo texto, bytes diferentes: só os metadados do PDF mudam
+        data_de_criacao = DATA_DE_CRIACAO + timedelta(seconds=rng.randint(1, 10 ** 7))
+    elif variacao == "emissao":
+        dia, mes, ano = dados["emissao"].split("/")
+        dados["emissao"] = f"{(int(dia) % 28) + 1:02d}/{mes}/{ano}"
+    elif variacao == "complemento":
+        dados["logradouro"] += " (fundos)"
+    else:
+        posicao = rng.choice([i for i, c in enumerate(dados["validacao"]) if c != "-"])
+        trocado = rng.choice([c for c in ALFANUMERICOS if c != dados["validacao"][posicao]])
+        dados["validacao"] = dados["validacao"][:posicao] + trocado + dados["validacao"][posicao + 1:]
+    return bytes_do_pdf(desenhar_comprovante(dados, data_de_criacao)), variacao
 
-pdf.ln(15) # Adiciona um espaço
 
-# --- TÍTULO DO DOCUMENTO ---
-pdf.set_font("Arial", 'B', 14)
-pdf.cell(200, 10, txt="COMPROVANTE DE RESIDÊNCIA", ln=1, align='C')
+def caminho_do_documento(saida, indice):
+    return os.path.join(saida, f"{indice // DOCUMENTOS_POR_PASTA:04d}", f"comprovante_{indice:07d}.pdf")
 
-pdf.ln(10) # Adiciona um espaço
 
-# --- INFORMAÇÕES DO CLIENTE ---
-pdf.set_font("Arial", size=12)
-pdf.cell(40, 7, txt="Para:")
-pdf.set_font("Arial", 'B', 12)
-pdf.cell(100, 7, txt="CARLOS MAGNUS", ln=1)
+def gerar_grupo(tarefa):
+    """
+    Executado nos processos do pool: renderiza um original e as suas cópias,
+    grava os arquivos e devolve as linhas do manifesto.
+    """
+    saida, grupo, semente, documentos = tarefa
+    rng = random.Random(semente)
+    dados = dados_aleatorios(rng)
+    original = bytes_do_pdf(desenhar_comprovante(dados))
+    linhas = []
+    for indice, tipo in documentos:
+        variacao = None
+        if tipo == "original" or tipo == "duplicata_exata":
+            conteudo = original
+        else:
+            conteudo, variacao = quase_duplicata(dados, rng)
+        caminho = caminho_do_documento(saida, indice)
+        with open(caminho, "wb") as f:
+            f.write(conteudo)
+        linhas.append({
+            "arquivo": os.path.relpath(caminho, saida).replace(os.sep, "/"),
+            "indice": indice,
+            "grupo": grupo,
+            "tipo": tipo,
+            "variacao": variacao,
+            "sha256": hashlib.sha256(conteudo).hexdigest(),
+            "tamanho": len(conteudo),
+        })
+    return linhas
 
-pdf.set_font("Arial", size=12)
-pdf.cell(40, 7, txt="Endereço:")
-pdf.cell(100, 7, txt="Rua da Passagem, 999, Apto 101", ln=1)
-pdf.cell(40, 7, txt="")
-pdf.cell(100, 7, txt="Botafogo, Rio de Janeiro - RJ", ln=1)
-pdf.cell(40, 7, txt="")
-pdf.cell(100, 7, txt="CEP: 22290-030", ln=1)
 
-pdf.ln(10)
+def planejar(quantidade, fracao_duplicatas, fracao_quase, seed):
+    """
+    Distribui os N documentos em grupos (um original e as suas cópias) e
+    embaralha os índices, para as cópias não ficarem ao lado do original.
+    """
+    rng = random.Random(seed)
+    n_duplicatas = int(quantidade * fracao_duplicatas)
+    n_quase = int(quantidade * fracao_quase)
+    n_originais = max(1, quantidade - n_duplicatas - n_quase)
+    grupos = [["original"] for _ in range(n_originais)]
+    for tipo in ["duplicata_exata"] * n_duplicatas + ["quase_duplicata"] * n_quase:
+        grupos[rng.randrange(n_originais)].append(tipo)
+    indices = list(range(sum(len(g) for g in grupos)))
+    rng.shuffle(indices)
+    posicao = 0
+    for grupo, tipos in enumerate(grupos):
+        documentos = list(zip(indices[posicao:posicao + len(tipos)], tipos))
+        posicao += len(tipos)
+        yield grupo, rng.getrandbits(64), documentos
 
-# --- DETALHES DA CONTA ---
-pdf.cell(40, 7, txt="Número do Cliente:")
-pdf.cell(50, 7, txt="8765432-1", ln=1)
 
-pdf.cell(40, 7, txt="Mês de Referência:")
-pdf.cell(50, 7, txt="Setembro/2025", ln=1)
+def gerar_corpus(quantidade, saida, fracao_duplicatas=0.0, fracao_quase=0.0, seed=42, processos=None,
+                 manifesto="manifesto.jsonl"):
+    """Gera o corpus em paralelo e grava o manifesto; retorna as contagens por tipo."""
+    os.makedirs(saida, exist_ok=True)
+    for pasta in range(-(-quantidade // DOCUMENTOS_POR_PASTA)):
+        os.makedirs(os.path.join(saida, f"{pasta:04d}"), exist_ok=True)
+    tarefas = ((saida, grupo, semente, documentos)
+               for grupo, semente, documentos in planejar(quantidade, fracao_duplicatas, fracao_quase, seed))
+    contagens = {"original": 0, "duplicata_exata": 0, "quase_duplicata": 0, "bytes": 0}
+    inicio = time.perf_counter()
+    with Pool(processes=processos) as pool, open(os.path.join(saida, manifesto), "w", encoding="utf-8") as f:
+        for linhas in pool.imap_unordered(gerar_grupo, tarefas, chunksize=64):
+            for linha in linhas:
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+                contagens[linha["tipo"]] += 1
+                contagens["bytes"] += linha["tamanho"]
+            gerados = sum(contagens[t] for t in ("original", "duplicata_exata", "quase_duplicata"))
+            if gerados % 10000 < len(linhas):
+                print(f"  {gerados} documentos ({gerados / (time.perf_counter() - inicio):.0f}/s)", file=sys.stderr)
+    contagens["segundos"] = time.perf_counter() - inicio
+    return contagens
 
-pdf.cell(40, 7, txt="Data de Emissão:")
-pdf.cell(50, 7, txt="15/10/2025", ln=1)
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, help="Número de comprovantes (sem ele, gera só a amostra.pdf).")
+    parser.add_argument("--saida", default="corpus", help="Diretório do corpus.")
+    parser.add_argument("--duplicatas", type=float, default=0.1, help="Fração de duplicatas exatas.")
+    parser.add_argument("--quase-duplicatas", type=float, default=0.1, help="Fração de quase-duplicatas.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--processos", type=int, help="Processos do pool (padrão: um por CPU).")
+    parser.add_argument("--manifesto", default="manifesto.jsonl", help="Nome do manifesto, dentro de --saida.")
+    args = parser.parse_args()
 
-pdf.ln(20)
+    if args.quantidade is None:
+        # --- SALVAR O ARQUIVO ---
+        try:
+            desenhar_comprovante(AMOSTRA).output("amostra.pdf")
+            print("Arquivo 'amostra.pdf' criado com sucesso no mesmo diretório!")
+        except Exception as e:
+            print(f"Ocorreu um erro ao criar o PDF: {e}")
+        return
 
-# --- TEXTO DE VALIDAÇÃO E RODAPÉ ---
-pdf.set_font("Arial", 'I', 10)
-pdf.multi_cell(0, 5, txt="Este documento é uma representação da sua fatura de energia e é válido como comprovante de residência para fins cadastrais em todo o território nacional.")
-pdf.ln(5)
-pdf.multi_cell(0, 5, txt="Código de Validação: 9A8B7C6D-E5F4-G3H2-I1J0-K9L8M7N6P5O4")
+    if args.quantidade < 1:
+        parser.error("--quantidade deve ser pelo menos 1.")
+    if args.duplicatas < 0 or args.quase_duplicatas < 0:
+        parser.error("--duplicatas e --quase-duplicatas não podem ser negativos.")
+    if args.duplicatas + args.quase_duplicatas >= 1:
+        parser.error("--duplicatas + --quase-duplicatas deve ser menor que 1.")
+    c = gerar_corpus(args.quantidade, args.saida, args.duplicatas, args.quase_duplicatas, args.seed,
+                     args.processos, args.manifesto)
+    total = c["original"] + c["duplicata_exata"] + c["quase_duplicata"]
+    print(f"Corpus em '{args.saida}': {total} documentos ({c['original']} originais, {c['duplicata_exata']} duplicatas "
+          f"exatas, {c['quase_duplicata']} quase-duplicatas), {c['bytes'] / 2 ** 20:.1f} MB em {c['segundos']:.1f} s "
+          f"({total / c['segundos']:.0f} documentos/s). Manifesto: '{os.path.join(args.saida, args.manifesto)}'.")
 
 
-# --- SALVAR O ARQUIVO ---
-try:
-    pdf.output("amostra.pdf")
-    print("Arquivo 'amostra.pdf' criado com sucesso no mesmo diretório!")
-except Exception as e:
-    print(f"Ocorreu um erro ao criar o PDF: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Substitutos locais do Azure Blob Storage e do Azure AI Search.
+
+Implementam apenas a parte da API dos SDKs que o sistema usa, para que o
+código do frontend e do backend rode sem alterações contra eles:
+
+* Blob: `BlobServiceClient.get_blob_client(container, blob)` com
+  `upload_blob`, `download_blob()` (`readall`/`read`), `exists`,
+  `delete_blob`; e `get_container_client(container).list_blobs(...)`
+  paginado por `by_page(continuation_token=...)`;
+* Search: `get_document`, `search`, `upload_documents` e
+  `merge_or_upload_documents` (com resultados por documento).
+
+Há duas implementações de cada: em memória (dicts) e SQLite (um arquivo,
+com índice na coluna `document_hash`). Os filtros OData aceitos são o
+subconjunto usado no repositório: `campo eq|gt|ge|lt|le valor`,
+`search.in(campo, 'a,b', ',')` e `lsh_bands/any(b: search.in(b, ...))`,
+combinados com `and`.
+"""
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+
+# --- Filtros OData (subconjunto) ---
+
+_CLAUSE_CMP = re.compile(r"^(\w+) (eq|gt|ge|lt|le) (?:'([^']*)'|(-?[\d.eE+-]+))$")
+_CLAUSE_IN = re.compile(r"^search\.in\((\w+), '([^']*)', ','\)$")
+_CLAUSE_ANY_IN = re.compile(r"^(\w+)/any\((\w+): search\.in\(\2, '([^']*)', ','\)\)$")
+_OPS = {"eq": lambda a, b: a == b, "gt": lambda a, b: a > b, "ge": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b, "le": lambda a, b: a <= b}
+_SQL_OPS = {"eq": "=", "gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+
+
+def parse_filter(expression):
+    """Converte o filtro numa lista de cláusulas (tipo, campo, operador, valor)."""
+    clauses = []
+    for part in (expression or "").split(" and "):
+        part = part.strip()
+        if not part:
+            continue
+        if match := _CLAUSE_CMP.match(part):
+            field, op, text, number = match.groups()
+            clauses.append(("cmp", field, op, text if text is not None else float(number)))
+        elif match := _CLAUSE_IN.match(part):
+            clauses.append(("in", match.group(1), None, set(match.group(2).split(","))))
+        elif match := _CLAUSE_ANY_IN.match(part):
+            clauses.append(("any_in", match.group(1), None, set(match.group(3).split(","))))
+        else:
+            raise ValueError(f"Filtro não suportado pelo índice local: {part}")
+    return clauses
+
+
+def _matches(doc, clauses):
+    for kind, field, op, value in clauses:
+        current = doc.get(field)
+        if kind == "cmp":
+            if current is None or not _OPS[op](current, value):
+                return False
+        elif kind == "in":
+            if current not in value:
+                return False
+        elif not value.intersection(current or []):
+            return False
+    return True
+
+
+def _project(doc, select):
+    return {k: doc.get(k) for k in select} if select else dict(doc)
+
+
+class _SearchResults(list):
+    def __init__(self, docs, count):
+        super().__init__(docs)
+        self._count = count
+
+    def get_count(self):
+        return self._count
+
+
+def _indexing_result(key, ok=True, error=None):
+    return SimpleNamespace(key=key, succeeded=ok, status_code=200 if ok else 400, error_message=error)
+
+
+class _SearchIndexBase:
+    """Lógica comum: busca, ordenação e paginação sobre os documentos candidatos."""
+
+    def __init__(self, key_field="id", latency_seconds=0.0):
+        self.key_field = key_field
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+        self._counter_lock = threading.Lock()
+
+    def _request(self):
+        with self._counter_lock:
+            self.requests += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def get_document(self, key, selected_fields=None):
+        self._request()
+        doc = self._get(key)
+        if doc is None:
+            raise ResourceNotFoundError(f"Documento '{key}' não encontrado.")
+        return _project(doc, selected_fields)
+
+    def search(self, search_text=None, filter=None, select=None, order_by=None, top=None,
+               include_total_count=False, **kwargs):
+        self._request()
+        clauses = parse_filter(filter)
+        docs = [doc for doc in self._candidates(clauses) if _matches(doc, clauses)]
+        for spec in reversed(order_by or []):
+            field, _, direction = spec.partition(" ")
+            docs.sort(key=lambda d: (d.get(field) is None, d.get(field)), reverse=direction.lower() == "desc")
+        count = len(docs) if include_total_count else None
+        if top is not None:
+            docs = docs[:top]
+        return _SearchResults([_project(doc, select) for doc in docs], count)
+
+    def upload_documents(self, documents):
+        self._request()
+        return [self._write(doc, merge=False) for doc in documents]
+
+    def merge_or_upload_documents(self, documents):
+        self._request()
+        return [self._write(doc, merge=True) for doc in documents]
+
+    def __len__(self):
+        return self._count()
+
+
+class InMemorySearchIndex(_SearchIndexBase):
+    """Índice de busca em memória (dict por chave)."""
+
+    def __init__(self, key_field="id", latency_seconds=0.0):
+        super().__init__(key_field, latency_seconds)
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            doc = self._docs.get(key)
+            return dict(doc) if doc is not None else None
+
+    def _candidates(self, clauses):
+        with self._lock:
+            # Filtro pela chave resolve direto no dict, como o índice real
+            for kind, field, op, value in clauses:
+                if field == self.key_field and (kind == "in" or op == "eq"):
+                    keys = value if kind == "in" else {value}
+                    return [dict(self._docs[k]) for k in keys if k in self._docs]
+            return [dict(doc) for doc in self._docs.values()]
+
+    def _write(self, doc, merge):
+        key = doc[self.key_field]
+        with self._lock:
+            if merge and key in self._docs:
+                self._docs[key] = {**self._docs[key], **doc}
+            else:
+                self._docs[key] = dict(doc)
+        return _indexing_result(key)
+
+    def _count(self):
+        with self._lock:
+            return len(self._docs)
+
+
+class SQLiteSearchIndex(_SearchIndexBase):
+    """
+    Índice de busca em SQLite. A chave e `document_hash` são colunas
+    indexadas; o resto do documento fica em JSON.
+    """
+
+    def __init__(self, path=":memory:", key_field="id", latency_seconds=0.0):
+        super().__init__(key_field, latency_seconds)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, document_hash TEXT, body TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS docs_hash ON docs (document_hash)")
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM docs WHERE id = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _candidates(self, clauses):
+        # Cláusulas sobre colunas indexadas viram SQL; o resto é filtrado em Python
+        where, params = [], []
+        for kind, field, op, value in clauses:
+            column = "id" if field == self.key_field else field
+            if column not in ("id", "document_hash"):
+                continue
+            if kind == "in":
+                where.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            elif kind == "cmp":
+                where.append(f"{column} {_SQL_OPS[op]} ?")
+                params.append(value)
+        sql = "SELECT body FROM docs" + (f" WHERE {' AND '.join(where)}" if where else "")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _write(self, doc, merge):
+        key = doc[self.key_field]
+        with self._lock:
+            if merge:
+                row = self._conn.execute("SELECT body FROM docs WHERE id = ?", (key,)).fetchone()
+                if row:
+                    doc = {**json.loads(row[0]), **doc}
+            self._conn.execute("INSERT OR REPLACE INTO docs (id, document_hash, body) VALUES (?, ?, ?)",
+                               (key, doc.get("document_hash"), json.dumps(doc)))
+        return _indexing_result(key)
+
+    def _count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+# --- Blob Storage ---
+
+class _Download:
+    def __init__(self, data):
+        self._data = data
+        self._stream = io.BytesIO(data)
+
+    def readall(self):
+        return self._data
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def readinto(self, stream):
+        stream.write(self._data)
+        return len(self._data)
+
+
+class LocalBlobClient:
+    """Cliente de um blob local, com a mesma assinatura usada do BlobClient."""
+
+    def __init__(self, service, container, blob):
+        self._service = service
+        self.container_name = container
+        self.blob_name = blob
+
+    def upload_blob(self, data, length=None, metadata=None, overwrite=False, **kwargs):
+        if hasattr(data, "read"):
+            data = data.read() if length is None else data.read(length)
+        elif isinstance(data, str):
+            data = data.encode("utf-8")
+        self._service._put(self.container_name, self.blob_name, bytes(data), metadata or {}, overwrite)
+        return {"etag": f'"{hash((self.container_name, self.blob_name, len(data)))}"'}
+
+    def download_blob(self, **kwargs):
+        self._service._latency()
+        blob = self._service._get(self.container_name, self.blob_name)
+        if blob is None:
+            raise ResourceNotFoundError(f"Blob '{self.blob_name}' não encontrado.")
+        return _Download(blob[0])
+
+    def get_blob_properties(self):
+        blob = self._service._get(self.container_name, self.blob_name)
+        if blob is None:
+            raise ResourceNotFoundError(f"Blob '{self.blob_name}' não encontrado.")
+        return SimpleNamespace(name=self.blob_name, size=len(blob[0]), metadata=blob[1])
+
+    def exists(self):
+        return self._service._get(self.container_name, self.blob_name) is not None
+
+    def delete_blob(self):
+        self._service._delete(self.container_name, self.blob_name)
+
+
+class _LocalBlobPages:
+    """Imita o iterador de páginas do `list_blobs`: `continuation_token` aponta para a página seguinte."""
+
+    def __init__(self, container_client, page_size, continuation_token):
+        self._container_client = container_client
+        self._page_size = page_size
+        self.continuation_token = continuation_token
+        self._started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._started and not self.continuation_token:
+            raise StopIteration
+        self._started = True
+        service = self._container_client._service
+        service._latency()
+        # O token é o último nome da página anterior: a listagem segue a ordem dos nomes
+        names = [name for name in service.list_blob_names(self._container_client.container_name)
+                 if not self.continuation_token or name > self.continuation_token]
+        page = names[:self._page_size]
+        self.continuation_token = page[-1] if len(names) > self._page_size else None
+        return iter([self._container_client.get_blob_client(name).get_blob_properties() for name in page])
+
+
+class _LocalBlobListing:
+    def __init__(self, container_client, page_size):
+        self._container_client = container_client
+        self._page_size = page_size
+
+    def by_page(self, continuation_token=None):
+        return _LocalBlobPages(self._container_client, self._page_size, continuation_token)
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+
+class LocalContainerClient:
+    """Cliente de um contêiner local: `list_blobs` paginado e `get_blob_client`."""
+
+    def __init__(self, service, container):
+        self._service = service
+        self.container_name = container
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self._service, self.container_name, blob)
+
+    def list_blobs(self, results_per_page=5000, **kwargs):
+        return _LocalBlobListing(self, results_per_page)
+
+
+class _LocalBlobServiceBase:
+    """
+    Serviço de blobs local. `on_upload(container, blob)` é chamado após cada
+    upload bem-sucedido, o que permite simular o Blob Trigger.
+    """
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self._listeners = []
+
+    def on_upload(self, callback):
+        self._listeners.append(callback)
+
+    def get_blob_client(self, container, blob):
+        return LocalBlobClient(self, container, blob)
+
+    def get_container_client(self, container):
+        return LocalContainerClient(self, container)
+
+    def _latency(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _put(self, container, blob, data, metadata, overwrite):
+        self._latency()
+        self._store(container, blob, data, metadata, overwrite)
+        for callback in self._listeners:
+            callback(container, blob)
+
+    def open_blob(self, container, blob):
+        """Stream de leitura do blob (o que o Blob Trigger entrega à função)."""
+        found = self._get(container, blob)
+        if found is None:
+            raise ResourceNotFoundError(f"Blob '{blob}' não encontrado.")
+        return io.BytesIO(found[0])
+
+
+class InMemoryBlobService(_LocalBlobServiceBase):
+    def __init__(self, latency_seconds=0.0):
+        super().__init__(latency_seconds)
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def _store(self, container, blob, data, metadata, overwrite):
+        with self._lock:
+            # A verificação e a escrita são atômicas, como o If-None-Match: * do serviço
+            if not overwrite and (container, blob) in self._blobs:
+                raise ResourceExistsError(f"O blob '{blob}' já existe.")
+            self._blobs[(container, blob)] = (data, dict(metadata))
+
+    def _get(self, container, blob):
+        with self._lock:
+            return self._blobs.get((container, blob))
+
+    def _delete(self, container, blob):
+        with self._lock:
+            if self._blobs.pop((container, blob), None) is None:
+                raise ResourceNotFoundError(f"Blob '{blob}' não encontrado.")
+
+    def list_blob_names(self, container):
+        with self._lock:
+            return sorted(name for c, name in self._blobs if c == container)
+
+
+class SQLiteBlobService(_LocalBlobServiceBase):
+    def __init__(self, path=":memory:", latency_seconds=0.0):
+        super().__init__(latency_seconds)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (container TEXT, name TEXT, data BLOB, metadata TEXT, "
+                           "PRIMARY KEY (container, name))")
+        self._lock = threading.Lock()
+
+    def _store(self, container, blob, data, metadata, overwrite):
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT"
+        try:
+            with self._lock:
+                self._conn.execute(f"{verb} INTO blobs VALUES (?, ?, ?, ?)", (container, blob, data, json.dumps(metadata)))
+        except sqlite3.IntegrityError:
+            raise ResourceExistsError(f"O blob '{blob}' já existe.")
+
+    def _get(self, container, blob):
+        with self._lock:
+            row = self._conn.execute("SELECT data, metadata FROM blobs WHERE container = ? AND name = ?",
+                                     (container, blob)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _delete(self, container, blob):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM blobs WHERE container = ? AND name = ?", (container, blob))
+        if cursor.rowcount == 0:
+            raise ResourceNotFoundError(f"Blob '{blob}' não encontrado.")
+
+    def list_blob_names(self, container):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM blobs WHERE container = ? ORDER BY name", (container,))]
+
+
+def create_backends(kind, sqlite_path=":memory:", search_latency=0.0, blob_latency=0.0):
+    """Fábrica: retorna (serviço de blobs, índice de busca) do tipo pedido."""
+    if kind == "memory":
+        return InMemoryBlobService(blob_latency), InMemorySearchIndex(latency_seconds=search_latency)
+    if kind == "sqlite":
+        return SQLiteBlobService(sqlite_path, blob_latency), SQLiteSearchIndex(sqlite_path, latency_seconds=search_latency)
+    raise ValueError(f"Backend desconhecido: {kind}")
@@ -0,0 +1,232 @@
+"""
+Benchmark e verificação da reconciliação (`backend-trigger/backfill.py`) contra os substitutos locais.
+
+Monta um contêiner `documentos-brutos` com N blobs (uma fração são cópias
+do mesmo conteúdo, e todos seguem o nome `<sha256>.pdf` do frontend) e um
+índice em que só parte deles chegou, como depois de eventos perdidos do
+Blob Trigger. Depois mede:
+
+* a reconciliação com um só worker e com `--workers` em paralelo;
+* a mesma com `--trust-names` (os já indexados não são baixados);
+* a retoma: a execução para a meio (`max_pages`) e outra continua pelo
+  checkpoint;
+* um índice que recusa metade das chaves: o relatório tem de contar como
+  falhas exatamente as que não entraram, todas registradas pelo nome; com o
+  índice de volta ao normal, `retry_failures` tem de completar o índice;
+* o destino de falhas da função: com o mesmo índice, o `BatchingIndexWriter`
+  com `BlobDeadLetter` guarda todos os documentos recusados, e
+  `replay_dead_letters` tem de completar o índice e esvaziar o contêiner;
+* um índice que recusa pedidos inteiros (503): o escritor tem de reenviar o
+  lote todo num pedido por rodada, não documento a documento.
+
+Nos outros cenários confere que o índice termina com exatamente um
+documento por conteúdo distinto.
+
+Uso:
+    python bench_backfill.py --blobs 20000 --indexed 0.7 --blob-latency-ms 5
+"""
+import argparse
+import hashlib
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, "..", "backend-trigger"))
+
+from backends import InMemoryBlobService, InMemorySearchIndex, _indexing_result  # noqa: E402
+from backfill import RAW_CONTAINER, backfill, replay_dead_letters  # noqa: E402
+from index_writer import DEAD_LETTER_CONTAINER, BatchingIndexWriter, BlobDeadLetter, build_index_document  # noqa: E402
+
+
+class RejectingSearchIndex(InMemorySearchIndex):
+    """Índice que recusa as chaves começadas por 0-7 (metade dos hashes) enquanto `rejecting` for verdadeiro."""
+
+    rejecting = True
+
+    def merge_or_upload_documents(self, documents):
+        accepted = [doc for doc in documents if not self.rejecting or doc["id"][0] not in "01234567"]
+        results = {r.key: r for r in super().merge_or_upload_documents(accepted)} if accepted else {}
+        return [results.get(doc["id"]) or _indexing_result(doc["id"], ok=False, error="recusado")
+                for doc in documents]
+
+
+class ThrottledSearchIndex(InMemorySearchIndex):
+    """Índice cujos primeiros `failures` pedidos falham por inteiro, como um 503 do serviço."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def merge_or_upload_documents(self, documents):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("503 Service Unavailable")
+        return super().merge_or_upload_documents(documents)
+
+
+def build_world(args, rng, search_index_class=InMemorySearchIndex):
+    """Contêiner completo e índice parcial. Retorna (serviço de blobs, índice, conteúdos distintos)."""
+    blob_service = InMemoryBlobService(args.blob_latency_ms / 1000)
+    search_index = search_index_class(latency_seconds=args.search_latency_ms / 1000)
+    hashes = []
+    latency, blob_service.latency_seconds = blob_service.latency_seconds, 0.0
+    for i in range(args.blobs):
+        if hashes and rng.random() < args.duplicate_rate:
+            # Cópia de um conteúdo anterior, com outra extensão (o nome continua a ser o hash)
+            document_hash, content = rng.choice(hashes)
+            name = f"{document_hash}.png"
+        else:
+            content = rng.randbytes(args.size_kb * 1024)
+            document_hash = hashlib.sha256(content).hexdigest()
+            hashes.append((document_hash, content))
+            name = f"{document_hash}.pdf"
+        blob_service.get_blob_client(RAW_CONTAINER, name).upload_blob(content, overwrite=True)
+    blob_service.latency_seconds = latency
+    indexed = [build_index_document(h, f"{h}.pdf") for h, _ in hashes if rng.random() < args.indexed]
+    for i in range(0, len(indexed), 1000):
+        search_index.merge_or_upload_documents(indexed[i:i + 1000])
+    return blob_service, search_index, len(hashes)
+
+
+def scenario(name, args, **kwargs):
+    rng = random.Random(args.seed)
+    blob_service, search_index, distinct = build_world(args, rng)
+    container = blob_service.get_container_client(RAW_CONTAINER)
+    before = len(search_index)
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "backfill.json")
+        stop_after = kwargs.pop("stop_after", None)
+        if stop_after:
+            partial = backfill(container, search_index, checkpoint_path=checkpoint, page_size=args.page_size,
+                               max_pages=stop_after, progress=lambda _: None, **kwargs)
+            assert not partial["completed"]
+        report = backfill(container, search_index, checkpoint_path=checkpoint, page_size=args.page_size,
+                          progress=lambda _: None, **kwargs)
+    ok = report["completed"] and len(search_index) == distinct
+    print(f"{name:<34} {report['this_run']['seconds']:7.2f} s | {report['blobs_per_s']:7.0f} blobs/s | "
+          f"hasheados {report['blobs_hashed']:6d} | gravados {report['indexed']:6d} "
+          f"(índice {before} -> {len(search_index)} de {distinct}) | pedidos ao índice {search_index.requests} "
+          f"| {'OK' if ok else 'DIVERGENTE'}")
+    return ok
+
+
+def resume_scenario(args):
+    """Para na metade das páginas e retoma pelo checkpoint; com menos de 3 páginas não há meio onde parar."""
+    pages = math.ceil(args.blobs / args.page_size)
+    if pages < 3:
+        print(f"{args.workers} workers, retomado: ignorado ({pages} página(s); use mais --blobs ou menos --page-size)")
+        return True
+    return scenario(f"{args.workers} workers, retomado", args, workers=args.workers, stop_after=pages // 2)
+
+
+def rejecting_scenario(args):
+    """
+    Com metade das chaves recusadas, `indexed` e `index_failures` têm de
+    bater com o índice. Lotes de 100 fazem o `add` do escritor enviar lotes
+    cheios sozinho, no meio de cada página.
+    """
+    blob_service, search_index, distinct = build_world(args, random.Random(args.seed), RejectingSearchIndex)
+    container = blob_service.get_container_client(RAW_CONTAINER)
+    before = len(search_index)
+    options = dict(page_size=args.page_size, workers=args.workers, progress=lambda _: None,
+                   batch_size=100, max_retries=1, retry_backoff_seconds=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "backfill.json")
+        report = backfill(container, search_index, checkpoint_path=checkpoint, **options)
+        written = len(search_index) - before
+        ok = (report["indexed"] == written and report["indexed"] + report["index_failures"] == distinct - before
+              and report["failures_pending"] >= report["index_failures"])
+        print(f"{'índice que recusa metade das chaves':<34} gravados {report['indexed']:6d} (no índice {written}) | "
+              f"falhas de indexação {report['index_failures']:6d} | registradas {report['failures_pending']:6d} | "
+              f"{'OK' if ok else 'DIVERGENTE'}")
+
+        search_index.rejecting = False
+        retry = backfill(container, search_index, checkpoint_path=checkpoint, retry_failures=True, **options)
+        retried_ok = len(search_index) == distinct and retry["failures_pending"] == 0
+        print(f"{'  + --retry-failures':<34} tentados {retry['retry']['retried']:6d} | "
+              f"resolvidos {retry['retry']['recovered']:6d} | índice {len(search_index)} de {distinct} | "
+              f"{'OK' if retried_ok else 'DIVERGENTE'}")
+    return ok and retried_ok
+
+
+def dead_letter_scenario(args):
+    """
+    A função grava pelo escritor com `BlobDeadLetter`: cada documento que o
+    índice recusa tem de virar um blob, e o reenvio tem de os gravar todos.
+    """
+    blob_service, search_index, distinct = build_world(args, random.Random(args.seed), RejectingSearchIndex)
+    dead_letters = blob_service.get_container_client(DEAD_LETTER_CONTAINER)
+    writer = BatchingIndexWriter(search_index, max_batch_size=100, background_flush=False, max_retries=1,
+                                 retry_backoff_seconds=0, dead_letter=BlobDeadLetter(lambda: dead_letters))
+    hashes = {name.split(".")[0] for name in blob_service.list_blob_names(RAW_CONTAINER)}
+    for document_hash in sorted(hashes):
+        writer.add(build_index_document(document_hash, f"{document_hash}.pdf"))
+    unsaved = writer.flush()
+    stored = len(blob_service.list_blob_names(DEAD_LETTER_CONTAINER))
+    rejected = len(hashes) - len(search_index)
+    ok = not unsaved and stored == rejected == writer.metrics()["documents_dead_lettered"]
+    print(f"{'destino de falhas da função':<34} recusados {rejected:6d} | guardados {stored:6d} | "
+          f"{'OK' if ok else 'DIVERGENTE'}")
+
+    search_index.rejecting = False
+    replay = replay_dead_letters(dead_letters, search_index, page_size=args.page_size, progress=lambda _: None,
+                                 max_retries=1, retry_backoff_seconds=0)
+    left = len(blob_service.list_blob_names(DEAD_LETTER_CONTAINER))
+    replayed_ok = len(search_index) == distinct and replay["indexed"] == stored and not left
+    print(f"{'  + --dead-letters':<34} reenviados {replay['indexed']:6d} | restantes {left:6d} | "
+          f"índice {len(search_index)} de {distinct} | {'OK' if replayed_ok else 'DIVERGENTE'}")
+    return ok and replayed_ok
+
+
+def throttled_writer_check():
+    """100 documentos e dois pedidos recusados: 3 pedidos ao índice e só as duas esperas das rodadas."""
+    search_index = ThrottledSearchIndex(failures=2)
+    writer = BatchingIndexWriter(search_index, max_batch_size=100, background_flush=False, max_retries=3,
+                                 retry_backoff_seconds=0.05)
+    start = time.perf_counter()
+    for i in range(100):
+        writer.add(build_index_document(f"{i:064x}", f"{i}.pdf"))
+    failed = writer.flush()
+    elapsed = time.perf_counter() - start
+    ok = not failed and len(search_index) == 100 and search_index.requests == 1 and elapsed < 0.5
+    print(f"{'índice que recusa pedidos inteiros':<34} {elapsed:7.2f} s | pedidos aceitos {search_index.requests} "
+          f"| rodadas {writer.metrics()['retries']} | índice {len(search_index)} de 100 | "
+          f"{'OK' if ok else 'DIVERGENTE'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blobs", type=int, default=5000)
+    parser.add_argument("--size-kb", type=int, default=32)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--indexed", type=float, default=0.7, help="Fração dos conteúdos que já está no índice.")
+    parser.add_argument("--blob-latency-ms", type=float, default=5.0, help="Latência de cada download e listagem.")
+    parser.add_argument("--search-latency-ms", type=float, default=5.0)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    # As recusas do índice falso geram um aviso e um erro por chave
+    logging.disable(logging.ERROR)
+
+    results = [
+        scenario("1 worker", args, workers=1),
+        scenario(f"{args.workers} workers", args, workers=args.workers),
+        scenario(f"{args.workers} workers + --trust-names", args, workers=args.workers, trust_names=True),
+        resume_scenario(args),
+        rejecting_scenario(args),
+        dead_letter_scenario(args),
+        throttled_writer_check(),
+    ]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark do arranque a frio de cada ponto de entrada do detector de fraudes.
+
+Cada medida roda num interpretador novo (como uma instância recém-criada do
+plano Consumption) e separa dois tempos:
+
+* import: o que o host paga para carregar `function_app.py` (ou os módulos
+  do app Streamlit) e descobrir as funções;
+* primeira chamada: a primeira invocação, que inclui criar os clientes do
+  Azure. Para o backend-trigger mede-se com e sem `PREWARM_CLIENTS`, com
+  `--espera-ms` entre o import e o primeiro blob (o tempo que o host leva a
+  entregar o primeiro evento).
+
+As credenciais são fictícias e nenhuma chamada chega à rede: os clientes são
+criados, mas o lote do índice nunca atinge o flush antes de o processo sair.
+O Streamlit não é importado (o app só corre dentro dele); o cloudservice é
+medido pelos seus módulos e pela criação dos clientes.
+
+Com `--historico`, cada execução acrescenta uma linha JSON por ponto de
+entrada (com o commit atual) e mostra a diferença para a execução anterior,
+para acompanhar o custo de arranque ao longo do tempo:
+
+    python bench_cold_start.py --repeticoes 7 --historico cold_start.jsonl
+    python bench_cold_start.py --detalhe    # os imports mais caros de cada um
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.join(_HERE, "..")
+
+# Configuração fictícia: suficiente para construir os clientes, sem rede
+FAKE_ENV = {
+    "AZURE_SEARCH_SERVICE_NAME": "bench-cold-start",
+    "AZURE_SEARCH_KEY": "chave-ficticia",
+    "AZURE_SEARCH_INDEX_NAME": "index-vigilancia-fraudes",
+    "AZURE_STORAGE_CONNECTION_STRING": "DefaultEndpointsProtocol=https;AccountName=benchcoldstart;"
+                                       "AccountKey=Y2hhdmUtZmljdGljaWE=;EndpointSuffix=core.windows.net",
+    "METRICS_EXPORTER": "",
+}
+
+_BACKEND_CALL = """
+import azure.functions as func
+blob = func.blob.InputStream(data=b"%PDF-1.4 bench", name="documentos-brutos/bench.pdf", length=14)
+function_app.ProcessDocumentHash(blob)
+"""
+
+_SKILL_CALL = """
+import base64, json
+import azure.functions as func
+body = json.dumps({"values": [{"recordId": "1", "data": {"file_input": base64.b64encode(b"bench").decode()}}]})
+function_app.CalculateHash(func.HttpRequest("POST", "/api/CalculateHash", body=body.encode()))
+"""
+
+_FRONTEND_CALL = """
+clients.get_blob_service_client()
+clients.get_search_client()
+"""
+
+# nome -> (pasta, código do import, código da primeira chamada, variáveis extras)
+ENTRY_POINTS = {
+    "backend-trigger": ("backend-trigger", "import function_app", _BACKEND_CALL, {"PREWARM_CLIENTS": "false"}),
+    "backend-trigger+prewarm": ("backend-trigger", "import function_app", _BACKEND_CALL, {"PREWARM_CLIENTS": "true"}),
+    "funcao-hash": ("funcao-hash", "import function_app", _SKILL_CALL, {}),
+    "cloudservice": ("cloudservice", "import clients, batch, digest_cache, hash_cache, index_lookup, submission",
+                     _FRONTEND_CALL, {}),
+}
+
+# Roda no interpretador novo: cronometra o import e a primeira chamada e sai
+# sem os handlers do atexit (que tentariam falar com o serviço fictício)
+_CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+{import_code}
+imported = time.perf_counter()
+time.sleep({wait})
+called_at = time.perf_counter()
+{call_code}
+done = time.perf_counter()
+sys.stdout.write(json.dumps({{"import_ms": (imported - start) * 1000, "first_call_ms": (done - called_at) * 1000}}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def measure_once(folder, import_code, call_code, extra_env, wait):
+    env = {**os.environ, **FAKE_ENV, **extra_env}
+    code = _CHILD.format(import_code=import_code, call_code=call_code, wait=wait)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(_ROOT, folder), env=env,
+                               capture_output=True, text=True)
+    process_ms = (time.perf_counter() - start) * 1000 - wait * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "falhou")
+    return {**json.loads(completed.stdout), "process_ms": process_ms}
+
+
+def slowest_imports(folder, import_code, extra_env, top=5):
+    """Os módulos com maior tempo cumulativo de import (`python -X importtime`)."""
+    env = {**os.environ, **FAKE_ENV, **extra_env}
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", import_code],
+                               cwd=os.path.join(_ROOT, folder), env=env, capture_output=True, text=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and parts[1].strip().isdigit():
+            # A indentação do nome dá o nível: 1 é o próprio ponto de entrada, 2 o que ele importou
+            level = (len(parts[2]) - len(parts[2].lstrip())) // 2
+            rows.append((int(parts[1]), level, parts[2].strip()))
+    direct = [(us, name) for us, level, name in rows if level == 2 and name != "site"]
+    return sorted(direct, reverse=True)[:top]
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_previous(path):
+    previous = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    previous[record["entry_point"]] = record
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5, help="Interpretadores novos por ponto de entrada.")
+    parser.add_argument("--espera-ms", type=float, default=300.0,
+                        help="Intervalo entre o import e a primeira chamada.")
+    parser.add_argument("--pontos", default=",".join(ENTRY_POINTS), help="Pontos de entrada, separados por vírgula.")
+    parser.add_argument("--historico", help="Arquivo JSONL onde acrescentar os resultados desta execução.")
+    parser.add_argument("--detalhe", action="store_true", help="Mostra os imports mais caros de cada ponto.")
+    args = parser.parse_args()
+
+    previous = load_previous(args.historico)
+    commit = current_commit()
+    records = []
+    print(f"{'ponto de entrada':<26} {'import':>10} {'1ª chamada':>12} {'processo':>10}   (medianas em ms)")
+    for name in args.pontos.split(","):
+        folder, import_code, call_code, extra_env = ENTRY_POINTS[name]
+        try:
+            runs = [measure_once(folder, import_code, call_code, extra_env, args.espera_ms / 1000)
+                    for _ in range(args.repeticoes)]
+        except RuntimeError as e:
+            print(f"{name:<26} indisponível: {e}")
+            continue
+        record = {
+            "entry_point": name,
+            "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": commit,
+            "python": sys.version.split()[0],
+            "repetitions": args.repeticoes,
+            "wait_ms": args.espera_ms,
+        }
+        for key in ("import_ms", "first_call_ms", "process_ms"):
+            record[key] = statistics.median(run[key] for run in runs)
+        records.append(record)
+
+        line = f"{name:<26} {record['import_ms']:10.1f} {record['first_call_ms']:12.1f} {record['process_ms']:10.1f}"
+        before = previous.get(name)
+        if before:
+            line += (f"   Δ import {record['import_ms'] - before['import_ms']:+.1f}, "
+                     f"Δ 1ª chamada {record['first_call_ms'] - before['first_call_ms']:+.1f} "
+                     f"(vs. {before.get('commit') or before['when']})")
+        print(line)
+        if args.detalhe:
+            for micros, module in slowest_imports(folder, import_code, extra_env):
+                print(f"{'':28}{micros / 1000:8.1f} ms  {module}")
+
+    if args.historico and records:
+        with open(args.historico, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"Resultados acrescentados a '{args.historico}'.")
+
+
+if __name__ == "__main__":
+    main()
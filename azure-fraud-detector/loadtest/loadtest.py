@@ -0,0 +1,290 @@
+"""
+Teste de carga ponta a ponta do pipeline de fraudes, sem serviços Azure.
+
+Reproduz N submissões concorrentes pelo mesmo caminho do sistema real:
+
+    frontend (hash → consulta ao índice → upload para `documentos-brutos`)
+        → Blob Trigger simulado (com atraso configurável)
+        → backend (hash em streaming → escritor em lote do índice)
+        → índice `index-vigilancia-fraudes`
+
+O frontend e o backend usam os módulos de `cloudservice/` e
+`backend-trigger/`; o armazenamento e a busca são os substitutos locais de
+`backends.py` (memória ou SQLite).
+
+Ao final, relata a vazão, o histograma de latência das submissões e a
+precisão da deduplicação: cada conteúdo distinto deve ser aceito
+exatamente uma vez e rejeitado em todas as outras submissões.
+
+Com `--corpus`, a carga é um corpus de PDFs gerado por
+`gerador_pdf/gerador_pdf.py` (com duplicatas exatas e quase-duplicatas), e
+a precisão é medida contra o SHA-256 do seu manifesto.
+
+Uso:
+    python loadtest.py --submissions 2000 --concurrency 32 --duplicate-rate 0.3
+    python loadtest.py --backend sqlite --sqlite-path carga.db --json baseline.json
+    python loadtest.py --corpus ../gerador_pdf/corpus
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(_HERE, "..", "cloudservice"), os.path.join(_HERE, "..", "backend-trigger")]
+
+from backends import create_backends  # noqa: E402
+from batch import VERDICT_ACCEPTED  # noqa: E402
+from hash_cache import HashLookup, iter_index_hashes  # noqa: E402
+from hash_stream import stream_sha256  # noqa: E402
+from index_lookup import existing_hashes, hash_exists  # noqa: E402
+from index_writer import BatchingIndexWriter  # noqa: E402
+from instrumentation import Metrics, NullMetrics  # noqa: E402
+from submission import RAW_CONTAINER, submit_document  # noqa: E402
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class TriggerSimulator:
+    """
+    Simula o Blob Trigger + ProcessDocumentHash: cada upload no contêiner
+    monitorado é processado por um pool de "instâncias" após `delay` segundos.
+    """
+
+    def __init__(self, blob_service, writer, workers=4, delay=0.0, metrics=None):
+        self.blob_service = blob_service
+        self.writer = writer
+        self.delay = delay
+        self.metrics = metrics or NullMetrics()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blob-trigger")
+        self._pending = 0
+        self._idle = threading.Condition()
+        self.processed = 0
+
+    def on_upload(self, container, blob):
+        if container != RAW_CONTAINER:
+            return
+        with self._idle:
+            self._pending += 1
+        self._pool.submit(self._process, blob, time.monotonic() + self.delay)
+
+    def _process(self, blob_name, due):
+        try:
+            # O atraso conta a partir do upload, não da hora em que a instância pega o evento
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            # Espelha ProcessDocumentHash (backend-trigger/function_app.py)
+            timings = {} if self.metrics.enabled else None
+            document_hash, bytes_read = stream_sha256(self.blob_service.open_blob(RAW_CONTAINER, blob_name),
+                                                      timings=timings)
+            if timings:
+                self.metrics.observe_phases(timings)
+            self.metrics.count("bytes_processed", bytes_read)
+            self.writer.add({
+                "id": document_hash,
+                "document_hash": document_hash,
+                "status": "Processado_V5",
+                "filename": blob_name.split('/')[-1],
+                "processed_timestamp": time.time(),
+            })
+        finally:
+            with self._idle:
+                self._pending -= 1
+                self.processed += 1
+                self._idle.notify_all()
+
+    def drain(self):
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending == 0)
+        self.writer.flush()
+        self._pool.shutdown()
+
+
+def build_workload(submissions, duplicate_rate, size_kb, rng):
+    """Lista de (nome, conteúdo, id do conteúdo); duplicatas repetem um conteúdo anterior."""
+    workload, contents = [], []
+    for i in range(submissions):
+        if contents and rng.random() < duplicate_rate:
+            content_id = rng.randrange(len(contents))
+        else:
+            content_id = len(contents)
+            contents.append(rng.randbytes(size_kb * 1024))
+        workload.append((f"comprovante_{i:06d}.pdf", contents[content_id], content_id))
+    return workload
+
+
+def load_corpus(directory, manifest="manifesto.jsonl"):
+    """Carga a partir de um corpus gerado: (arquivo, conteúdo, SHA-256 do manifesto), na ordem dos índices."""
+    with open(os.path.join(directory, manifest), encoding="utf-8") as f:
+        rows = sorted((json.loads(line) for line in f), key=lambda row: row["indice"])
+    workload = []
+    for row in rows:
+        with open(os.path.join(directory, row["arquivo"]), "rb") as f:
+            workload.append((os.path.basename(row["arquivo"]), f.read(), row["sha256"]))
+    return workload
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+
+def print_histogram(latencies_ms):
+    counts = Counter()
+    for value in latencies_ms:
+        bucket = next((b for b in LATENCY_BUCKETS_MS if value <= b), None)
+        counts[bucket] += 1
+    peak = max(counts.values()) if counts else 1
+    previous = 0
+    for bucket in LATENCY_BUCKETS_MS + [None]:
+        label = f"<= {bucket} ms" if bucket is not None else f"> {previous} ms"
+        count = counts.get(bucket, 0)
+        if count:
+            print(f"  {label:>12} | {'#' * max(1, int(40 * count / peak)):<40} {count}")
+        previous = bucket if bucket is not None else previous
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    if args.corpus:
+        workload = load_corpus(args.corpus)
+    else:
+        workload = build_workload(args.submissions, args.duplicate_rate, args.size_kb, rng)
+
+    blob_service, search_index = create_backends(
+        args.backend, args.sqlite_path,
+        search_latency=args.search_latency_ms / 1000, blob_latency=args.blob_latency_ms / 1000,
+    )
+    # Mesmos histogramas que as funções exportam, agregados localmente
+    metrics = Metrics("loadtest") if args.metrics else NullMetrics()
+    writer = BatchingIndexWriter(search_index, max_batch_size=args.index_batch_size, max_age_seconds=args.index_batch_age,
+                                 metrics=metrics)
+    trigger = TriggerSimulator(blob_service, writer, workers=args.backend_workers, delay=args.trigger_delay_ms / 1000,
+                               metrics=metrics)
+    blob_service.on_upload(trigger.on_upload)
+
+    def timed_hash_exists(document_hash):
+        with metrics.timer("index_lookup_seconds"):
+            return hash_exists(search_index, document_hash)
+
+    hash_lookup = HashLookup(
+        remote_check=timed_hash_exists,
+        remote_check_many=lambda hs: existing_hashes(search_index, hs),
+        load_hashes=(lambda since=None: iter_index_hashes(search_index, since=since)) if args.bloom else None,
+    )
+
+    def _submit(item):
+        name, content, content_id = item
+        start = time.perf_counter()
+        try:
+            verdict, _ = submit_document(blob_service, hash_lookup, name, content)
+        except Exception as e:
+            verdict = f"erro: {type(e).__name__}"
+        metrics.observe("submission_seconds", time.perf_counter() - start)
+        return content_id, verdict, (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(_submit, workload))
+    frontend_seconds = time.perf_counter() - wall_start
+    trigger.drain()
+    end_to_end_seconds = time.perf_counter() - wall_start
+    hash_lookup.close()
+
+    # Precisão: cada conteúdo distinto deve ser aceito exatamente uma vez
+    accepted = defaultdict(int)
+    verdicts = Counter()
+    for content_id, verdict, _ in outcomes:
+        verdicts[verdict] += 1
+        if verdict == VERDICT_ACCEPTED:
+            accepted[content_id] += 1
+    distinct = len({content_id for _, _, content_id in workload})
+    duplicates_accepted = sum(n - 1 for n in accepted.values() if n > 1)
+    never_accepted = distinct - len(accepted)
+    expected_rejections = len(workload) - distinct
+
+    latencies = sorted(latency for _, _, latency in outcomes)
+    report = {
+        "backend": args.backend,
+        "submissions": len(workload),
+        "concurrency": args.concurrency,
+        "distinct_documents": distinct,
+        "throughput_per_s": len(workload) / frontend_seconds,
+        "frontend_seconds": frontend_seconds,
+        "end_to_end_seconds": end_to_end_seconds,
+        "latency_ms": {p: percentile(latencies, p) for p in (50, 90, 99)} | {"max": latencies[-1] if latencies else 0.0},
+        "verdicts": dict(verdicts),
+        "duplicates_accepted": duplicates_accepted,
+        "documents_never_accepted": never_accepted,
+        "dedup_accuracy": 1 - (duplicates_accepted + never_accepted) / len(workload) if workload else 1.0,
+        "expected_rejections": expected_rejections,
+        "indexed_documents": len(search_index),
+        "search_requests": search_index.requests,
+        "index_writer": writer.metrics(),
+        "hash_lookup": hash_lookup.stats(),
+        "metrics": metrics.snapshot(),
+    }
+    return report, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sqlite-path", default=":memory:")
+    parser.add_argument("--submissions", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--search-latency-ms", type=float, default=5.0)
+    parser.add_argument("--blob-latency-ms", type=float, default=10.0)
+    parser.add_argument("--trigger-delay-ms", type=float, default=200.0, help="Atraso até o Blob Trigger disparar.")
+    parser.add_argument("--backend-workers", type=int, default=4)
+    parser.add_argument("--index-batch-size", type=int, default=100)
+    parser.add_argument("--index-batch-age", type=float, default=1.0)
+    parser.add_argument("--bloom", action="store_true", help="Liga o filtro de Bloom do HashLookup.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", help="Diretório de um corpus do gerador_pdf (substitui --submissions, "
+                                         "--duplicate-rate e --size-kb).")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Liga a instrumentação por fase (leitura, hash, consulta e escrita no índice).")
+    parser.add_argument("--json", help="Grava o relatório completo neste arquivo.")
+    args = parser.parse_args()
+
+    report, latencies = run(args)
+
+    print(f"--- Relatório de carga ({report['backend']}) ---")
+    print(f"Submissões: {report['submissions']} ({report['distinct_documents']} documentos distintos), "
+          f"concorrência {report['concurrency']}")
+    print(f"Vazão do frontend: {report['throughput_per_s']:.1f} submissões/s "
+          f"({report['frontend_seconds']:.2f} s; ponta a ponta {report['end_to_end_seconds']:.2f} s)")
+    lat = report["latency_ms"]
+    print(f"Latência (ms): p50 {lat[50]:.1f} | p90 {lat[90]:.1f} | p99 {lat[99]:.1f} | máx {lat['max']:.1f}")
+    print_histogram(latencies)
+    print(f"Vereditos: {report['verdicts']}")
+    print(f"Duplicatas aceitas indevidamente: {report['duplicates_accepted']} | "
+          f"documentos nunca aceitos: {report['documents_never_accepted']} | "
+          f"precisão da deduplicação: {report['dedup_accuracy']:.2%}")
+    print(f"Documentos indexados: {report['indexed_documents']} | pedidos ao índice: {report['search_requests']}")
+    if report["metrics"]:
+        print("Fases (ms):")
+        for phase, histogram in report["metrics"]["histograms"].items():
+            print(f"  {phase:<24} n={histogram['count']:<6} média {histogram['mean'] * 1000:8.2f} | "
+                  f"p50 ~{histogram['p50'] * 1000:7.2f} | p99 ~{histogram['p99'] * 1000:7.2f} | "
+                  f"máx {histogram['max'] * 1000:8.2f}")
+        print(f"Contadores: {report['metrics']['counters']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Relatório gravado em '{args.json}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Teste de estresse da reivindicação atômica do hash na submissão.
+
+Dispara, ao mesmo tempo (todas as threads presas numa barreira), várias
+cópias de cada documento contra os substitutos locais de `backends.py`,
+simulando várias instâncias do frontend (cada uma com o seu HashLookup, sem
+cache partilhado). Metade das cópias vai pelo caminho unitário
+(`submit_document`) e metade pelo caminho em lote (`process_batch`).
+
+Como todas consultam o índice antes de qualquer upload, todas veem o hash
+como "novo"; só a criação condicional do blob decide quem ganha. A
+invariante verificada é: cada conteúdo distinto é aceito exatamente uma vez.
+Termina com código 1 se ela for violada em algum backend.
+
+Uso:
+    python stress_claim.py --documents 50 --copies 16 --rounds 5
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(_HERE, "..", "cloudservice"), os.path.join(_HERE, "..", "backend-trigger")]
+
+from backends import create_backends  # noqa: E402
+from batch import VERDICT_ACCEPTED, VERDICT_REJECTED, process_batch  # noqa: E402
+from hash_cache import HashLookup  # noqa: E402
+from index_lookup import existing_hashes, hash_exists  # noqa: E402
+from submission import submit_document, upload_document  # noqa: E402
+
+
+def run_round(backend, documents, copies, instances, blob_latency, rng):
+    blob_service, search_index = create_backends(backend, blob_latency=blob_latency)
+    lookups = [
+        HashLookup(remote_check=lambda h: hash_exists(search_index, h),
+                   remote_check_many=lambda hs: existing_hashes(search_index, hs))
+        for _ in range(instances)
+    ]
+    contents = [rng.randbytes(4096) for _ in range(documents)]
+    jobs = [(doc_id, copy) for doc_id in range(documents) for copy in range(copies)]
+    rng.shuffle(jobs)
+    barrier = threading.Barrier(len(jobs))
+
+    def _submit(job):
+        doc_id, copy = job
+        hash_lookup = lookups[copy % instances]
+        name = f"doc_{doc_id:04d}_copia_{copy:02d}.pdf"
+        barrier.wait()
+        if copy % 2:
+            verdict, _ = submit_document(blob_service, hash_lookup, name, contents[doc_id])
+        else:
+            [row] = process_batch(
+                [(name, contents[doc_id])],
+                check_existing=hash_lookup.contains_many,
+                upload=lambda n, h, c: upload_document(blob_service, hash_lookup, n, h, c),
+                max_workers=1,
+            )
+            verdict = row["veredito"]
+        return doc_id, verdict
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        outcomes = list(pool.map(_submit, jobs))
+    for hash_lookup in lookups:
+        hash_lookup.close()
+
+    accepted = Counter(doc_id for doc_id, verdict in outcomes if verdict == VERDICT_ACCEPTED)
+    verdicts = Counter(verdict for _, verdict in outcomes)
+    violations = [doc_id for doc_id in range(documents) if accepted[doc_id] != 1]
+    return verdicts, violations, len(blob_service.list_blob_names("documentos-brutos"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "sqlite", "all"], default="all")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=16, help="Submissões simultâneas de cada documento.")
+    parser.add_argument("--instances", type=int, default=4, help="Instâncias do frontend (HashLookup independentes).")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--blob-latency-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    backends = ["memory", "sqlite"] if args.backend == "all" else [args.backend]
+    failed = False
+    for backend in backends:
+        for round_no in range(1, args.rounds + 1):
+            verdicts, violations, blobs = run_round(
+                backend, args.documents, args.copies, args.instances, args.blob_latency_ms / 1000, rng)
+            status = "OK" if not violations else f"FALHOU ({len(violations)} documentos)"
+            print(f"[{backend}] rodada {round_no}: aceitos {verdicts[VERDICT_ACCEPTED]} | "
+                  f"rejeitados {verdicts[VERDICT_REJECTED]} | outros "
+                  f"{sum(n for v, n in verdicts.items() if v not in (VERDICT_ACCEPTED, VERDICT_REJECTED))} | "
+                  f"blobs {blobs} | {status}")
+            failed = failed or bool(violations)
+
+    if failed:
+        print("Invariante violada: algum documento não foi aceito exatamente uma vez.")
+        sys.exit(1)
+    print("Invariante mantida: cada documento foi aceito exatamente uma vez.")
+
+
+if __name__ == "__main__":
+    main()
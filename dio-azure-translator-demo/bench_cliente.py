@@ -0,0 +1,106 @@
+"""
+Benchmark: latência por chamada com conexão fria (`requests.post` avulso,
+como o tradutor fazia) versus conexão reaproveitada (`ClienteTradutor`),
+contra o servidor simulado local. Com --tls o custo do handshake entra na
+conta, como acontece com o endpoint real.
+
+Também verifica as novas tentativas: com --throttle o servidor responde 429
+com Retry-After e todas as chamadas do cliente devem terminar com sucesso.
+
+Uso:
+    python bench_cliente.py --chamadas 300 --tls
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import requests
+
+from cliente_tradutor import ClienteTradutor, ClienteTradutorAsync
+from servidor_simulado import ServidorSimulado
+
+
+def _resumo(nome, latencias, conexoes):
+    ordenadas = sorted(latencias)
+    p99 = ordenadas[min(len(ordenadas) - 1, int(0.99 * len(ordenadas)))]
+    print(f"{nome:<28} média {statistics.mean(latencias) * 1000:7.2f} ms | "
+          f"p50 {statistics.median(latencias) * 1000:7.2f} ms | p99 {p99 * 1000:7.2f} ms | conexões {conexoes}")
+
+
+def fria(servidor, chamadas):
+    latencias = []
+    for i in range(chamadas):
+        inicio = time.perf_counter()
+        resposta = requests.post(servidor.url + "/translate", params={"api-version": "3.0", "to": ["en"]},
+                                 json=[{"text": f"olá {i}"}], verify=servidor.certificado or True)
+        resposta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+def reaproveitada(servidor, chamadas):
+    latencias = []
+    with ClienteTradutor(servidor.url, "chave", "regiao") as cliente:
+        if servidor.certificado:
+            # trust_env=False para REQUESTS_CA_BUNDLE não sobrepor a CA do servidor simulado
+            cliente.sessao.trust_env = False
+            cliente.sessao.verify = servidor.certificado
+        for i in range(chamadas):
+            inicio = time.perf_counter()
+            cliente.traduzir([f"olá {i}"], ["en"])
+            latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+async def assincrona(servidor, chamadas, concorrencia):
+    async with ClienteTradutorAsync(servidor.url, "chave", "regiao", tamanho_pool=concorrencia) as cliente:
+        semaforo = asyncio.Semaphore(concorrencia)
+
+        async def _uma(i):
+            async with semaforo:
+                await cliente.traduzir([f"olá {i}"], ["en"])
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_uma(i) for i in range(chamadas)))
+        return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chamadas", type=int, default=200)
+    parser.add_argument("--tls", action="store_true", help="Servidor com TLS (requer openssl).")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência artificial do servidor.")
+    parser.add_argument("--concorrencia", type=int, default=16, help="Concorrência da variante assíncrona.")
+    parser.add_argument("--throttle", action="store_true", help="Servidor limita caracteres e responde 429.")
+    args = parser.parse_args()
+
+    latencia = args.latencia_ms / 1000
+    with ServidorSimulado(latencia=latencia, tls=args.tls) as servidor:
+        _resumo("conexão fria (requests.post)", fria(servidor, args.chamadas), servidor.conexoes)
+    with ServidorSimulado(latencia=latencia, tls=args.tls) as servidor:
+        _resumo("conexão reaproveitada", reaproveitada(servidor, args.chamadas), servidor.conexoes)
+
+    try:
+        with ServidorSimulado(latencia=latencia, tls=args.tls) as servidor:
+            if servidor.certificado:
+                print("(variante assíncrona medida só sem --tls)")
+            else:
+                segundos = asyncio.run(assincrona(servidor, args.chamadas, args.concorrencia))
+                print(f"{'assíncrona (httpx)':<28} {args.chamadas / segundos:7.0f} chamadas/s com "
+                      f"concorrência {args.concorrencia} | conexões {servidor.conexoes}")
+    except ImportError as e:
+        print(f"(variante assíncrona ignorada: {e})")
+
+    if args.throttle:
+        # 60 caracteres por janela de 0,2 s: a maior parte das chamadas leva um 429 antes de passar
+        with ServidorSimulado(caracteres_por_janela=60, janela=0.2, retry_after="0.2") as servidor:
+            with ClienteTradutor(servidor.url, "chave", "regiao", max_tentativas=20) as cliente:
+                for i in range(20):
+                    cliente.traduzir([f"texto número {i:03d}"], ["en"])
+            print(f"limitação: 20 chamadas concluídas | 429 recebidos {servidor.recusados_429} | "
+                  f"novas tentativas {cliente.novas_tentativas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark do limitador de taxa: o servidor simulado aceita no máximo N
+caracteres por janela de 1 s e responde 429 com Retry-After acima disso.
+O mesmo lote é traduzido três vezes:
+
+* sem limitador (só as novas tentativas do cliente);
+* com limitador sem teto configurado (aprende a taxa no primeiro 429);
+* com limitador configurado abaixo da cota do servidor (a cota menos o
+  tamanho de um pedido: o balde deixa passar a taxa mais um pedido por janela).
+
+Para cada rodada mostra a vazão em caracteres/s (comparada à cota), os 429
+recebidos, os textos que falharam e as métricas da fila do limitador.
+
+Uso:
+    python bench_limitador.py --textos 6000 --cota 20000
+"""
+import argparse
+import random
+import time
+
+from cliente_tradutor import ClienteTradutor
+from limitador import LimitadorDeTaxa
+from lote import traduzir_em_lote
+from servidor_simulado import ServidorSimulado
+
+
+def gerar_registros(quantidade, rng):
+    for i in range(quantidade):
+        texto = "".join(rng.choice("abcdefghij ") for _ in range(rng.randint(20, 80)))
+        yield {"linha": i + 1, "texto": texto, "_texto": texto}
+
+
+def rodada(nome, args, limitador):
+    with ServidorSimulado(caracteres_por_janela=args.cota, janela=1.0, latencia=0.01) as servidor:
+        with ClienteTradutor(servidor.url, "chave", "regiao", tamanho_pool=args.concorrencia,
+                             limitador=limitador, backoff=0.2) as cliente:
+            inicio = time.perf_counter()
+            falhas = 0
+            for resultado in traduzir_em_lote(cliente, gerar_registros(args.textos, random.Random(args.seed)),
+                                              ["en"], "pt", args.concorrencia, max_elementos=args.por_pedido):
+                falhas += "erro" in resultado
+            segundos = time.perf_counter() - inicio
+        linha = (f"{nome:<24} {servidor.caracteres / segundos:8.0f} car/s ({servidor.caracteres / segundos / args.cota:4.0%} "
+                 f"da cota) | 429 {servidor.recusados_429:4d} | textos com erro {falhas:5d} | {segundos:5.1f} s")
+        if limitador is not None:
+            m = limitador.metricas()
+            linha += (f" | espera média {m['espera_media_s']:.2f} s, máx. {m['espera_maxima_s']:.2f} s, "
+                      f"maior fila {m['maior_fila']}, taxa final {m['caracteres_por_minuto'] or 0:,.0f} car/min")
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textos", type=int, default=6000)
+    parser.add_argument("--cota", type=int, default=20000, help="Caracteres por segundo aceitos pelo servidor.")
+    parser.add_argument("--por-pedido", type=int, default=50, help="Textos por pedido.")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rodada("sem limitador", args, None)
+    rodada("limitador aprendendo", args, LimitadorDeTaxa())
+    rodada("limitador configurado", args, LimitadorDeTaxa(caracteres_por_minuto=args.cota * 60 * 0.85, rajada_segundos=0.1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark do modo em lote: um pedido por texto (como o modo interativo faz)
+versus pacotes cheios enviados em paralelo, contra o servidor simulado com
+latência por pedido. Confere também que a saída sai na ordem da entrada.
+
+Uso:
+    python bench_lote.py --textos 20000 --latencia-ms 30 --concorrencia 8
+"""
+import argparse
+import random
+import time
+
+from cliente_tradutor import ClienteTradutor
+from lote import traduzir_em_lote
+from servidor_simulado import ServidorSimulado
+
+PALAVRAS = "salvar cancelar enviar arquivo configurações usuário senha erro aviso confirmar abrir fechar".split()
+
+
+def gerar_registros(quantidade, rng):
+    for i in range(quantidade):
+        texto = " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(1, 12)))
+        yield {"linha": i + 1, "texto": texto, "_texto": texto}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textos", type=int, default=20000)
+    parser.add_argument("--amostra-sequencial", type=int, default=300,
+                        help="Textos medidos no modo um-por-pedido (extrapolado para o total).")
+    parser.add_argument("--latencia-ms", type=float, default=30.0)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with ServidorSimulado(latencia=args.latencia_ms / 1000) as servidor:
+        with ClienteTradutor(servidor.url, "chave", "regiao", tamanho_pool=args.concorrencia) as cliente:
+            inicio = time.perf_counter()
+            for registro in gerar_registros(args.amostra_sequencial, random.Random(args.seed)):
+                cliente.traduzir([registro["_texto"]], ["en"])
+            por_texto = (time.perf_counter() - inicio) / args.amostra_sequencial
+            print(f"um pedido por texto:  {1 / por_texto:9.0f} textos/s ({3600 / por_texto:,.0f} por hora)")
+
+            inicio = time.perf_counter()
+            pedidos_antes = servidor.pedidos
+            esperado = 1
+            for resultado in traduzir_em_lote(cliente, gerar_registros(args.textos, random.Random(args.seed)),
+                                              ["en"], concorrencia=args.concorrencia):
+                assert resultado["linha"] == esperado, "saída fora da ordem da entrada"
+                assert resultado["traducoes"]["en"] == f"[en] {resultado['texto']}"
+                esperado += 1
+            segundos = time.perf_counter() - inicio
+            print(f"pacotes em paralelo:  {args.textos / segundos:9.0f} textos/s "
+                  f"({args.textos / segundos * 3600:,.0f} por hora) | {servidor.pedidos - pedidos_antes} pedidos "
+                  f"para {args.textos} textos | ordem conferida")
+
+
+if __name__ == "__main__":
+    main()
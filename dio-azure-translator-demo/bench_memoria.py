@@ -0,0 +1,108 @@
+"""
+Benchmark da memória de tradução no modo em lote: uma carga com frases de
+interface repetidas (distribuição de Zipf), traduzida sem memória, com a
+memória vazia e com a memória já aquecida. Mostra os pedidos, os caracteres
+enviados e o tempo de cada rodada, e confere a ordem e o conteúdo da saída.
+Confere também que um texto novo seguido de muitos acertos da memória não
+faz o lote ler a entrada inteira antes do primeiro resultado.
+
+Uso:
+    python bench_memoria.py --textos 50000 --frases 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from cliente_tradutor import ClienteTradutor
+from lote import MAX_ELEMENTOS, traduzir_em_lote
+from memoria_traducao import MemoriaTraducao
+from servidor_simulado import ServidorSimulado
+
+PALAVRAS = "salvar cancelar enviar arquivo configurações usuário senha erro aviso confirmar abrir fechar".split()
+
+
+def gerar_registros(quantidade, frases, rng):
+    vocabulario = [" ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(1, 10))) + f" #{i}" for i in range(frases)]
+    pesos = [1 / (i + 1) for i in range(frases)]
+    for i, frase in enumerate(rng.choices(vocabulario, weights=pesos, k=quantidade)):
+        # Variações triviais de espaço também devem acertar a memória
+        texto = f" {frase}" if i % 7 == 0 else frase
+        yield {"linha": i + 1, "texto": texto, "_texto": texto}
+
+
+def rodada(nome, servidor, cliente, registros, memoria, concorrencia):
+    pedidos, caracteres = servidor.pedidos, servidor.caracteres
+    inicio = time.perf_counter()
+    metricas = {}
+    for esperado, resultado in enumerate(traduzir_em_lote(cliente, registros, ["en", "es"], "pt", concorrencia,
+                                                          memoria=memoria, metricas=metricas), start=1):
+        assert resultado["linha"] == esperado, "saída fora da ordem da entrada"
+        assert resultado["traducoes"]["en"].split() == ["[en]"] + resultado["texto"].split(), resultado
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:<18} {segundos:6.2f} s | pedidos {servidor.pedidos - pedidos:5d} | "
+          f"caracteres enviados {servidor.caracteres - caracteres:10,d} | "
+          f"repetições aproveitadas {metricas['repeticoes_aproveitadas']}")
+
+
+def fila_limitada(cliente, memoria, acertos, concorrencia):
+    """Um texto novo e depois `acertos` textos já na memória: quantos registros são lidos até a 1ª saída."""
+    memoria.gravar([("frase conhecida", {"en": "[en] frase conhecida"}, None)], "pt")
+    lidos = 0
+
+    def registros():
+        nonlocal lidos
+        for i in range(acertos + 1):
+            lidos += 1
+            texto = "frase nova" if i == 0 else "frase conhecida"
+            yield {"linha": i + 1, "texto": texto, "_texto": texto}
+
+    lote = traduzir_em_lote(cliente, registros(), ["en"], "pt", concorrencia, memoria=memoria)
+    primeiro = next(lote)
+    lidos_ate_a_primeira = lidos
+    total = 1 + sum(1 for _ in lote)
+    assert primeiro["linha"] == 1 and total == acertos + 1
+    limite = 2 * concorrencia * MAX_ELEMENTOS + 512  # limite da fila mais um bloco de consulta
+    assert lidos_ate_a_primeira <= limite, f"{lidos_ate_a_primeira} registros lidos antes da primeira saída"
+    print(f"fila limitada: 1ª saída após {lidos_ate_a_primeira} de {acertos + 1} registros lidos (limite {limite})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textos", type=int, default=50000)
+    parser.add_argument("--frases", type=int, default=2000, help="Frases distintas na carga.")
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, ServidorSimulado(latencia=args.latencia_ms / 1000) as servidor:
+        memoria = MemoriaTraducao(os.path.join(tmp, "memoria.db"))
+        with ClienteTradutor(servidor.url, "chave", "regiao", tamanho_pool=args.concorrencia) as cliente:
+            def carga():
+                return gerar_registros(args.textos, args.frases, random.Random(args.seed))
+
+            rodada("sem memória", servidor, cliente, carga(), None, args.concorrencia)
+            rodada("memória vazia", servidor, cliente, carga(), memoria, args.concorrencia)
+            rodada("memória aquecida", servidor, cliente, carga(), memoria, args.concorrencia)
+            fila_limitada(cliente, memoria, 200_000, args.concorrencia)
+        est = memoria.estatisticas()
+        print(f"memória: {est['entradas']} entradas, {est['bytes']:,} bytes | acertos {est['acertos']} / "
+              f"falhas {est['falhas']} ({est['taxa_de_acerto']:.1%}) | caracteres economizados "
+              f"{est['caracteres_economizados']:,} | bytes economizados {est['bytes_economizados']:,}")
+        memoria.fechar()
+
+        # Despejo LRU: com limite de 100 entradas, as frases usadas por último ficam
+        pequena = MemoriaTraducao(os.path.join(tmp, "pequena.db"), max_entradas=100)
+        pequena.gravar([(f"frase {i}", {"en": f"sentence {i}"}, None) for i in range(300)], "pt")
+        pequena.gravar([(f"frase {i}", {"en": f"sentence {i}"}, None) for i in range(300, 310)], "pt")
+        achados = pequena.buscar([f"frase {i}" for i in range(310)], ["en"], "pt")
+        presentes = [i for i, a in enumerate(achados) if a is not None]
+        assert len(presentes) <= 100 and all(i in presentes for i in range(300, 310))
+        print(f"despejo LRU: {len(presentes)} entradas restantes (limite 100), mais recentes preservadas")
+        pequena.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark do modo de texto longo: o texto inteiro num só pedido (como o
+`traduzir_texto` fazia) versus segmentado em frases e traduzido em pacotes
+paralelos, contra o servidor simulado com latência por pedido e por mil
+caracteres. Confere também que a tradução recosturada mantém a ordem dos
+segmentos e os espaços e quebras de linha do original.
+
+Acima de 50 000 caracteres o pedido único é recusado pelo serviço; nesse
+caso a primeira linha mostra os segmentos enviados um pacote de cada vez.
+
+Uso:
+    python bench_texto_longo.py --caracteres 40000 --para en,es --concorrencia 8
+"""
+import argparse
+import random
+import time
+
+from cliente_tradutor import ClienteTradutor
+from lote import MAX_CARACTERES
+from servidor_simulado import ServidorSimulado
+from texto_longo import costurar, segmentar, traduzir_texto_longo
+
+PALAVRAS = ("o contrato foi assinado pelas partes no dia seguinte e o prazo de entrega "
+            "ficou para o fim do mês com multa diária em caso de atraso").split()
+
+
+def gerar_texto(caracteres, rng):
+    """Parágrafos de frases aleatórias, separados por linhas em branco, até o tamanho pedido."""
+    paragrafos, tamanho = [], 0
+    while tamanho < caracteres:
+        frases = []
+        for _ in range(rng.randint(2, 8)):
+            frase = " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(6, 30)))
+            frases.append(frase.capitalize() + rng.choice([".", ".", "!", "?"]))
+        paragrafos.append(" ".join(frases))
+        tamanho += len(paragrafos[-1]) + 2
+    return "\n\n".join(paragrafos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caracteres", type=int, default=40000)
+    parser.add_argument("--para", default="en", help="Idioma(s) de destino separados por vírgula.")
+    parser.add_argument("--latencia-ms", type=float, default=30.0, help="Latência fixa de cada pedido.")
+    parser.add_argument("--latencia-por-mil-ms", type=float, default=5.0,
+                        help="Latência extra por mil caracteres (vezes o número de idiomas).")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--segmento", type=int, default=1000, help="Tamanho máximo de cada segmento.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    destinos = [lang.strip() for lang in args.para.split(",")]
+    texto = gerar_texto(args.caracteres, random.Random(args.seed))
+    prefixo, segmentos = segmentar(texto, args.segmento)
+    assert costurar(prefixo, segmentos, [s for s, _ in segmentos]) == texto, "segmentação perdeu texto"
+
+    with ServidorSimulado(latencia=args.latencia_ms / 1000,
+                          latencia_por_mil_caracteres=args.latencia_por_mil_ms / 1000) as servidor:
+        with ClienteTradutor(servidor.url, "chave", "regiao", tamanho_pool=args.concorrencia) as cliente:
+            inicio = time.perf_counter()
+            if len(texto) <= MAX_CARACTERES:
+                cliente.traduzir([texto], destinos)
+                rotulo = "um pedido único:"
+            else:
+                traduzir_texto_longo(cliente, texto, destinos, concorrencia=1, max_caracteres_segmento=args.segmento)
+                rotulo = "pacotes em série:"
+            sequencial = time.perf_counter() - inicio
+            print(f"{rotulo:<22} {sequencial:7.3f} s para {len(texto)} caracteres")
+
+            inicio = time.perf_counter()
+            pedidos_antes = servidor.pedidos
+            resultado = traduzir_texto_longo(cliente, texto, destinos, concorrencia=args.concorrencia,
+                                             max_caracteres_segmento=args.segmento)
+            paralelo = time.perf_counter() - inicio
+            for destino in destinos:
+                esperado = costurar(prefixo, segmentos, [f"[{destino}] {s}" for s, _ in segmentos])
+                assert resultado["traducoes"][destino] == esperado, f"tradução recosturada divergente ({destino})"
+            print(f"{'segmentos em paralelo:':<22} {paralelo:7.3f} s | {resultado['segmentos']} segmentos em "
+                  f"{servidor.pedidos - pedidos_antes} pedidos | {sequencial / paralelo:.1f}x | "
+                  f"ordem e espaços conferidos")
+
+
+if __name__ == "__main__":
+    main()
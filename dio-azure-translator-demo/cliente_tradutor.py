@@ -0,0 +1,245 @@
+"""
+Cliente HTTP reutilizável para a API de Tradução de Texto (v3).
+
+Em vez de abrir uma conexão TCP+TLS nova a cada chamada (`requests.post`
+avulso), o cliente mantém uma `requests.Session` com pool de conexões
+keep-alive, configurada uma única vez. Toda chamada tem timeout (conexão e
+leitura) e é repetida com backoff exponencial em 429/5xx e em falhas de
+rede, respeitando o cabeçalho `Retry-After` quando o serviço o envia.
+
+`ClienteTradutorAsync` é a variante assíncrona, sobre `httpx.AsyncClient`
+(dependência opcional), para disparar muitas chamadas concorrentes num
+único laço de eventos.
+
+Com um `limitador` (LimitadorDeTaxa), cada tentativa espera a sua vez na
+fila de caracteres/pedidos antes de sair. Um 429 reduz a taxa do limitador e
+o pedido volta para a fila depois do `Retry-After`, sem consumir as
+tentativas: o trabalho atrasa, mas não falha por limite.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_VERSION = "3.0"
+
+# Respostas que valem nova tentativa: limite de taxa e falhas transitórias do serviço
+STATUS_RETENTAVEIS = {408, 429, 500, 502, 503, 504}
+
+TIMEOUT_CONEXAO = 3.05
+TIMEOUT_LEITURA = 30.0
+MAX_TENTATIVAS = 4
+BACKOFF_INICIAL = 0.5
+BACKOFF_MAXIMO = 30.0
+TAMANHO_POOL = 10
+# Com limitador, um 429 não gasta tentativas; este teto só evita laço infinito
+MAX_RECUSAS_NA_FILA = 50
+
+
+def segundos_do_retry_after(retry_after):
+    """Converte o cabeçalho `Retry-After` (segundos ou data HTTP) em segundos; None se ausente ou inválido."""
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def espera_para_nova_tentativa(retry_after, tentativa, backoff=BACKOFF_INICIAL, backoff_max=BACKOFF_MAXIMO):
+    """
+    Segundos a esperar antes da tentativa seguinte. Usa o `Retry-After` do
+    serviço quando presente; senão, backoff exponencial com jitter para as
+    instâncias não voltarem todas juntas.
+    """
+    segundos = segundos_do_retry_after(retry_after)
+    if segundos is not None:
+        return segundos
+    return min(backoff_max, backoff * 2 ** tentativa) * random.uniform(0.5, 1.0)
+
+
+def opcoes_do_ambiente():
+    """Timeouts e política de novas tentativas a partir de variáveis de ambiente (opcionais)."""
+    return {
+        "timeout": (float(os.getenv("TRADUTOR_TIMEOUT_CONEXAO", TIMEOUT_CONEXAO)),
+                    float(os.getenv("TRADUTOR_TIMEOUT_LEITURA", TIMEOUT_LEITURA))),
+        "max_tentativas": int(os.getenv("TRADUTOR_MAX_TENTATIVAS", MAX_TENTATIVAS)),
+        "tamanho_pool": int(os.getenv("TRADUTOR_TAMANHO_POOL", TAMANHO_POOL)),
+    }
+
+
+class _BaseTradutor:
+    def __init__(self, endpoint, chave, regiao, timeout=(TIMEOUT_CONEXAO, TIMEOUT_LEITURA),
+                 max_tentativas=MAX_TENTATIVAS, backoff=BACKOFF_INICIAL, backoff_max=BACKOFF_MAXIMO,
+                 tamanho_pool=TAMANHO_POOL, limitador=None):
+        self.url = endpoint.rstrip("/") + "/translate"
+        self.cabecalhos = {
+            "Ocp-Apim-Subscription-Key": chave,
+            "Ocp-Apim-Subscription-Region": regiao,
+            "Content-type": "application/json",
+        }
+        self.timeout = timeout
+        self.max_tentativas = max_tentativas
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.tamanho_pool = tamanho_pool
+        self.limitador = limitador
+        # Métricas de operação
+        self.chamadas = 0
+        self.novas_tentativas = 0
+
+    @staticmethod
+    def _pedido(textos, idiomas_de_destino, idioma_de_origem):
+        params = {"api-version": API_VERSION, "to": list(idiomas_de_destino)}
+        if idioma_de_origem:
+            params["from"] = idioma_de_origem
+        return params, [{"text": texto} for texto in textos]
+
+    def _espera(self, retry_after, tentativa):
+        self.novas_tentativas += 1
+        return espera_para_nova_tentativa(retry_after, tentativa, self.backoff, self.backoff_max)
+
+    def _voltar_para_a_fila(self, resposta, recusas):
+        """
+        429 com limitador: informa o limitador e retorna os segundos a esperar
+        antes de voltar para a fila (sem gastar tentativa); None nos outros casos.
+        """
+        if resposta.status_code != 429 or self.limitador is None or recusas >= MAX_RECUSAS_NA_FILA:
+            return None
+        self.novas_tentativas += 1
+        self.limitador.registrar_429()
+        return espera_para_nova_tentativa(resposta.headers.get("Retry-After"), min(recusas, 6),
+                                          self.backoff, self.backoff_max)
+
+    def _sucesso(self, caracteres):
+        if self.limitador is not None:
+            self.limitador.registrar_sucesso(caracteres)
+
+
+class ClienteTradutor(_BaseTradutor):
+    """
+    Cliente síncrono com pool de conexões. É seguro partilhar uma instância
+    entre threads: a Session reaproveita até `tamanho_pool` conexões.
+    """
+
+    def __init__(self, endpoint, chave, regiao, **opcoes):
+        super().__init__(endpoint, chave, regiao, **opcoes)
+        self.sessao = requests.Session()
+        self.sessao.headers.update(self.cabecalhos)
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.tamanho_pool)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+
+    def traduzir(self, textos, idiomas_de_destino, idioma_de_origem=None):
+        """
+        Traduz uma lista de textos numa única chamada e devolve o JSON da
+        resposta (um item por texto). Levanta `requests.HTTPError` se o
+        serviço continuar a recusar depois de todas as tentativas.
+        """
+        params, corpo = self._pedido(textos, idiomas_de_destino, idioma_de_origem)
+        caracteres = sum(len(texto) for texto in textos) * len(params["to"])
+        tentativa = recusas = 0
+        while True:
+            if self.limitador is not None:
+                self.limitador.adquirir(caracteres)
+            self.chamadas += 1
+            try:
+                resposta = self.sessao.post(self.url, params=params, json=corpo, timeout=self.timeout,
+                                            headers={"X-ClientTraceId": str(uuid.uuid4())})
+            except (requests.ConnectionError, requests.Timeout):
+                if tentativa == self.max_tentativas:
+                    raise
+                time.sleep(self._espera(None, tentativa))
+                tentativa += 1
+                continue
+            espera = self._voltar_para_a_fila(resposta, recusas)
+            if espera is not None:
+                time.sleep(espera)
+                recusas += 1
+                continue
+            if resposta.status_code in STATUS_RETENTAVEIS and tentativa < self.max_tentativas:
+                time.sleep(self._espera(resposta.headers.get("Retry-After"), tentativa))
+                tentativa += 1
+                continue
+            resposta.raise_for_status()
+            self._sucesso(caracteres)
+            return resposta.json()
+
+    def fechar(self):
+        self.sessao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class ClienteTradutorAsync(_BaseTradutor):
+    """
+    Variante assíncrona sobre `httpx.AsyncClient` (pip install httpx). Deve
+    ser criada e usada dentro do mesmo laço de eventos.
+    """
+
+    def __init__(self, endpoint, chave, regiao, **opcoes):
+        super().__init__(endpoint, chave, regiao, **opcoes)
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("ClienteTradutorAsync requer o pacote 'httpx' (pip install httpx).") from e
+        self._httpx = httpx
+        conexao, leitura = self.timeout
+        self.cliente = httpx.AsyncClient(
+            headers=self.cabecalhos,
+            timeout=httpx.Timeout(leitura, connect=conexao),
+            limits=httpx.Limits(max_connections=self.tamanho_pool, max_keepalive_connections=self.tamanho_pool),
+        )
+
+    async def traduzir(self, textos, idiomas_de_destino, idioma_de_origem=None):
+        """Igual a `ClienteTradutor.traduzir`; levanta `httpx.HTTPStatusError` no fim das tentativas."""
+        params, corpo = self._pedido(textos, idiomas_de_destino, idioma_de_origem)
+        caracteres = sum(len(texto) for texto in textos) * len(params["to"])
+        tentativa = recusas = 0
+        while True:
+            if self.limitador is not None:
+                # O limitador bloqueia a thread; fora do laço de eventos para não travá-lo
+                await asyncio.to_thread(self.limitador.adquirir, caracteres)
+            self.chamadas += 1
+            try:
+                resposta = await self.cliente.post(self.url, params=params, json=corpo,
+                                                   headers={"X-ClientTraceId": str(uuid.uuid4())})
+            except (self._httpx.TransportError, self._httpx.TimeoutException):
+                if tentativa == self.max_tentativas:
+                    raise
+                await asyncio.sleep(self._espera(None, tentativa))
+                tentativa += 1
+                continue
+            espera = self._voltar_para_a_fila(resposta, recusas)
+            if espera is not None:
+                await asyncio.sleep(espera)
+                recusas += 1
+                continue
+            if resposta.status_code in STATUS_RETENTAVEIS and tentativa < self.max_tentativas:
+                await asyncio.sleep(self._espera(resposta.headers.get("Retry-After"), tentativa))
+                tentativa += 1
+                continue
+            resposta.raise_for_status()
+            self._sucesso(caracteres)
+            return resposta.json()
+
+    async def fechar(self):
+        await self.cliente.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
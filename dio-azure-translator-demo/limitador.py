@@ -0,0 +1,205 @@
+"""
+Limitador de taxa do lado do cliente para as chamadas ao Tradutor.
+
+O serviço limita por caracteres por minuto (e por pedidos). Em vez de
+disparar e levar 429, cada chamada pede fichas a dois baldes — um de
+caracteres, outro de pedidos — e espera na fila até haver saldo. A fila é
+FIFO: um pedido grande não é ultrapassado para sempre pelos pequenos.
+
+A taxa se adapta ao que o serviço aceita (AIMD): cada 429 corta a taxa e
+esvazia os baldes, e o pedido recusado espera o `Retry-After` antes de voltar
+para o fim da fila; cada sucesso devolve um pouco da taxa, até o teto
+configurado. A fila não para inteira por um 429: só fica mais lenta.
+
+Sem teto configurado, o primeiro 429 fixa a taxa a partir do que o serviço
+aceitou no último minuto, e daí em diante a taxa sobe aos poucos a cada
+sucesso e recua a cada 429: o limitador descobre o limite real do plano
+contratado.
+
+Este módulo existe, idêntico, em `dio-azure-translator-demo/` e em
+`azure-document-translator/` (cada projeto é autocontido).
+"""
+import threading
+import time
+from collections import deque
+
+JANELA_DE_OBSERVACAO = 60.0  # segundos de consumo usados para estimar a taxa real
+RAJADA_SEGUNDOS = 10.0       # capacidade dos baldes, em segundos de taxa
+FATOR_DE_CORTE = 0.7
+RECUPERACAO_POR_SUCESSO = 0.05  # fração do teto devolvida a cada sucesso
+TAXA_MINIMA = 0.05              # fração do teto abaixo da qual a taxa não desce
+INTERVALO_ENTRE_CORTES = 1.0    # 429 de pedidos que já estavam em voo não cortam de novo
+
+
+class _Balde:
+    """Balde de fichas com reabastecimento contínuo; `taxa` None = ilimitado."""
+
+    def __init__(self, taxa, rajada_segundos):
+        self.configurado = taxa is not None
+        self.teto = taxa
+        self.taxa = taxa
+        self.rajada_segundos = rajada_segundos
+        self.saldo = self.capacidade()
+        self._observado = deque()  # (instante, quantidade) dentro da janela de observação
+        self._total_observado = 0.0
+
+    def capacidade(self):
+        return None if self.taxa is None else max(1.0, self.taxa * self.rajada_segundos)
+
+    def reabastecer(self, decorrido):
+        if self.taxa is not None:
+            self.saldo = min(self.capacidade(), self.saldo + decorrido * self.taxa)
+
+    def espera(self, quantidade):
+        """Segundos até o saldo cobrir `quantidade` (limitada à capacidade: pedidos maiores ficam em débito)."""
+        if self.taxa is None:
+            return 0.0
+        necessario = min(quantidade, self.capacidade())
+        return 0.0 if self.saldo >= necessario else (necessario - self.saldo) / self.taxa
+
+    def consumir(self, quantidade):
+        if self.taxa is not None:
+            self.saldo -= quantidade
+
+    def observar(self, quantidade, agora):
+        """Registra consumo aceito pelo serviço (base para aprender a taxa)."""
+        self._observado.append((agora, quantidade))
+        self._total_observado += quantidade
+        self._descartar_antigos(agora)
+
+    def _descartar_antigos(self, agora):
+        while self._observado and agora - self._observado[0][0] > JANELA_DE_OBSERVACAO:
+            self._total_observado -= self._observado.popleft()[1]
+
+    def cortar(self, agora):
+        self._descartar_antigos(agora)
+        if self.taxa is None:
+            # Primeiro 429 sem teto: parte do que o serviço aceitou no último minuto
+            inicio = self._observado[0][0] if self._observado else agora
+            observada = self._total_observado / max(1.0, agora - inicio)
+            if observada <= 0:
+                return
+            self.teto = observada
+            self.taxa = observada
+        elif not self.configurado:
+            # Taxa aprendida: o 429 marca o novo teto de referência
+            self.teto = self.taxa
+        self.taxa = max(self.teto * TAXA_MINIMA, self.taxa * FATOR_DE_CORTE)
+        self.saldo = 0.0 if self.saldo is None else min(self.saldo, 0.0)
+
+    def recuperar(self):
+        if self.taxa is None:
+            return
+        self.taxa += self.teto * RECUPERACAO_POR_SUCESSO
+        if self.configurado:
+            self.taxa = min(self.teto, self.taxa)
+
+
+class LimitadorDeTaxa:
+    """
+    Escalonador por balde de fichas, medido em caracteres e em pedidos.
+
+    Uso:
+        limitador = LimitadorDeTaxa(caracteres_por_minuto=2_000_000 / 60, pedidos_por_segundo=10)
+        limitador.adquirir(caracteres=len(texto) * len(destinos))
+        ... chamada ...
+        limitador.registrar_sucesso(caracteres=...)  # ou registrar_429()
+
+    É seguro partilhar uma instância entre threads.
+    """
+
+    def __init__(self, caracteres_por_minuto=None, pedidos_por_segundo=None, rajada_segundos=RAJADA_SEGUNDOS):
+        taxa_caracteres = caracteres_por_minuto / 60 if caracteres_por_minuto else None
+        self._caracteres = _Balde(taxa_caracteres, rajada_segundos)
+        self._pedidos = _Balde(pedidos_por_segundo or None, rajada_segundos)
+        self._cond = threading.Condition()
+        self._ultimo = time.monotonic()
+        self._proximo_bilhete = 0
+        self._atendendo = 0
+        self._abandonados = set()
+        self._ultimo_corte = float("-inf")
+        # Métricas
+        self.na_fila = 0
+        self.maior_fila = 0
+        self.atendidos = 0
+        self.respostas_429 = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def _reabastecer(self, agora):
+        decorrido = agora - self._ultimo
+        self._ultimo = agora
+        self._caracteres.reabastecer(decorrido)
+        self._pedidos.reabastecer(decorrido)
+
+    def adquirir(self, caracteres=0, pedidos=1):
+        """Bloqueia, em ordem de chegada, até haver saldo; retorna os segundos esperados."""
+        inicio = time.monotonic()
+        with self._cond:
+            bilhete = self._proximo_bilhete
+            self._proximo_bilhete += 1
+            self.na_fila += 1
+            self.maior_fila = max(self.maior_fila, self.na_fila)
+            try:
+                while True:
+                    if bilhete != self._atendendo:
+                        self._cond.wait()
+                        continue
+                    agora = time.monotonic()
+                    self._reabastecer(agora)
+                    falta = max(self._caracteres.espera(caracteres), self._pedidos.espera(pedidos))
+                    if falta <= 0:
+                        self._caracteres.consumir(caracteres)
+                        self._pedidos.consumir(pedidos)
+                        break
+                    self._cond.wait(falta)
+            finally:
+                if bilhete == self._atendendo:
+                    self._atendendo += 1
+                    while self._atendendo in self._abandonados:
+                        self._abandonados.remove(self._atendendo)
+                        self._atendendo += 1
+                else:
+                    # Interrompido antes da sua vez: a fila não pode ficar à espera deste bilhete
+                    self._abandonados.add(bilhete)
+                self.na_fila -= 1
+                self._cond.notify_all()
+            esperado = time.monotonic() - inicio
+            self.atendidos += 1
+            self.espera_total += esperado
+            self.espera_maxima = max(self.espera_maxima, esperado)
+        return esperado
+
+    def registrar_429(self):
+        """O serviço recusou por limite: corta a taxa e esvazia os baldes."""
+        with self._cond:
+            agora = time.monotonic()
+            self.respostas_429 += 1
+            if agora - self._ultimo_corte >= INTERVALO_ENTRE_CORTES:
+                self._reabastecer(agora)
+                self._caracteres.cortar(agora)
+                self._pedidos.cortar(agora)
+                self._ultimo_corte = agora
+            self._cond.notify_all()
+
+    def registrar_sucesso(self, caracteres=0, pedidos=1):
+        with self._cond:
+            agora = time.monotonic()
+            self._caracteres.observar(caracteres, agora)
+            self._pedidos.observar(pedidos, agora)
+            self._caracteres.recuperar()
+            self._pedidos.recuperar()
+
+    def metricas(self):
+        with self._cond:
+            taxa_caracteres = self._caracteres.taxa
+            return {
+                "na_fila": self.na_fila,
+                "maior_fila": self.maior_fila,
+                "atendidos": self.atendidos,
+                "respostas_429": self.respostas_429,
+                "espera_media_s": self.espera_total / self.atendidos if self.atendidos else 0.0,
+                "espera_maxima_s": self.espera_maxima,
+                "caracteres_por_minuto": taxa_caracteres * 60 if taxa_caracteres is not None else None,
+                "pedidos_por_segundo": self._pedidos.taxa,
+            }
@@ -0,0 +1,189 @@
+"""
+Tradução em lote: empacotamento de pedidos e envio concorrente.
+
+A API v3 aceita até 1000 elementos e 50 000 caracteres por pedido. Em vez de
+um pedido por texto, os registros são agrupados gulosamente em pacotes tão
+cheios quanto os limites permitem, vários pacotes seguem em paralelo, e os
+resultados saem na mesma ordem da entrada. A entrada é consumida em fluxo:
+só os pacotes em voo ficam em memória. Com uma memória de tradução, só os
+textos que ela não conhece chegam a ser empacotados.
+"""
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from memoria_traducao import normalizar, recompor
+
+MAX_ELEMENTOS = 1000
+MAX_CARACTERES = 50000
+
+
+def ler_registros(arquivo, jsonl=False, campo="text"):
+    """
+    Gera registros (dict) de um arquivo de texto aberto: uma linha por texto,
+    ou, com `jsonl`, um objeto JSON por linha com o texto em `campo`. O texto
+    a traduzir fica também na chave interna `_texto`.
+    """
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.rstrip("\r\n")
+        if jsonl:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            registro["_texto"] = str(registro.get(campo, ""))
+            yield registro
+        else:
+            yield {"linha": numero, "texto": linha, "_texto": linha}
+
+
+class _Pacote:
+    """Um pedido em montagem: textos únicos a traduzir e, depois de enviado, o seu futuro."""
+
+    def __init__(self):
+        self.textos = []
+        self.caracteres = 0
+        self.futuro = None
+        self.na_fila = 0  # registros na fila de saída que esperam por este pacote
+
+    def cabe(self, texto, max_elementos, max_caracteres):
+        # Um texto que sozinho passa do limite vai num pacote próprio (e o serviço o recusará)
+        return not self.textos or (len(self.textos) < max_elementos
+                                   and self.caracteres + len(texto) <= max_caracteres)
+
+    def adicionar(self, texto):
+        self.textos.append(texto)
+        self.caracteres += len(texto)
+        return len(self.textos) - 1
+
+
+def _traduzir_pacote(cliente, memoria, textos, idiomas_de_destino, idioma_de_origem):
+    """Traduz os textos de um pacote; retorna, por texto, os campos a juntar ao registro."""
+    try:
+        resposta = cliente.traduzir(textos, idiomas_de_destino, idioma_de_origem)
+    except Exception as e:
+        erro = getattr(getattr(e, "response", None), "status_code", None)
+        return [{"erro": f"HTTP {erro}" if erro else str(e)}] * len(textos)
+    partes, gravar = [], []
+    for texto, item in zip(textos, resposta):
+        parte = {"traducoes": {t["to"]: t["text"] for t in item["translations"]}}
+        if "detectedLanguage" in item:
+            parte["idioma_detectado"] = item["detectedLanguage"]["language"]
+        partes.append(parte)
+        gravar.append((texto, parte["traducoes"], parte.get("idioma_detectado")))
+    if memoria is not None:
+        memoria.gravar(gravar, idioma_de_origem)
+    return partes
+
+
+def _blocos(registros, tamanho=512):
+    bloco = []
+    for registro in registros:
+        bloco.append(registro)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def traduzir_em_lote(cliente, registros, idiomas_de_destino, idioma_de_origem=None, concorrencia=4,
+                     memoria=None, max_elementos=MAX_ELEMENTOS, max_caracteres=MAX_CARACTERES, metricas=None):
+    """
+    Traduz um fluxo de registros e gera os resultados na ordem da entrada.
+
+    Com uma `memoria` (MemoriaTraducao), os registros são consultados nela em
+    blocos antes do empacotamento e só as falhas vão à API. Textos repetidos
+    que ainda aguardam resposta não são enviados de novo: reaproveitam a
+    tradução do pedido já em voo.
+
+    Os registros sem tradução são agrupados gulosamente em pacotes tão cheios
+    quanto os limites permitem, com no máximo 2 x `concorrencia` pacotes em
+    voo. Um pacote ainda aberto é enviado incompleto se os registros à sua
+    espera passarem de 2 x `concorrencia` x `max_elementos`. Um pacote que
+    falha depois das novas tentativas do cliente não interrompe o lote: os
+    seus registros saem com o campo `erro`. Se `metricas` (dict) for
+    passado, recebe as contagens de pedidos, textos enviados e repetições
+    aproveitadas.
+    """
+    metricas = metricas if metricas is not None else {}
+    metricas.update(pacotes=0, textos_enviados=0, repeticoes_aproveitadas=0)
+    fila = deque()      # (registro, parte pronta | None, pacote, índice no pacote)
+    em_andamento = {}   # texto enviado → (pacote, índice), enquanto o pacote não sai da fila
+    enviados = 0        # pacotes submetidos cujos registros ainda estão na fila
+    aberto = _Pacote()
+    limite_fila = 2 * concorrencia * max_elementos
+
+    def _resultado(registro, parte, pacote, indice):
+        if parte is None:
+            parte = pacote.futuro.result()[indice]
+            if memoria is not None and "traducoes" in parte:
+                parte = dict(parte, traducoes={d: recompor(registro["_texto"], t) for d, t in parte["traducoes"].items()})
+        return dict(registro, **parte)
+
+    def _saida_da_fila():
+        nonlocal enviados
+        registro, parte, pacote, indice = fila.popleft()
+        if pacote is not None:
+            pacote.na_fila -= 1
+            if pacote.na_fila == 0:
+                enviados -= 1
+                for texto in pacote.textos:
+                    del em_andamento[texto]
+        return _resultado(registro, parte, pacote, indice)
+
+    with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="lote") as pool:
+        def _enviar(pacote):
+            nonlocal enviados
+            pacote.futuro = pool.submit(_traduzir_pacote, cliente, memoria, pacote.textos,
+                                        idiomas_de_destino, idioma_de_origem)
+            enviados += 1
+            metricas["pacotes"] += 1
+            metricas["textos_enviados"] += len(pacote.textos)
+
+        for bloco in _blocos(registros):
+            achados = (memoria.buscar([r["_texto"] for r in bloco], idiomas_de_destino, idioma_de_origem)
+                       if memoria is not None else [None] * len(bloco))
+            for registro, achado in zip(bloco, achados):
+                if achado is not None:
+                    traducoes, idioma_detectado = achado
+                    parte = {"traducoes": traducoes}
+                    if idioma_detectado and not idioma_de_origem:
+                        parte["idioma_detectado"] = idioma_detectado
+                    fila.append((registro, parte, None, 0))
+                    continue
+                texto = normalizar(registro["_texto"]) if memoria is not None else registro["_texto"]
+                if texto in em_andamento:
+                    metricas["repeticoes_aproveitadas"] += 1
+                    pacote, indice = em_andamento[texto]
+                    pacote.na_fila += 1
+                    fila.append((registro, None, pacote, indice))
+                    continue
+                if not aberto.cabe(texto, max_elementos, max_caracteres):
+                    _enviar(aberto)
+                    aberto = _Pacote()
+                indice = aberto.adicionar(texto)
+                aberto.na_fila += 1
+                em_andamento[texto] = (aberto, indice)
+                fila.append((registro, None, aberto, indice))
+
+            # A cabeça da fila pode estar no pacote ainda aberto, atrás de muitos acertos da memória: se a
+            # fila passou do limite, o pacote segue incompleto para que a saída (e a memória) não cresça sem fim
+            if fila and fila[0][2] is aberto and len(fila) > limite_fila:
+                _enviar(aberto)
+                aberto = _Pacote()
+
+            # Escoa o que já está pronto; com pedidos ou registros demais à espera, bloqueia no mais antigo
+            while fila and (fila[0][2] is None or (fila[0][2].futuro is not None and (
+                    fila[0][2].futuro.done() or enviados >= 2 * concorrencia or len(fila) > limite_fila))):
+                yield _saida_da_fila()
+
+        if aberto.textos:
+            _enviar(aberto)
+        while fila:
+            yield _saida_da_fila()
+
+
+def escrever_resultado(saida, resultado):
+    """Grava um resultado como uma linha JSONL (sem a chave interna `_texto`)."""
+    registro = {chave: valor for chave, valor in resultado.items() if chave != "_texto"}
+    saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
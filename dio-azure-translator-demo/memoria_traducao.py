@@ -0,0 +1,213 @@
+"""
+Memória de tradução persistente (SQLite) para o tradutor.
+
+Cada tradução fica guardada sob a chave (texto normalizado, idioma de
+origem, idioma de destino, versão da API). Quando a origem é detectada pelo
+serviço, a entrada é gravada duas vezes: sob "auto" e sob o idioma detectado,
+para servir pedidos das duas formas. A normalização (Unicode NFC e sem
+espaços nas pontas) junta variações triviais do mesmo texto.
+
+A memória tem dois limites, um de entradas e outro de bytes. Quando um deles
+estoura, saem as entradas usadas há mais tempo (LRU). As frases mais
+consultadas também ficam num LRU em processo, à frente do SQLite, e os
+registros de acesso vão para o disco em lotes. Os contadores de acertos,
+falhas, caracteres e bytes economizados mostram quanto deixou de ir à API.
+"""
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from cliente_tradutor import API_VERSION
+
+MAX_ENTRADAS = 200_000
+MAX_BYTES = 256 * 1024 * 1024
+MAX_QUENTES = 50_000        # entradas mantidas em memória à frente do SQLite
+LOTE_DE_ACESSOS = 5_000     # acessos acumulados antes de atualizar o LRU em disco
+ORIGEM_AUTOMATICA = "auto"
+
+
+def normalizar(texto):
+    return unicodedata.normalize("NFC", texto).strip()
+
+
+class MemoriaTraducao:
+    def __init__(self, caminho="memoria_traducao.db", max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES,
+                 api_version=API_VERSION, max_quentes=MAX_QUENTES):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.api_version = api_version
+        self.max_quentes = min(max_quentes, max_entradas)
+        self._quentes = OrderedDict()  # (texto, origem, destino) → (chave, tradução, idioma detectado, tamanho)
+        self._tocadas = set()          # chaves acessadas ainda não registradas em disco
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS memoria (chave BLOB PRIMARY KEY, traducao TEXT NOT NULL, "
+                           "idioma_detectado TEXT, tamanho INTEGER NOT NULL, acesso INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memoria_acesso ON memoria (acesso)")
+        entradas, tamanho, relogio = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(MAX(acesso), 0) FROM memoria").fetchone()
+        # Contagem aproximada (regravações contam de novo); recalculada antes de despejar
+        self._entradas, self._bytes, self._relogio = entradas, tamanho, relogio
+
+        self.acertos = 0
+        self.falhas = 0
+        self.caracteres_economizados = 0
+        self.bytes_economizados = 0
+        self.despejos = 0
+
+    def _chave(self, texto, origem, destino):
+        bruta = "\0".join((self.api_version, origem or ORIGEM_AUTOMATICA, destino, texto))
+        return hashlib.blake2b(bruta.encode("utf-8"), digest_size=16).digest()
+
+    def buscar(self, textos, idiomas_de_destino, idioma_de_origem=None):
+        """
+        Procura vários textos de uma vez. Para cada texto retorna
+        ({destino: tradução}, idioma_detectado) se todos os destinos estão na
+        memória, ou None se algum falta (o texto inteiro vai à API).
+        """
+        origem = idioma_de_origem or ORIGEM_AUTOMATICA
+        normalizados = [normalizar(t) for t in textos]
+        with self._lock:
+            achados, faltam = {}, {}
+            for normalizado in set(normalizados):
+                for destino in idiomas_de_destino:
+                    entrada = (normalizado, origem, destino)
+                    valor = self._quentes.get(entrada)
+                    if valor is not None:
+                        self._quentes.move_to_end(entrada)
+                        achados[entrada] = valor
+                    else:
+                        faltam[self._chave(normalizado, origem, destino)] = entrada
+
+            lista = list(faltam)
+            for i in range(0, len(lista), 500):
+                parte = lista[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                for linha in self._conn.execute(
+                        f"SELECT chave, traducao, idioma_detectado, tamanho FROM memoria WHERE chave IN ({marcadores})",
+                        parte):
+                    entrada = faltam[linha[0]]
+                    achados[entrada] = linha
+                    self._aquecer(entrada, linha)
+
+            resultados = []
+            for texto, normalizado in zip(textos, normalizados):
+                valores = [achados.get((normalizado, origem, d)) for d in idiomas_de_destino]
+                if not all(valores):
+                    self.falhas += 1
+                    resultados.append(None)
+                    continue
+                self.acertos += 1
+                self.caracteres_economizados += len(normalizado) * len(idiomas_de_destino)
+                self.bytes_economizados += sum(v[3] for v in valores)
+                self._tocadas.update(v[0] for v in valores)
+                traducoes = {d: recompor(texto, v[1]) for d, v in zip(idiomas_de_destino, valores)}
+                resultados.append((traducoes, valores[0][2]))
+
+            if len(self._tocadas) >= LOTE_DE_ACESSOS:
+                self._registrar_acessos()
+                self._conn.commit()
+        return resultados
+
+    def _aquecer(self, entrada, valor):
+        self._quentes[entrada] = valor
+        self._quentes.move_to_end(entrada)
+        while len(self._quentes) > self.max_quentes:
+            self._quentes.popitem(last=False)
+
+    def _registrar_acessos(self):
+        """Marca no disco as entradas acessadas desde o último registro (ordem do LRU)."""
+        if self._tocadas:
+            self._relogio += 1
+            self._conn.executemany("UPDATE memoria SET acesso = ? WHERE chave = ?",
+                                   [(self._relogio, c) for c in self._tocadas])
+            self._tocadas.clear()
+
+    def gravar(self, itens, idioma_de_origem=None):
+        """
+        Grava traduções vindas da API. `itens` é uma lista de
+        (texto, {destino: tradução}, idioma_detectado ou None).
+        """
+        linhas = []
+        for texto, traducoes, idioma_detectado in itens:
+            normalizado = normalizar(texto)
+            origens = [idioma_de_origem] if idioma_de_origem else [ORIGEM_AUTOMATICA, idioma_detectado]
+            for origem in filter(None, origens):
+                for destino, traducao in traducoes.items():
+                    traducao = traducao.strip()
+                    tamanho = len(normalizado.encode("utf-8")) + len(traducao.encode("utf-8"))
+                    chave = self._chave(normalizado, origem, destino)
+                    linhas.append(((normalizado, origem, destino), (chave, traducao, idioma_detectado, tamanho)))
+        if not linhas:
+            return
+        with self._lock:
+            for entrada, valor in linhas:
+                self._aquecer(entrada, valor)
+            linhas = [valor for _, valor in linhas]
+            self._relogio += 1
+            self._conn.executemany("INSERT OR REPLACE INTO memoria VALUES (?, ?, ?, ?, ?)",
+                                   [linha + (self._relogio,) for linha in linhas])
+            self._entradas += len(linhas)
+            self._bytes += sum(linha[3] for linha in linhas)
+            if self._entradas > self.max_entradas or self._bytes > self.max_bytes:
+                self._despejar()
+            self._conn.commit()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até ficar 10% abaixo dos dois limites."""
+        self._registrar_acessos()
+        self._entradas, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM memoria").fetchone()
+        alvo_entradas, alvo_bytes = int(self.max_entradas * 0.9), int(self.max_bytes * 0.9)
+        if self._entradas <= self.max_entradas and self._bytes <= self.max_bytes:
+            return
+        removidas, liberados = 0, 0
+        cursor = self._conn.execute("SELECT chave, tamanho FROM memoria ORDER BY acesso")
+        chaves = []
+        for chave, tamanho in cursor:
+            if self._entradas - removidas <= alvo_entradas and self._bytes - liberados <= alvo_bytes:
+                break
+            chaves.append((chave,))
+            removidas += 1
+            liberados += tamanho
+        cursor.close()
+        self._conn.executemany("DELETE FROM memoria WHERE chave = ?", chaves)
+        apagadas = {chave for (chave,) in chaves}
+        for entrada in [e for e, v in self._quentes.items() if v[0] in apagadas]:
+            del self._quentes[entrada]
+        self._entradas -= removidas
+        self._bytes -= liberados
+        self.despejos += removidas
+
+    def estatisticas(self):
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_de_acerto": self.acertos / consultas if consultas else 0.0,
+            "caracteres_economizados": self.caracteres_economizados,
+            "bytes_economizados": self.bytes_economizados,
+            "entradas": self._entradas,
+            "bytes": self._bytes,
+            "despejos": self.despejos,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._registrar_acessos()
+            self._conn.commit()
+            self._conn.close()
+
+
+def recompor(original, traducao):
+    """Devolve a tradução com os espaços das pontas do texto original."""
+    if not (original[:1].isspace() or original[-1:].isspace()):
+        return traducao
+    inicio = len(original) - len(original.lstrip())
+    fim = len(original.rstrip())
+    return original[:inicio] + traducao + original[fim:]
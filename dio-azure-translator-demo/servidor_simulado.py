@@ -0,0 +1,169 @@
+"""
+Servidor local que imita o endpoint /translate da API de Tradução (v3),
+usado pelos benchmarks desta pasta. Não traduz nada: devolve
+"[<idioma>] <texto>" para cada elemento.
+
+Reproduz o que interessa para medir o cliente:
+* keep-alive HTTP/1.1 e, opcionalmente, TLS (certificado autoassinado
+  gerado com o binário `openssl`);
+* latência artificial por pedido, mais uma parcela por mil caracteres (o
+  serviço demora mais a responder textos maiores);
+* os limites do serviço (1000 elementos / 50 000 caracteres por pedido → 400);
+* limitação por caracteres numa janela deslizante, respondendo 429 com
+  `Retry-After` (segundos inteiros, como o serviço).
+
+Contadores: pedidos, conexões abertas, caracteres e respostas 429.
+"""
+import json
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import math
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MAX_ELEMENTOS = 1000
+MAX_CARACTERES = 50000
+
+
+def gerar_certificado(diretorio):
+    """Gera um certificado autoassinado para 127.0.0.1/localhost; retorna (cert, chave)."""
+    if shutil.which("openssl") is None:
+        raise RuntimeError("O modo TLS requer o binário 'openssl' no PATH.")
+    cert, chave = os.path.join(diretorio, "cert.pem"), os.path.join(diretorio, "chave.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", chave, "-out", cert, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, chave
+
+
+class ServidorSimulado:
+    """
+    Uso:
+        with ServidorSimulado(latencia=0.005, tls=True, latencia_por_mil_caracteres=0.002) as servidor:
+            servidor.url, servidor.certificado  # endpoint e CA para o cliente
+    """
+
+    def __init__(self, latencia=0.0, tls=False, caracteres_por_janela=None, janela=1.0, retry_after=None,
+                 latencia_por_mil_caracteres=0.0):
+        self.latencia = latencia
+        self.latencia_por_mil_caracteres = latencia_por_mil_caracteres
+        self.caracteres_por_janela = caracteres_por_janela
+        self.janela = janela
+        self.retry_after = retry_after
+        self.pedidos = 0
+        self.conexoes = 0
+        self.caracteres = 0
+        self.recusados_429 = 0
+        self._lock = threading.Lock()
+        self._na_janela = deque()  # (instante, caracteres) aceitos dentro da janela
+        self._usados_na_janela = 0
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self.certificado = None
+        self._tmp = None
+        if tls:
+            self._tmp = tempfile.TemporaryDirectory()
+            self.certificado, chave = gerar_certificado(self._tmp.name)
+            contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            contexto.load_cert_chain(self.certificado, chave)
+            self._httpd.socket = contexto.wrap_socket(self._httpd.socket, server_side=True)
+        porta = self._httpd.server_address[1]
+        self.url = f"{'https' if tls else 'http'}://127.0.0.1:{porta}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def _consumir(self, caracteres):
+        """Debita a cota da janela deslizante; se estourar, retorna os segundos até caber."""
+        with self._lock:
+            self.pedidos += 1
+            agora = time.monotonic()
+            while self._na_janela and agora - self._na_janela[0][0] >= self.janela:
+                self._usados_na_janela -= self._na_janela.popleft()[1]
+            if self.caracteres_por_janela is not None and self._usados_na_janela + caracteres > self.caracteres_por_janela:
+                self.recusados_429 += 1
+                # Quando as entradas mais antigas saírem da janela, o pedido cabe
+                excesso, espera = self._usados_na_janela + caracteres - self.caracteres_por_janela, 0.0
+                for instante, usados in self._na_janela:
+                    excesso -= usados
+                    espera = instante + self.janela - agora
+                    if excesso <= 0:
+                        break
+                return espera
+            self._na_janela.append((agora, caracteres))
+            self._usados_na_janela += caracteres
+            self.caracteres += caracteres
+            return None
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Sem isso o Nagle segura o corpo até o ACK dos cabeçalhos (+40 ms por resposta)
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with servidor._lock:
+                    servidor.conexoes += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, cabecalhos=None):
+                dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"[]")
+                if url.path != "/translate":
+                    return self._responder(404, {"error": {"message": "Not found"}})
+                params = parse_qs(url.query)
+                destinos, origem = params.get("to", []), params.get("from", [None])[0]
+                caracteres = sum(len(item["text"]) for item in corpo) * max(1, len(destinos))
+                if len(corpo) > MAX_ELEMENTOS or sum(len(item["text"]) for item in corpo) > MAX_CARACTERES:
+                    return self._responder(400, {"error": {"code": 400077, "message": "Request too large"}})
+                espera = servidor._consumir(caracteres)
+                if espera is not None:
+                    retry_after = servidor.retry_after if servidor.retry_after is not None else max(1, math.ceil(espera))
+                    return self._responder(429, {"error": {"code": 429001, "message": "Too many requests"}},
+                                           {"Retry-After": str(retry_after)})
+                atraso = servidor.latencia + caracteres / 1000 * servidor.latencia_por_mil_caracteres
+                if atraso:
+                    time.sleep(atraso)
+                resposta = []
+                for item in corpo:
+                    traducao = {"translations": [{"text": f"[{d}] {item['text']}", "to": d} for d in destinos]}
+                    if not origem:
+                        traducao["detectedLanguage"] = {"language": "pt", "score": 1.0}
+                    resposta.append(traducao)
+                self._responder(200, resposta)
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
@@ -0,0 +1,135 @@
+"""
+Tradução de textos longos: segmentação em frases e pedidos em paralelo.
+
+Um texto único vai à API como um só elemento. O tempo de resposta cresce
+com o tamanho, e acima de 50 000 caracteres o serviço recusa o pedido. Aqui
+o texto é cortado localmente em parágrafos e frases. As frases vizinhas do
+mesmo parágrafo são reagrupadas em segmentos de até `MAX_CARACTERES_SEGMENTO`
+(o contexto ajuda a tradução). Os segmentos seguem pelo `traduzir_em_lote`,
+em pacotes dimensionados para ocupar as `concorrencia` conexões ao mesmo
+tempo. A latência passa a ser a do pacote mais lento, e não a soma de todos.
+Cada tradução é recosturada com os espaços e as quebras de linha originais,
+na ordem do texto.
+
+A segmentação é local, e não pelo `includeSentenceLength` da API: esse
+parâmetro só devolve os limites das frases depois de o texto inteiro ter
+sido enviado, que é justamente o pedido que se quer evitar.
+"""
+import math
+import re
+from collections import Counter
+
+from lote import MAX_CARACTERES, traduzir_em_lote
+
+MAX_CARACTERES_SEGMENTO = 1000
+
+# Quebra de linha (com os espaços em volta): fecha um parágrafo
+_PARAGRAFO = re.compile(r"(\s*\n\s*)")
+# Fim de frase: pontuação final, aspas ou parênteses de fecho e o espaço seguinte
+# (obrigatório no alfabeto latino, para não cortar "3.5" ou "v3.0"; opcional em CJK)
+_FIM_DE_FRASE = re.compile(r"[.!?…]+[\"'”’»)\]]*\s+|[。！？]+[”’」』）)]*\s*")
+
+
+def _frases(paragrafo):
+    """Gera (frase, espaço seguinte) de um parágrafo sem quebras de linha."""
+    inicio = 0
+    for fim in _FIM_DE_FRASE.finditer(paragrafo):
+        frase = paragrafo[inicio:fim.end()].rstrip()
+        yield frase, paragrafo[inicio + len(frase):fim.end()]
+        inicio = fim.end()
+    if inicio < len(paragrafo):
+        frase = paragrafo[inicio:].rstrip()
+        yield frase, paragrafo[inicio + len(frase):]
+
+
+def _cortar(frase, max_caracteres):
+    """Gera (pedaço, espaço) de uma frase maior que o limite: no último espaço possível, senão no limite."""
+    while len(frase) > max_caracteres:
+        corte = max(frase.rfind(" ", 0, max_caracteres + 1), frase.rfind("\t", 0, max_caracteres + 1))
+        if corte <= 0:
+            yield frase[:max_caracteres], ""
+            frase = frase[max_caracteres:]
+            continue
+        fim_do_espaco = len(frase) - len(frase[corte:].lstrip())
+        yield frase[:corte], frase[corte:fim_do_espaco]
+        frase = frase[fim_do_espaco:]
+    yield frase, ""
+
+
+def segmentar(texto, max_caracteres=MAX_CARACTERES_SEGMENTO):
+    """
+    Corta `texto` em segmentos de até `max_caracteres`, sem atravessar
+    parágrafos. Retorna (prefixo, [(segmento, separador), ...]): o prefixo é
+    o espaço antes do primeiro segmento e cada separador o espaço que segue o
+    seu segmento, de modo que `prefixo + "".join(s + e for s, e in ...)`
+    reproduz o texto original.
+    """
+    corpo = texto.lstrip()
+    prefixo = texto[:len(texto) - len(corpo)]
+    unidades = []  # [conteúdo, espaço seguinte, fecha parágrafo]
+    partes = _PARAGRAFO.split(corpo)
+    for i in range(0, len(partes), 2):
+        for frase, espaco in _frases(partes[i]):
+            pedacos = list(_cortar(frase, max_caracteres))
+            pedacos[-1] = (pedacos[-1][0], espaco)
+            unidades.extend([pedaco, esp, False] for pedaco, esp in pedacos)
+        if i + 1 < len(partes) and unidades:
+            unidades[-1][1] += partes[i + 1]
+            unidades[-1][2] = True
+
+    segmentos = []
+    for conteudo, espaco, fecha in unidades:
+        if segmentos and not segmentos[-1][2] and (
+                len(segmentos[-1][0]) + len(segmentos[-1][1]) + len(conteudo) <= max_caracteres):
+            anterior = segmentos[-1]
+            anterior[0] += anterior[1] + conteudo
+            anterior[1], anterior[2] = espaco, fecha
+        else:
+            segmentos.append([conteudo, espaco, fecha])
+    return prefixo, [(conteudo, espaco) for conteudo, espaco, _ in segmentos]
+
+
+def costurar(prefixo, segmentos, traducoes):
+    """Junta as traduções dos segmentos com o prefixo e os separadores originais."""
+    return prefixo + "".join(traducao + espaco for traducao, (_, espaco) in zip(traducoes, segmentos))
+
+
+def traduzir_texto_longo(cliente, texto, idiomas_de_destino, idioma_de_origem=None, concorrencia=4,
+                         memoria=None, max_caracteres_segmento=MAX_CARACTERES_SEGMENTO, metricas=None):
+    """
+    Traduz um texto longo por segmentos em paralelo. Retorna um dict com
+    `traducoes` ({idioma: texto}), `segmentos` (quantos) e, com deteção
+    automática, `idioma_detectado` (o mais frequente, pesado pelo tamanho
+    dos segmentos).
+
+    Os pacotes têm cerca de 1/`concorrencia` do texto, para que todos
+    partam ao mesmo tempo, e nunca mais que os 50 000 caracteres da API. Se
+    algum segmento falhar depois das novas tentativas do cliente, levanta
+    RuntimeError: uma tradução com buracos não é devolvida.
+    """
+    prefixo, segmentos = segmentar(texto, max_caracteres_segmento)
+    total = sum(len(conteudo) for conteudo, _ in segmentos)
+    # Um pacote fecha com mais de (limite - um segmento): com essa folga, nunca passam de `concorrencia`
+    max_caracteres = min(MAX_CARACTERES, math.ceil(total / max(1, concorrencia)) + max_caracteres_segmento)
+    registros = ({"_texto": conteudo} for conteudo, _ in segmentos)
+
+    partes, erros, idiomas = [], [], Counter()
+    for resultado in traduzir_em_lote(cliente, registros, idiomas_de_destino, idioma_de_origem, concorrencia,
+                                      memoria=memoria, max_caracteres=max_caracteres, metricas=metricas):
+        if "erro" in resultado:
+            erros.append(resultado["erro"])
+            continue
+        partes.append(resultado["traducoes"])
+        if resultado.get("idioma_detectado"):
+            idiomas[resultado["idioma_detectado"]] += len(resultado["_texto"])
+    if erros:
+        raise RuntimeError(f"{len(erros)} de {len(segmentos)} segmentos falharam ({erros[0]}).")
+
+    resultado = {
+        "traducoes": {destino: costurar(prefixo, segmentos, [parte[destino] for parte in partes])
+                      for destino in idiomas_de_destino},
+        "segmentos": len(segmentos),
+    }
+    if idiomas:
+        resultado["idioma_detectado"] = idiomas.most_common(1)[0][0]
+    return resultado
@@ -1,6 +1,12 @@
-import requests, uuid, json, os
+import requests, json, os, sys, time, argparse, atexit
 from dotenv import load_dotenv
 
+from cliente_tradutor import ClienteTradutor, opcoes_do_ambiente
+from limitador import LimitadorDeTaxa
+from lote import escrever_resultado, ler_registros, traduzir_em_lote
+from memoria_traducao import MAX_BYTES, MAX_ENTRADAS, MemoriaTraducao
+from texto_longo import traduzir_texto_longo
+
 # Carrega as variáveis de ambiente do ficheiro .env
 load_dotenv()
 
@@ -21,31 +27,55 @@ if not all([chave_secreta, endpoint, localizacao]):
     print("ERRO CRÍTICO: Uma ou mais credenciais (chave, endpoint, localização) não foram encontradas no ficheiro .env.")
     exit()
 
+# --- Controle de tráfego: toda chamada espera a sua vez na cota de caracteres/pedidos ---
+# Sem valores no .env a taxa começa livre e é aprendida no primeiro 429.
+limitador = LimitadorDeTaxa(
+    caracteres_por_minuto=float(os.getenv('TRADUTOR_CARACTERES_POR_MINUTO', 0)) or None,
+    pedidos_por_segundo=float(os.getenv('TRADUTOR_PEDIDOS_POR_SEGUNDO', 0)) or None,
+)
+
+# --- Canal de comunicação único: conexões reaproveitadas entre chamadas ---
+cliente = ClienteTradutor(endpoint, chave_secreta, localizacao, limitador=limitador, **opcoes_do_ambiente())
+
+# --- Memória de tradução: textos já traduzidos não voltam à API (TRADUTOR_MEMORIA="" desliga) ---
+caminho_memoria = os.getenv('TRADUTOR_MEMORIA', 'memoria_traducao.db')
+memoria = MemoriaTraducao(
+    caminho_memoria,
+    max_entradas=int(os.getenv('TRADUTOR_MEMORIA_MAX_ENTRADAS', MAX_ENTRADAS)),
+    max_bytes=int(os.getenv('TRADUTOR_MEMORIA_MAX_MB', MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+) if caminho_memoria else None
+if memoria:
+    atexit.register(memoria.fechar)
+
+# --- Textos longos: acima do limite, segmentados em frases e traduzidos em pedidos paralelos ---
+limite_texto_longo = int(os.getenv('TRADUTOR_LIMITE_TEXTO_LONGO', 5000))
+concorrencia_texto_longo = int(os.getenv('TRADUTOR_CONCORRENCIA_TEXTO_LONGO', 4))
+
 def traduzir_texto(texto_para_traduzir, idioma_de_origem, idiomas_de_destino):
-    path = '/translate'
-    constructed_url = endpoint + path
-
-    params = {
-        'api-version': '3.0',
-        'to': idiomas_de_destino
-    }
-    if idioma_de_origem:
-        params['from'] = idioma_de_origem
-
-    headers = {
-        'Ocp-Apim-Subscription-Key': chave_secreta,
-        'Ocp-Apim-Subscription-Region': localizacao,
-        'Content-type': 'application/json',
-        'X-ClientTraceId': str(uuid.uuid4())
-    }
     body = [{'text': texto_para_traduzir}]
 
     try:
-        request = requests.post(constructed_url, params=params, headers=headers, json=body)
-        request.raise_for_status()
-        response = request.json()
+        achado, nota = None, ""
+        if len(texto_para_traduzir) > limite_texto_longo:
+            # Texto longo: cada segmento vai num pedido em paralelo e as traduções são recosturadas
+            resultado = traduzir_texto_longo(cliente, texto_para_traduzir, idiomas_de_destino, idioma_de_origem,
+                                             concorrencia_texto_longo, memoria)
+            response = [{'translations': [{'to': d, 'text': t} for d, t in resultado['traducoes'].items()],
+                         'detectedLanguage': {'language': resultado.get('idioma_detectado')}}]
+            nota = f" (texto longo, {resultado['segmentos']} segmentos)"
+        elif memoria and (achado := memoria.buscar([texto_para_traduzir], idiomas_de_destino, idioma_de_origem)[0]):
+            # Acerto na memória: mesma forma da resposta da API, sem ir à rede
+            traducoes, idioma_detetado = achado
+            response = [{'translations': [{'to': d, 'text': t} for d, t in traducoes.items()],
+                         'detectedLanguage': {'language': idioma_detetado}}]
+            nota = " (memória de tradução)"
+        else:
+            response = cliente.traduzir([texto_para_traduzir], idiomas_de_destino, idioma_de_origem)
+            if memoria:
+                memoria.gravar([(texto_para_traduzir, {t['to']: t['text'] for t in response[0]['translations']},
+                                 response[0].get('detectedLanguage', {}).get('language'))], idioma_de_origem)
         
-        print("\n--- TRADUÇÃO CONCLUÍDA ---")
+        print(f"\n--- TRADUÇÃO CONCLUÍDA{nota} ---")
         
         # Se a deteção automática foi usada, reporta o idioma detetado
         if not idioma_de_origem:
@@ -73,7 +103,89 @@ def exibir_ajuda_idiomas():
     print("---------------------------------------")
 
 # --- Loop de Execução Principal ---
-if __name__ == "__main__":
+def traduzir_arquivo(argv):
+    """
+    Modo em lote (não interativo): traduz cada linha (ou registro JSONL) de
+    um arquivo ou da entrada padrão e grava os resultados em JSONL, na ordem
+    da entrada. O progresso vai para a saída de erro. Com `--documento`, a
+    entrada inteira é um só texto, traduzido por segmentos em paralelo.
+    """
+    parser = argparse.ArgumentParser(description="Tradução em lote com empacotamento de pedidos.")
+    parser.add_argument("--para", required=True, help="Idioma(s) de destino separados por vírgula (ex: en,es).")
+    parser.add_argument("--de", default=None, help="Idioma de origem (omitido: deteção automática).")
+    parser.add_argument("--entrada", default="-", help="Arquivo de entrada ('-' para stdin).")
+    parser.add_argument("--saida", default="-", help="Arquivo JSONL de saída ('-' para stdout).")
+    parser.add_argument("--jsonl", action="store_true", help="Entrada em JSONL em vez de uma linha por texto.")
+    parser.add_argument("--campo", default="text", help="Campo com o texto na entrada JSONL.")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Pedidos simultâneos à API.")
+    parser.add_argument("--sem-memoria", action="store_true", help="Ignora a memória de tradução.")
+    parser.add_argument("--documento", action="store_true",
+                        help="Traduz a entrada inteira como um só texto (segmentado em frases, em paralelo).")
+    args = parser.parse_args(argv)
+
+    destinos = [lang.strip() for lang in args.para.split(',')]
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+
+    memoria_do_lote = None if args.sem_memoria else memoria
+    metricas = {}
+    if args.documento:
+        return traduzir_documento(entrada, saida, destinos, args, memoria_do_lote, metricas)
+    inicio = time.perf_counter()
+    total = falhas = 0
+    try:
+        for resultado in traduzir_em_lote(cliente, ler_registros(entrada, args.jsonl, args.campo),
+                                          destinos, args.de, args.concorrencia,
+                                          memoria=memoria_do_lote, metricas=metricas):
+            escrever_resultado(saida, resultado)
+            total += 1
+            falhas += "erro" in resultado
+            if total % 10000 == 0:
+                print(f"{total} textos traduzidos...", file=sys.stderr)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+
+    segundos = time.perf_counter() - inicio
+    print(f"Lote concluído: {total} textos ({falhas} com erro) em {segundos:.1f} s, "
+          f"{cliente.chamadas} pedidos à API ({metricas['textos_enviados']} textos enviados, "
+          f"{metricas['repeticoes_aproveitadas']} repetições aproveitadas).", file=sys.stderr)
+    fila = limitador.metricas()
+    print(f"Limitador: {fila['respostas_429']} respostas 429, espera média {fila['espera_media_s']:.2f} s "
+          f"(máx. {fila['espera_maxima_s']:.2f} s), maior fila {fila['maior_fila']}.", file=sys.stderr)
+    if memoria_do_lote:
+        est = memoria_do_lote.estatisticas()
+        print(f"Memória de tradução: {est['acertos']} acertos / {est['falhas']} falhas "
+              f"({est['taxa_de_acerto']:.1%}), {est['caracteres_economizados']} caracteres e "
+              f"{est['bytes_economizados']} bytes economizados.", file=sys.stderr)
+    return 1 if falhas else 0
+
+def traduzir_documento(entrada, saida, destinos, args, memoria_do_lote, metricas):
+    """Modo `--documento`: uma linha JSONL com as traduções do texto inteiro."""
+    inicio = time.perf_counter()
+    try:
+        texto = entrada.read()
+        resultado = traduzir_texto_longo(cliente, texto, destinos, args.de, args.concorrencia,
+                                         memoria_do_lote, metricas=metricas)
+        escrever_resultado(saida, {"documento": args.entrada, **resultado})
+    except RuntimeError as err:
+        print(f"ERRO: {err}", file=sys.stderr)
+        return 1
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+    print(f"Documento traduzido: {len(texto)} caracteres em {resultado['segmentos']} segmentos, "
+          f"{metricas['pacotes']} pedidos à API em {time.perf_counter() - inicio:.1f} s.", file=sys.stderr)
+    return 0
+
+def modo_interativo():
+    """
+    Intérprete interativo: um texto por vez, com ajuda de idiomas.
+    """
     print("--- Ferramenta de Tradução Global (Azure AI) ---")
     while True:
         print("\n-------------------------------------------")
@@ -100,3 +212,9 @@ if __name__ == "__main__":
         traduzir_texto(texto, origem, destino)
         
     print("\nOperação concluída. Intérprete Global desativado.")
+
+if __name__ == "__main__":
+    # Com argumentos: modo em lote; sem argumentos: o intérprete interativo de sempre
+    if len(sys.argv) > 1:
+        sys.exit(traduzir_arquivo(sys.argv[1:]))
+    modo_interativo()